@@ -0,0 +1,297 @@
+# api/archive.py
+"""
+diary_logs 월 파티션 보관(retention)과 읽기 전용 조회.
+
+hot 테이블 diary_logs 에는 최근 LOG_RETENTION_DAYS 일만 남기고, 그보다 오래된 "다 지난 달" 은
+통째로 월별 SQLite 파일(같은 diary_logs 스키마, 같은 id)로 옮겨 gzip 으로 압축해 둔다:
+
+    ARCHIVE_DIR/diary_logs_2026-01.db.gz      + diary_log_archives 에 (월, 파일, 행 수, id 범위)
+
+- archive_old_logs : 보관 작업 (scripts/archive_logs.py). 달마다
+    1) 그 달 행을 임시 SQLite 파일로 복사 → VACUUM → gzip → rename (기존 파일이 있으면 풀어서 이어 씀)
+    2) 매니페스트 기록 후 hot 에서 복사한 id 까지만 chunk 단위로 삭제 (쓰기 락을 오래 잡지 않게)
+  중간에 죽어도 다시 돌리면 같은 달을 이어서 처리하고, 늦게 들어온 옛 달 행(스필 재삽입 등)도 같은 방식으로 합쳐진다.
+- ArchiveReader : 필요한 달만 ARCHIVE_CACHE_DIR 에 풀어서 mode=ro 로 연다 (프로세스별 파일, 최근 ARCHIVE_CACHE_FILES 개 유지).
+  /diary/logs?archived=true 는 hot 과 여기를 같은 id 커서로 읽어 id 순으로 합친다 (id 가 그대로라 커서도 그대로)
+- 일별 롤업은 지우지 않으므로 /diary/trends 는 보관된 기간도 그대로 나온다
+"""
+
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from api.models import DiaryLog, LogArchive
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "180"))  # 0이면 보관 안 함
+ARCHIVE_CACHE_DIR = os.getenv("ARCHIVE_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "diary_archive_cache")
+ARCHIVE_CACHE_FILES = int(os.getenv("ARCHIVE_CACHE_FILES", "4"))
+ARCHIVE_CHUNK = int(os.getenv("ARCHIVE_CHUNK", "5000"))
+
+logger = logging.getLogger("app")
+
+_TABLE = DiaryLog.__table__
+
+
+def month_key(ts: datetime) -> str:
+    return f"{ts.year:04d}-{ts.month:02d}"
+
+
+def month_range(month: str) -> Tuple[datetime, datetime]:
+    """'YYYY-MM' → [그 달 1일, 다음 달 1일)."""
+    y, m = map(int, month.split("-"))
+    return datetime(y, m, 1), datetime(y + m // 12, m % 12 + 1, 1)
+
+
+def archive_filename(month: str) -> str:
+    return f"diary_logs_{month}.db.gz"
+
+
+# -----------------------------
+# 보관 (쓰기 쪽)
+# -----------------------------
+@dataclass
+class ArchivedMonth:
+    month: str
+    rows: int  # 파일 안의 전체 행 수 (이전 실행분 포함)
+    moved: int  # 이번에 hot 에서 지운 행 수
+
+
+def months_to_archive(db: Session, cutoff: datetime) -> List[str]:
+    """cutoff 가 든 달보다 앞선 달 중 hot 에 행이 남아 있는 달 (오래된 것부터)."""
+    limit = datetime(cutoff.year, cutoff.month, 1)
+    ts = db.execute(select(func.min(DiaryLog.ts)).where(DiaryLog.ts < limit)).scalar()
+    months = []
+    while ts is not None:
+        month = month_key(ts)
+        months.append(month)
+        # 다음 달 이후의 가장 이른 행으로 건너뛴다 (비어 있는 달은 건너뜀, ts 인덱스)
+        ts = db.execute(
+            select(func.min(DiaryLog.ts)).where(DiaryLog.ts >= month_range(month)[1], DiaryLog.ts < limit)
+        ).scalar()
+    return months
+
+
+def _gunzip(src: str, dst: str) -> None:
+    with gzip.open(src, "rb") as f, open(dst, "wb") as out:
+        shutil.copyfileobj(f, out, 1024 * 1024)
+
+
+def _gzip(src: str, dst: str) -> None:
+    tmp = dst + ".tmp"
+    with open(src, "rb") as f, gzip.open(tmp, "wb", compresslevel=6) as out:
+        shutil.copyfileobj(f, out, 1024 * 1024)
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, dst)
+
+
+def _export_month(db: Session, month: str, archive_dir: str) -> Tuple[int, Optional[int], Optional[int], Optional[int]]:
+    """그 달의 hot 행을 보관 파일에 합쳐 쓴다. (파일 행 수, 파일 min_id, 파일 max_id, 이번에 복사한 마지막 id)."""
+    start, end = month_range(month)
+    final = os.path.join(archive_dir, archive_filename(month))
+    fd, work = tempfile.mkstemp(suffix=".db", dir=archive_dir)
+    os.close(fd)
+    try:
+        if os.path.exists(final):
+            _gunzip(final, work)
+        out = create_engine(f"sqlite:///{work}")
+        try:
+            _TABLE.create(out, checkfirst=True)
+            copied_max = None
+            q = select(_TABLE).where(DiaryLog.ts >= start, DiaryLog.ts < end).order_by(DiaryLog.id)
+            with out.begin() as conn:
+                for part in db.execute(q.execution_options(yield_per=ARCHIVE_CHUNK)).partitions():
+                    conn.execute(sqlite_insert(_TABLE).on_conflict_do_nothing(), [r._asdict() for r in part])
+                    copied_max = part[-1].id
+                rows, min_id, max_id = conn.execute(
+                    select(func.count(), func.min(DiaryLog.id), func.max(DiaryLog.id))
+                ).one()
+            with out.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.exec_driver_sql("VACUUM")
+        finally:
+            out.dispose()
+        _gzip(work, final)
+        return rows, min_id, max_id, copied_max
+    finally:
+        os.remove(work)
+
+
+def archive_month(db: Session, month: str, archive_dir: str = ARCHIVE_DIR) -> ArchivedMonth:
+    os.makedirs(archive_dir, exist_ok=True)
+    rows, min_id, max_id, copied_max = _export_month(db, month, archive_dir)
+    db.rollback()  # 복사에 쓴 읽기 트랜잭션 종료
+
+    entry = db.get(LogArchive, month) or LogArchive(month=month)
+    entry.path = archive_filename(month)
+    entry.rows = rows
+    entry.min_id = min_id
+    entry.max_id = max_id
+    entry.archived_at = datetime.utcnow()
+    db.add(entry)
+    db.commit()
+
+    # 파일에 들어간 id 까지만 지운다 (복사 뒤에 들어온 행은 id 가 더 크므로 남았다가 다음 실행에 합쳐짐)
+    moved = 0
+    if copied_max is not None:
+        start, end = month_range(month)
+        while True:
+            ids = select(DiaryLog.id).where(
+                DiaryLog.ts >= start, DiaryLog.ts < end, DiaryLog.id <= copied_max
+            ).limit(ARCHIVE_CHUNK)
+            n = db.execute(delete(DiaryLog).where(DiaryLog.id.in_(ids))).rowcount
+            db.commit()
+            moved += n
+            if n < ARCHIVE_CHUNK:
+                break
+    logger.info(f"[archive] {month}: moved {moved} rows, {rows} rows in {entry.path}")
+    return ArchivedMonth(month, rows, moved)
+
+
+def archive_old_logs(
+    db: Session,
+    retention_days: int = LOG_RETENTION_DAYS,
+    archive_dir: str = ARCHIVE_DIR,
+    now: Optional[datetime] = None,
+    dry_run: bool = False,
+) -> List[ArchivedMonth]:
+    """retention_days 보다 오래된 다 지난 달을 보관 파일로 옮긴다. dry_run 이면 대상 달만 (moved=0)."""
+    if retention_days <= 0:
+        return []
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    months = months_to_archive(db, cutoff)
+    if dry_run:
+        return [ArchivedMonth(m, 0, 0) for m in months]
+    return [archive_month(db, m, archive_dir) for m in months]
+
+
+# -----------------------------
+# 읽기 전용 조회
+# -----------------------------
+class ArchiveReader:
+    """보관 파일을 필요할 때만 풀어서 읽기 전용으로 연다. 스레드에서 불러도 된다."""
+
+    def __init__(self, archive_dir: str = ARCHIVE_DIR, cache_dir: str = ARCHIVE_CACHE_DIR,
+                 max_files: int = ARCHIVE_CACHE_FILES):
+        self.archive_dir = archive_dir
+        self.cache_dir = cache_dir
+        self.max_files = max(1, max_files)
+        # month → (보관 파일 mtime, 푼 파일 경로, 엔진)
+        self._open: "OrderedDict[str, Tuple[float, str, Engine]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._month_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.opens = 0
+        self.evictions = 0
+
+    def _cached(self, month: str, mtime: float) -> Optional[Engine]:
+        # self._lock 잡은 상태에서
+        cached = self._open.get(month)
+        if cached is not None and cached[0] == mtime:
+            self._open.move_to_end(month)
+            self.hits += 1
+            return cached[2]
+        return None
+
+    def _engine(self, month: str, path: str) -> Engine:
+        src = os.path.join(self.archive_dir, path)
+        mtime = os.path.getmtime(src)
+        with self._lock:
+            engine = self._cached(month, mtime)
+            if engine is not None:
+                return engine
+            month_lock = self._month_locks.setdefault(month, threading.Lock())
+        # 압축 풀기는 달별 락에서만 (다른 달 조회는 기다리지 않는다)
+        with month_lock:
+            with self._lock:
+                engine = self._cached(month, mtime)  # 기다리는 동안 다른 스레드가 열었으면
+                if engine is not None:
+                    return engine
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # 캐시 디렉터리는 워커 프로세스끼리 같으므로 파일은 프로세스별 (다른 워커가 열어 둔 파일을 지우지 않게)
+            local = os.path.join(self.cache_dir, f"{path[:-len('.gz')]}.{int(mtime * 1000)}.{os.getpid()}")
+            if not os.path.exists(local):
+                fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+                os.close(fd)
+                try:
+                    _gunzip(src, tmp)
+                    os.replace(tmp, local)
+                except BaseException:
+                    os.remove(tmp)
+                    raise
+            engine = create_engine(
+                f"sqlite:///file:{local}?mode=ro&uri=true", connect_args={"check_same_thread": False}
+            )
+            with self._lock:
+                if month in self._open:  # 보관 작업이 그 달을 다시 씀
+                    self._close_locked(month)
+                self._open[month] = (mtime, local, engine)
+                self.opens += 1
+                while len(self._open) > self.max_files:
+                    self._close_locked(next(iter(self._open)))
+                    self.evictions += 1
+            return engine
+
+    def _close_locked(self, month: str) -> None:
+        _, local, engine = self._open.pop(month)
+        engine.dispose()
+        try:
+            os.remove(local)
+        except OSError:
+            pass
+
+    def execute(self, month: str, path: str, stmt) -> List[Any]:
+        with self._engine(month, path).connect() as conn:
+            return conn.execute(stmt).all()
+
+    def read_page(
+        self,
+        entries: Sequence[Any],
+        make_stmt: Callable[[Optional[int], int], Any],
+        cursor: Optional[int],
+        limit: int,
+    ) -> List[Any]:
+        """
+        보관된 달들(entries: month/path/min_id/max_id)에서 id < cursor 인 행을 id 내림차순으로 limit 개.
+        max_id 가 큰 파일부터 읽고, 모은 행의 limit 번째 id 보다 max_id 가 작은 파일은 열지 않는다.
+        make_stmt(cursor, limit) 은 id 를 포함해 id DESC 로 정렬한 SELECT (SQLite 방언).
+        """
+        got: List[Any] = []
+        for e in sorted(entries, key=lambda e: e.max_id or 0, reverse=True):
+            if e.min_id is None or (cursor is not None and e.min_id >= cursor):
+                continue
+            if len(got) >= limit and (e.max_id or 0) < got[limit - 1].id:
+                break
+            got += self.execute(e.month, e.path, make_stmt(cursor, limit))
+            got = sorted(got, key=lambda r: r.id, reverse=True)[:limit]
+        return got
+
+    def close(self) -> None:
+        with self._lock:
+            for month in list(self._open):
+                self._close_locked(month)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open": list(self._open),
+                "max_files": self.max_files,
+                "hits": self.hits,
+                "opens": self.opens,
+                "evictions": self.evictions,
+            }
+
+
+archive_reader = ArchiveReader()
@@ -0,0 +1,398 @@
+# api/log_writer.py
+"""
+DiaryLog write-behind 저장기.
+
+요청 경로에서는 로그 행(save_diary_log 인자 dict)을 큐에 넣기만 하고 바로 응답한다.
+백그라운드 스레드 하나가 큐에서 꺼내 LOG_BATCH_SIZE 개 또는 LOG_FLUSH_MS 마다
+INSERT 한 번 + commit 한 번으로 저장한다 (행마다 fsync / 쓰기 락 대기 없음).
+
+- 큐는 LOG_QUEUE_MAX 로 제한. 가득 차면 스필 파일로, 스필이 꺼져 있으면 바로 저장
+  (둘 다 overflow 스레드에서. 이벤트 루프에서 submit 해도 파일/DB I/O 를 기다리지 않는다)
+  overflow 스레드에 밀린 행도 LOG_QUEUE_MAX 까지. 그 이상은 호출 쪽에서 바로 스필, 스필이 꺼져 있으면 버리고 dropped 로 센다
+- DB 저장이 실패하면 그 배치를 스필 파일(JSONL, LOG_SPILL_PATH)에 붙여 두고,
+  다음에 저장이 성공하면 스필 파일을 다시 넣는다 (기동 시에도 한 번)
+  읽을 수 없는 줄(붙여 쓰다 죽어서 잘린 줄 등)과 DB 가 거부한 행은 <스필>.bad 로 옮기고 나머지만 넣는다
+- flush() 는 그 시점까지 넣은 행이 저장(또는 스필)될 때까지 기다린다. 종료 시 close() 로 flush + 정지
+- LOG_WRITE_BEHIND=0 이면 enabled=False → pipeline 은 예전처럼 직접 저장
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+
+from api.models import get_session, save_diary_log, save_diary_logs
+
+LOG_WRITE_BEHIND = os.getenv("LOG_WRITE_BEHIND", "1") == "1"
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "200"))
+LOG_FLUSH_MS = float(os.getenv("LOG_FLUSH_MS", "200"))
+LOG_SPILL_PATH = os.getenv("LOG_SPILL_PATH", "./diary_logs.spill.jsonl")  # 빈 값이면 스필 안 함
+
+logger = logging.getLogger("app")
+
+
+class _Flush:
+    # 큐 안의 표식: 앞선 행이 다 처리되면 event 를 켠다
+    def __init__(self):
+        self.event = threading.Event()
+
+
+def _dump_row(row: Dict[str, Any]) -> str:
+    r = dict(row)
+    if isinstance(r.get("ts"), datetime):
+        r["ts"] = r["ts"].isoformat()
+    return json.dumps(r, ensure_ascii=False)
+
+
+def _db_unavailable(e: Exception) -> bool:
+    # 연결/락 문제 (다시 하면 될 수 있음) vs 행 자체가 거부됨 (제약 위반, 잘못된 값)
+    return isinstance(e, (OperationalError, InterfaceError)) or getattr(e, "connection_invalidated", False)
+
+
+def _load_row(line: str) -> Dict[str, Any]:
+    r = json.loads(line)
+    if r.get("ts"):
+        r["ts"] = datetime.fromisoformat(r["ts"])
+    return r
+
+
+class LogWriter:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = get_session,
+        *,
+        enabled: bool = LOG_WRITE_BEHIND,
+        max_queue: int = LOG_QUEUE_MAX,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_ms: float = LOG_FLUSH_MS,
+        spill_path: Optional[str] = LOG_SPILL_PATH,
+    ):
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_ms) / 1000.0
+        self.spill_path = spill_path or None
+
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_queue))
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._overflow: Optional[ThreadPoolExecutor] = None
+        self._overflow_pending = 0
+
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.overflow = 0   # 큐가 가득 차서 스필/직접 저장으로 넘긴 행
+        self.dropped = 0    # 저장도 스필도 못 한 행
+        self.bad_lines = 0  # 스필 파일에서 읽을 수 없어 .bad 로 옮긴 줄
+        self._batched_rows = 0
+        self._write_ms = 0.0
+
+    # -----------------------------
+    # 요청 경로
+    # -----------------------------
+    def submit(self, row: Dict[str, Any]) -> None:
+        """로그 행을 넘긴다 (블로킹 없음). ts 는 지금 시각으로 찍어 둔다 (배치 저장이 늦어도 요청 시각 유지)."""
+        row = dict(row)
+        row.setdefault("ts", datetime.utcnow())
+        self._ensure_worker()
+        with self._stats_lock:
+            self.submitted += 1
+        try:
+            self._q.put_nowait(row)
+            return
+        except queue.Full:
+            with self._stats_lock:
+                self.overflow += 1
+                # overflow 스레드에 넘긴 행도 LOG_QUEUE_MAX 까지만 (DB 가 죽어 직접 저장이 밀려도 메모리는 유한)
+                full = self._overflow_pending >= self._q.maxsize
+                if not full:
+                    self._overflow_pending += 1
+        if not full:
+            self._overflow_pool().submit(self._overflow_write, row)
+        elif self.spill_path:
+            self._spill([row])  # 여기까지 밀리면 호출 쪽에서 (파일 append 한 번)
+        else:
+            logger.warning("[log-writer] queue and overflow full, dropping diary log row")
+            with self._stats_lock:
+                self.dropped += 1
+
+    def _overflow_write(self, row: Dict[str, Any]) -> None:
+        try:
+            if self.spill_path:
+                self._spill([row])
+            else:
+                self._write_direct(row)
+        finally:
+            with self._stats_lock:
+                self._overflow_pending -= 1
+
+    def _overflow_pool(self) -> ThreadPoolExecutor:
+        # 큐가 넘친 행의 스필/직접 저장용 (순서대로 하나씩)
+        with self._start_lock:
+            if self._overflow is None:
+                self._overflow = ThreadPoolExecutor(max_workers=1, thread_name_prefix="diary-log-overflow")
+            return self._overflow
+
+    def _write_direct(self, row: Dict[str, Any]) -> None:
+        db = self.session_factory()
+        try:
+            save_diary_log(db, **row)
+            with self._stats_lock:
+                self.written += 1
+        except Exception:
+            logger.exception("diary log save failed (queue full, no spill)")
+            with self._stats_lock:
+                self.dropped += 1
+        finally:
+            db.close()
+
+    # -----------------------------
+    # 워커
+    # -----------------------------
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="diary-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        self._replay_spill()
+        while True:
+            try:
+                if not self._drain_once():
+                    return
+            except Exception:
+                # 워커가 죽으면 큐가 쌓이기만 한다 → 남기고 계속
+                logger.exception("[log-writer] worker error")
+
+    def _drain_once(self) -> bool:
+        """배치 하나를 모아 저장. close() 표식을 만나면 False."""
+        first = self._q.get()
+        if first is None:  # close()
+            return False
+        batch: List[Dict[str, Any]] = []
+        markers: List[_Flush] = []
+        (markers if isinstance(first, _Flush) else batch).append(first)
+        deadline = time.monotonic() + self.flush_interval
+        stop = False
+        # 배치 크기나 시간이 찰 때까지 모은다 (flush 표식이 오면 바로 저장)
+        while len(batch) < self.batch_size and not markers:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._q.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            (markers if isinstance(item, _Flush) else batch).append(item)
+        try:
+            self._write_batch(batch)
+        finally:
+            for m in markers:
+                m.event.set()
+        return not stop
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            save_diary_logs(db, batch)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"[log-writer] batch of {len(batch)} failed: {e}")
+            with self._stats_lock:
+                self.failed_batches += 1
+            if self.spill_path:
+                self._spill(batch)
+            else:
+                with self._stats_lock:
+                    self.dropped += len(batch)
+            return
+        finally:
+            db.close()
+        with self._stats_lock:
+            self.written += len(batch)
+            self.batches += 1
+            self._batched_rows += len(batch)
+            self._write_ms += (time.perf_counter() - started) * 1000
+        # DB 가 살아났으니 밀린 스필분도 넣는다
+        self._replay_spill()
+
+    # -----------------------------
+    # 스필 (DB 불가 / 큐 가득)
+    # -----------------------------
+    def _spill(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            with self._spill_lock:
+                d = os.path.dirname(os.path.abspath(self.spill_path))
+                os.makedirs(d, exist_ok=True)
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    for r in rows:
+                        f.write(_dump_row(r) + "\n")
+            with self._stats_lock:
+                self.spilled += len(rows)
+        except OSError:
+            logger.exception("diary log spill failed")
+            with self._stats_lock:
+                self.dropped += len(rows)
+
+    def _replay_spill(self) -> None:
+        try:
+            self._replay_spill_file()
+        except Exception:
+            # 재삽입이 안 돼도 워커(새 행 저장)는 계속 돈다. .replay 는 남아서 다음에 다시
+            logger.exception("[log-writer] spill replay error")
+
+    def _read_spill(self, path: str) -> List[Dict[str, Any]]:
+        """스필 파일 → 행. 읽을 수 없는 줄은 <스필>.bad 에 붙여 두고 건너뛴다."""
+        rows: List[Dict[str, Any]] = []
+        bad: List[str] = []
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(_load_row(line))
+                except (ValueError, TypeError, AttributeError):
+                    bad.append(line if line.endswith("\n") else line + "\n")
+        if bad:
+            with open(self.spill_path + ".bad", "a", encoding="utf-8") as f:
+                f.writelines(bad)
+            logger.warning(f"[log-writer] {len(bad)} unreadable spill lines moved to {self.spill_path}.bad")
+            with self._stats_lock:
+                self.bad_lines += len(bad)
+        return rows
+
+    def _replay_spill_file(self) -> None:
+        if not self.spill_path:
+            return
+        replay = self.spill_path + ".replay"
+        with self._spill_lock:
+            # 옮겨 놓고 읽는다 (읽는 동안 새 스필은 새 파일로). 지난번에 실패한 .replay 가 있으면 그것부터
+            if not os.path.exists(replay):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, replay)
+        rows = self._read_spill(replay)
+        # 읽은 행만 남긴 파일로 바꿔 둔다 (저장이 실패해 다음에 다시 읽을 때 .bad 에 중복되지 않게)
+        with open(replay + ".tmp", "w", encoding="utf-8") as f:
+            f.writelines(_dump_row(r) + "\n" for r in rows)
+        os.replace(replay + ".tmp", replay)
+        db = self.session_factory()
+        try:
+            # 한 트랜잭션으로 (중간에 실패해서 다시 넣을 때 중복되지 않게)
+            save_diary_logs(db, rows)
+            saved, rest = len(rows), []
+        except Exception as e:
+            db.rollback()
+            if _db_unavailable(e):
+                logger.warning(f"[log-writer] spill replay failed, keeping {replay}: {e}")
+                return
+            # DB 는 살아 있는데 배치가 거부됨 → 한 행씩 넣고 거부된 행만 .bad 로
+            saved, rest = self._replay_rows(db, rows)
+        finally:
+            db.close()
+        with self._stats_lock:
+            self.replayed += saved
+            self.written += saved
+        if rest:
+            # 도중에 DB 가 안 되면 남은 행만 .replay 에 두고 다음에
+            with open(replay + ".tmp", "w", encoding="utf-8") as f:
+                f.writelines(_dump_row(r) + "\n" for r in rest)
+            os.replace(replay + ".tmp", replay)
+            return
+        os.remove(replay)
+
+    def _replay_rows(self, db: Session, rows: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """행마다 저장. (저장한 수, DB 가 안 돼서 못 넣은 나머지). 거부된 행은 <스필>.bad 로."""
+        saved = 0
+        bad: List[Dict[str, Any]] = []
+        rest: List[Dict[str, Any]] = []
+        for i, row in enumerate(rows):
+            try:
+                save_diary_logs(db, [row])
+                saved += 1
+            except Exception as e:
+                db.rollback()
+                if _db_unavailable(e):
+                    rest = rows[i:]
+                    break
+                logger.warning(f"[log-writer] spill row rejected, moving to {self.spill_path}.bad: {e}")
+                bad.append(row)
+        if bad:
+            with open(self.spill_path + ".bad", "a", encoding="utf-8") as f:
+                f.writelines(_dump_row(r) + "\n" for r in bad)
+            with self._stats_lock:
+                self.bad_lines += len(bad)
+        return saved, rest
+
+    # -----------------------------
+    # flush / 종료 / 통계
+    # -----------------------------
+    def _wait_overflow(self, timeout: Optional[float]) -> None:
+        # overflow 스레드는 하나라 빈 작업이 끝나면 그 앞의 스필/직접 저장도 끝난 것
+        pool = self._overflow
+        if pool is not None:
+            pool.submit(lambda: None).result(timeout)
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """지금까지 submit 한 행이 저장(또는 스필)될 때까지 기다린다."""
+        self._wait_overflow(timeout)
+        if self._thread is None or not self._thread.is_alive():
+            return self._q.empty()
+        marker = _Flush()
+        self._q.put(marker, timeout=timeout)
+        return marker.event.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """남은 행을 다 저장하고 워커를 멈춘다 (앱 종료 시)."""
+        self._wait_overflow(timeout)
+        t = self._thread
+        if t is None or not t.is_alive():
+            return
+        self._q.put(None, timeout=timeout)
+        t.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "queued": self._q.qsize(),
+                "queue_max": self._q.maxsize,
+                "submitted": self.submitted,
+                "written": self.written,
+                "batches": self.batches,
+                "avg_batch": round(self._batched_rows / self.batches, 1) if self.batches else 0.0,
+                "avg_write_ms": round(self._write_ms / self.batches, 2) if self.batches else 0.0,
+                "failed_batches": self.failed_batches,
+                "spilled": self.spilled,
+                "replayed": self.replayed,
+                "overflow": self.overflow,
+                "dropped": self.dropped,
+                "bad_lines": self.bad_lines,
+            }
+
+
+log_writer = LogWriter()
@@ -1,7 +1,13 @@
 # api/main.py
 
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,6 +16,11 @@ load_dotenv()
 # 🧱 Middleware
 # -------------------------
 from .middleware import RequestContextMiddleware, ApiKeyMiddleware
+from .readiness import Readiness, register_default_warmups
+from diary_replier.llm_providers.registry import registry as llm_registry
+from .log_writer import log_writer
+
+logger = logging.getLogger("app")
 
 # -------------------------
 # 📚 기존 라우터
@@ -23,12 +34,42 @@ from .routers.picture_diary_router import router as picture_diary_router  # ✅
 from src.routers.chat_to_diary import router as chat_diary_router
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 첫 요청이 모델 로드 비용을 떠안지 않도록 기동 직후 백그라운드에서 워밍업
+    preconnect = None
+    if os.getenv("WARMUP_ON_STARTUP", "1") == "1":
+        app.state.readiness.start_background()
+        if os.getenv("WARMUP_LLM", "1") == "1":
+            # async 라우트가 쓰는 비동기 풀도 미리 연결 (실패해도 요청 시 새로 연결하면 됨)
+            preconnect = asyncio.create_task(_apreconnect())
+    yield
+    if preconnect is not None and not preconnect.done():
+        preconnect.cancel()
+    # LLM 풀은 닫지 않는다: 레지스트리(프로세스 싱글턴)가 갖고, 모듈들이 import 때 받은 클라이언트를 계속 쓴다
+    # (TestClient / 앱 재기동 뒤에도 같은 프로세스에서 호출이 이어지므로)
+    # 큐에 남은 로그 행을 다 저장하고 종료
+    await asyncio.to_thread(log_writer.close)
+
+
+async def _apreconnect():
+    try:
+        await llm_registry.apreconnect()
+    except Exception as e:
+        logger.warning(f"[warmup] async llm pool preconnect failed: {e}")
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="Diary Replier + Chat + 그림일기 DEV",
         version="0.1.0",
+        lifespan=lifespan,
     )
 
+    app.state.readiness = Readiness()
+    if os.getenv("WARMUP_ON_STARTUP", "1") == "1":
+        register_default_warmups(app.state.readiness, warm_llm=os.getenv("WARMUP_LLM", "1") == "1")
+
     origins = [
         "http://54.79.20.218:8000",
         "http://13.209.35.235:8080",
@@ -56,6 +97,12 @@ def create_app() -> FastAPI:
     def health():
         return {"ok": True}
 
+    @app.get("/ready")
+    def ready():
+        # /health 는 프로세스 생존 여부, /ready 는 워밍업 완료 여부 (LB 라우팅용)
+        snap = app.state.readiness.snapshot()
+        return JSONResponse(snap, status_code=200 if snap["ready"] else 503)
+
     return app
 
 
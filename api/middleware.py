@@ -29,8 +29,8 @@ class RequestContextMiddleware(BaseHTTPMiddleware):
 class ApiKeyMiddleware(BaseHTTPMiddleware):
     """내부 API 키 인증 미들웨어"""
     async def dispatch(self, request: Request, call_next):
-        # /docs, /openapi, /health 는 무조건 허용
-        if request.url.path.startswith(("/docs", "/openapi", "/health")):
+        # /docs, /openapi, /health, /ready 는 무조건 허용
+        if request.url.path.startswith(("/docs", "/openapi", "/health", "/ready")):
             return await call_next(request)
 
         # .env에 INTERNAL_API_KEY가 지정되어 있으면 헤더 확인
@@ -1,29 +1,51 @@
 import os, json, time
-from datetime import datetime
-from typing import Optional, Dict, Any
+from datetime import date, datetime
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 
 from sqlalchemy import (
-    create_engine, Column, Integer, String, DateTime, Boolean, Text
+    JSON, BigInteger, Column, Date, Index, Integer, String, DateTime, Boolean, Text, exists, func, inspect, insert, select, type_coerce,
+    update, text as sql_text
 )
-from sqlalchemy.dialects.sqlite import JSON as SQLITE_JSON
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
 
+from api.storage import async_url, create_async_db_engine, create_db_engine
+
 DB_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+# 라우터용 비동기 드라이버 URL (기본: DATABASE_URL 의 드라이버만 aiosqlite / asyncpg 로)
+DB_ASYNC_URL = os.getenv("DATABASE_ASYNC_URL") or async_url(DB_URL)
 
-engine = create_engine(
-    DB_URL,
-    connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
-)
+# 방언별 프로필 (SQLite WAL/PRAGMA, 그 외 풀 크기/recycle/pre-ping) 은 api/storage.py
+# 동기 엔진: 스키마 생성 / 로그 저장 워커 스레드 / 스크립트, 비동기 엔진: 라우터와 async 파이프라인
+engine = create_db_engine(DB_URL)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+async_engine = create_async_db_engine(DB_ASYNC_URL)
+# commit 뒤에도 속성을 다시 읽지 않게 (비동기 세션은 지연 로딩 불가)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
+# 방언 기본 JSON (SQLite/MySQL JSON, Postgres 는 JSONB). 드라이버가 직렬화하므로 json.dumps 하지 않는다
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 class DiaryLog(Base):
     __tablename__ = "diary_logs"
+    __table_args__ = (
+        # /diary/logs 키셋 페이지: WHERE user_id = ? AND id < ? ORDER BY id DESC (user_id 단독 조회도 커버)
+        Index("ix_diary_logs_user_id_id", "user_id", "id"),
+        # 기간 조건 ("이번 달", 롤업/보관 작업)
+        Index("ix_diary_logs_user_id_ts", "user_id", "ts"),
+        # 월 파티션 단위 보관 작업 (api/archive.py) 과 사용자 없는 기간 조회
+        Index("ix_diary_logs_ts", "ts"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     ts = Column(DateTime, default=datetime.utcnow, nullable=False)
 
-    user_id = Column(String(128), index=True, nullable=True)
+    user_id = Column(String(128), nullable=True)
     preset_used = Column(String(32), nullable=True)
     mood_hint = Column(String(64), nullable=True)
 
@@ -32,15 +54,30 @@ class DiaryLog(Base):
     reply_normal = Column(Text, nullable=False)
 
     valence = Column(String(16), nullable=True)
-    emotions = Column(SQLITE_JSON if DB_URL.startswith("sqlite") else Text, nullable=True)
-    keywords = Column(SQLITE_JSON if DB_URL.startswith("sqlite") else Text, nullable=True)
+    emotions = Column(JSONType, nullable=True)
+    keywords = Column(JSONType, nullable=True)
     summary = Column(Text, nullable=True)
 
     safety_flag = Column(Boolean, default=False)
-    flags = Column(SQLITE_JSON if DB_URL.startswith("sqlite") else Text, nullable=True)
+    flags = Column(JSONType, nullable=True)
 
     latency_ms = Column(Integer, default=0)
 
+    # LLM 토큰 사용량 (캐시 hit / 요청 합치기로 LLM 을 안 부른 행은 NULL)
+    input_tokens = Column(Integer, nullable=True)
+    cached_tokens = Column(Integer, nullable=True)
+
+# 감정 필터: Postgres 는 emotions @> '["sad"]' 를 GIN(jsonb_path_ops) 으로 (다른 방언엔 만들지 않음)
+Index(
+    "ix_diary_logs_emotions_gin", DiaryLog.emotions,
+    postgresql_using="gin", postgresql_ops={"emotions": "jsonb_path_ops"},
+).ddl_if(dialect="postgresql")
+# 안전 플래그가 선 로그만 담는 부분 인덱스 (대부분의 행은 False 라 작다)
+Index(
+    "ix_diary_logs_user_id_flagged", DiaryLog.user_id, DiaryLog.id,
+    sqlite_where=DiaryLog.safety_flag.is_(True), postgresql_where=DiaryLog.safety_flag.is_(True),
+).ddl_if(dialect=("sqlite", "postgresql"))
+
 class UserPreset(Base):
     __tablename__ = "user_presets"
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -48,12 +85,148 @@ class UserPreset(Base):
     preset = Column(String(32), nullable=False, default="warm")
     mood_default = Column(String(64), nullable=True)
 
+class DailyRollup(Base):
+    # 사용자·일(UTC) 단위 집계. 로그 저장과 같은 트랜잭션에서 value 를 더해 가고, /diary/trends 는 이것만 읽는다
+    __tablename__ = "diary_daily_rollups"
+    user_id = Column(String(128), primary_key=True)
+    day = Column(Date, primary_key=True)
+    # logs | safety_hits | latency_ms | emotion:<코드> | valence:<positive/negative/neutral>
+    metric = Column(String(96), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+class LogArchive(Base):
+    # diary_logs 에서 보관 파일로 옮긴 월 파티션 (api/archive.py). id 범위로 조회할 파일을 고른다
+    __tablename__ = "diary_log_archives"
+    month = Column(String(7), primary_key=True)  # YYYY-MM (ts 기준, UTC)
+    path = Column(String(255), nullable=False)  # ARCHIVE_DIR 기준 파일명
+    rows = Column(Integer, nullable=False, default=0)
+    min_id = Column(Integer, nullable=True)
+    max_id = Column(Integer, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class CacheVersion(Base):
+    # 워커 간 캐시 무효화용 카운터 (name 별로 값이 바뀌면 각 워커가 로컬 캐시를 비운다)
+    __tablename__ = "cache_versions"
+    name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
 Base.metadata.create_all(bind=engine)
 
+def _ensure_columns() -> None:
+    """
+    create_all 은 기존 테이블에 컬럼을 추가하지 않으므로,
+    나중에 추가된 nullable 컬럼은 여기서 ALTER TABLE ADD COLUMN 으로 채운다.
+    """
+    insp = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in existing or not col.nullable:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(engine.dialect)}"
+            with engine.begin() as conn:
+                conn.execute(sql_text(ddl))
+
+_ensure_columns()
+
+JSON_COLUMNS = ("emotions", "keywords", "flags")
+
+def _ensure_json_columns() -> None:
+    """
+    예전 스키마는 SQLite 가 아니면 emotions/keywords/flags 를 json.dumps 한 TEXT 로 만들었다.
+    그런 컬럼은 한 번만 네이티브 타입으로 바꾼다 (Postgres JSONB, MySQL JSON; 저장된 문자열은 그대로 파싱됨).
+    """
+    dialect = engine.dialect.name
+    if dialect not in ("postgresql", "mysql"):
+        return
+    insp = inspect(engine)
+    if not insp.has_table(DiaryLog.__tablename__):
+        return
+    for col in insp.get_columns(DiaryLog.__tablename__):
+        if col["name"] not in JSON_COLUMNS or not isinstance(col["type"], String):
+            continue
+        name = col["name"]
+        if dialect == "postgresql":
+            ddl = f"ALTER TABLE diary_logs ALTER COLUMN {name} TYPE JSONB USING {name}::jsonb"
+        else:
+            ddl = f"ALTER TABLE diary_logs MODIFY {name} JSON NULL"
+        with engine.begin() as conn:
+            conn.execute(sql_text(ddl))
+
+# GIN 인덱스보다 먼저 (TEXT 컬럼엔 만들 수 없음)
+_ensure_json_columns()
+
+def _ensure_indexes() -> None:
+    """create_all 은 기존 테이블에 인덱스도 추가하지 않으므로, 빠진 인덱스는 여기서 만든다."""
+    insp = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+        for ix in table.indexes:
+            if ix.name not in existing:
+                ix.create(bind=engine, checkfirst=True)
+
+_ensure_indexes()
+
+def _ensure_cache_versions(*names: str) -> None:
+    # 버전 행을 미리 만들어 두면 bump 는 UPDATE 한 번 (첫 저장끼리 INSERT 가 겹치지 않음)
+    with SessionLocal() as db:
+        for name in names:
+            if db.get(CacheVersion, name) is None:
+                db.add(CacheVersion(name=name, version=0))
+                try:
+                    db.commit()
+                except IntegrityError:  # 다른 워커가 먼저 만듦
+                    db.rollback()
+
+PRESET_CACHE_NAME = "user_presets"  # api.preset_cache 의 버전 카운터 이름
+
+_ensure_cache_versions(PRESET_CACHE_NAME)
+
 def get_session() -> Session:
+    # 호출한 쪽이 닫는다. 라우터는 api.routers.deps.get_db (비동기, 요청마다 자동으로 닫힘)
     return SessionLocal()
 
 # 저장 유틸
+def diary_log_values(
+    *,
+    user_id: Optional[str],
+    preset_used: Optional[str],
+    mood_hint: Optional[str],
+    text: str,
+    reply_short: str,
+    reply_normal: str,
+    analysis: Dict[str, Any],
+    safety_flag: bool,
+    flags: Dict[str, Any],
+    latency_ms: int,
+    input_tokens: Optional[int] = None,
+    cached_tokens: Optional[int] = None,
+    ts: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """save_diary_log 인자 → diary_logs 컬럼 값 (단건/배치 저장 공용)."""
+    return dict(
+        ts=ts or datetime.utcnow(),
+        user_id=user_id,
+        preset_used=preset_used,
+        mood_hint=mood_hint,
+        text=text,
+        reply_short=reply_short,
+        reply_normal=reply_normal,
+        valence=analysis.get("valence"),
+        emotions=analysis.get("emotions"),
+        keywords=analysis.get("keywords"),
+        summary=analysis.get("summary"),
+        safety_flag=safety_flag,
+        flags=flags,
+        latency_ms=latency_ms,
+        input_tokens=input_tokens,
+        cached_tokens=cached_tokens,
+    )
+
 def save_diary_log(
     db: Session,
     *,
@@ -66,36 +239,230 @@ def save_diary_log(
     analysis: Dict[str, Any],
     safety_flag: bool,
     flags: Dict[str, Any],
-    latency_ms: int
+    latency_ms: int,
+    input_tokens: Optional[int] = None,
+    cached_tokens: Optional[int] = None,
+    ts: Optional[datetime] = None,
 ) -> int:
-    # sqlite가 아니면 JSON을 문자열로 저장
-    def _maybe_dump(v):
-        if DB_URL.startswith("sqlite"):
-            return v
-        return json.dumps(v, ensure_ascii=False)
-
-    row = DiaryLog(
+    values = diary_log_values(
         user_id=user_id,
         preset_used=preset_used,
         mood_hint=mood_hint,
         text=text,
         reply_short=reply_short,
         reply_normal=reply_normal,
-        valence=analysis.get("valence"),
-        emotions=_maybe_dump(analysis.get("emotions")),
-        keywords=_maybe_dump(analysis.get("keywords")),
-        summary=analysis.get("summary"),
+        analysis=analysis,
         safety_flag=safety_flag,
-        flags=_maybe_dump(flags),
+        flags=flags,
         latency_ms=latency_ms,
+        input_tokens=input_tokens,
+        cached_tokens=cached_tokens,
+        ts=ts,
     )
+    row = DiaryLog(**values)
     db.add(row)
+    add_rollups(db, [values])
     db.commit()
     db.refresh(row)
     return row.id
 
+def save_diary_logs(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """여러 행을 INSERT 한 번(executemany) + commit 한 번으로. 저장한 행 수."""
+    if not rows:
+        return 0
+    values = [diary_log_values(**r) for r in rows]
+    db.execute(insert(DiaryLog), values)
+    add_rollups(db, values)
+    db.commit()
+    return len(rows)
+
+# -------------------------
+# 일별 롤업 (diary_daily_rollups)
+# -------------------------
+def rollup_deltas(rows: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, date, str], int]:
+    """
+    로그 행(diary_log_values 결과 또는 같은 키의 SELECT 행) → {(user_id, day, metric): 더할 값}.
+    user_id 가 없는 (익명) 로그는 사용자별 추이에 안 쓰이므로 집계하지 않는다.
+    """
+    out: Dict[Tuple[str, date, str], int] = {}
+
+    def add(key: Tuple[str, date, str], n: int) -> None:
+        out[key] = out.get(key, 0) + n
+
+    for r in rows:
+        uid = r.get("user_id")
+        if not uid:
+            continue
+        day = r["ts"].date()
+        add((uid, day, "logs"), 1)
+        add((uid, day, "latency_ms"), int(r.get("latency_ms") or 0))
+        if r.get("safety_flag"):
+            add((uid, day, "safety_hits"), 1)
+        if r.get("valence"):
+            add((uid, day, f"valence:{r['valence']}"), 1)
+        for emo in dict.fromkeys(r.get("emotions") or ()):
+            add((uid, day, f"emotion:{emo}"), 1)
+    return out
+
+def _rollup_upsert_stmt(dialect: str):
+    """value = value + excluded.value 로 더하는 upsert (동시에 같은 키를 써도 잃지 않음). 미지원 방언은 None."""
+    if dialect in _UPSERT_INSERT:
+        ins = _UPSERT_INSERT[dialect](DailyRollup)
+        return ins.on_conflict_do_update(
+            index_elements=[DailyRollup.user_id, DailyRollup.day, DailyRollup.metric],
+            set_={"value": DailyRollup.value + ins.excluded.value},
+        )
+    if dialect == "mysql":
+        ins = mysql_insert(DailyRollup)
+        return ins.on_duplicate_key_update(value=DailyRollup.value + ins.inserted.value)
+    return None
+
+def _rollup_params(deltas: Dict[Tuple[str, date, str], int]) -> List[Dict[str, Any]]:
+    # 키 순서를 고정해 두면 동시에 도는 트랜잭션끼리 행 잠금 순서가 같다 (Postgres 데드락 방지)
+    return [dict(user_id=u, day=d, metric=m, value=v) for (u, d, m), v in sorted(deltas.items())]
+
+def _rollup_key(p: Dict[str, Any]):
+    return (DailyRollup.user_id == p["user_id"]) & (DailyRollup.day == p["day"]) & (DailyRollup.metric == p["metric"])
+
+def add_rollups(db: Session, rows: Iterable[Dict[str, Any]]) -> None:
+    """rows 만큼 롤업에 더한다. commit 은 호출 쪽 (로그 INSERT 와 같은 트랜잭션)."""
+    params = _rollup_params(rollup_deltas(rows))
+    if not params:
+        return
+    stmt = _rollup_upsert_stmt(db.get_bind().dialect.name)
+    if stmt is not None:
+        db.execute(stmt, params)
+        return
+    for p in params:
+        if not db.execute(update(DailyRollup).where(_rollup_key(p)).values(value=DailyRollup.value + p["value"])).rowcount:
+            db.add(DailyRollup(**p))
+    db.flush()
+
+# -------------------------
+# 로그 필터 (JSON 을 파이썬에서 파싱하지 않고 DB 에서 판단)
+# -------------------------
+def has_emotion(dialect: str, emotion: str):
+    """emotions 배열에 emotion 이 들어 있는 행."""
+    if dialect == "postgresql":
+        # emotions @> '["sad"]' → ix_diary_logs_emotions_gin
+        return type_coerce(DiaryLog.emotions, JSONB).contains([emotion])
+    if dialect == "mysql":
+        return func.json_contains(DiaryLog.emotions, json.dumps(emotion, ensure_ascii=False)) == 1
+    # SQLite: 사용자/기간 인덱스로 좁힌 행에서 json_each 로 확인
+    each = func.json_each(DiaryLog.emotions).table_valued("value")
+    return exists(select(1).select_from(each).where(each.c.value == emotion))
+
+def is_flagged(flagged: bool):
+    """safety_flag 조건. True 쪽은 부분 인덱스 ix_diary_logs_user_id_flagged 와 같은 식이어야 인덱스를 탄다."""
+    return DiaryLog.safety_flag.is_(True) if flagged else DiaryLog.safety_flag.isnot(True)
+
 def get_user_preset(db: Session, user_id: Optional[str]) -> Optional[str]:
     if not user_id:
         return None
     up = db.query(UserPreset).filter(UserPreset.user_id == user_id).first()
     return up.preset if up else None
+
+def _settings_stmt(user_id: str):
+    return select(UserPreset.preset, UserPreset.mood_default).where(UserPreset.user_id == user_id)
+
+def _version_stmt(name: str):
+    return select(CacheVersion.version).where(CacheVersion.name == name)
+
+def _bump_stmt(name: str):
+    return update(CacheVersion).where(CacheVersion.name == name).values(version=CacheVersion.version + 1)
+
+_UPSERT_INSERT = {"sqlite": sqlite_insert, "postgresql": pg_insert}
+
+def _preset_upsert_stmt(dialect: str, user_id: str, preset: str, mood_default: Optional[str]):
+    """INSERT .. ON CONFLICT(user_id) DO UPDATE (동시에 같은 사용자를 처음 저장해도 UNIQUE 충돌 없음). 미지원 방언은 None."""
+    ins = _UPSERT_INSERT.get(dialect)
+    if ins is None:
+        return None
+    return ins(UserPreset).values(user_id=user_id, preset=preset, mood_default=mood_default).on_conflict_do_update(
+        index_elements=[UserPreset.user_id], set_={"preset": preset, "mood_default": mood_default}
+    )
+
+def get_user_settings(db: Session, user_id: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+    """(preset, mood_default) 를 SELECT 한 번으로. 저장된 게 없으면 None."""
+    if not user_id:
+        return None
+    row = db.execute(_settings_stmt(user_id)).first()
+    return (row.preset, row.mood_default) if row else None
+
+def get_cache_version(db: Session, name: str) -> int:
+    return db.execute(_version_stmt(name)).scalar() or 0
+
+def bump_cache_version(db: Session, name: str) -> int:
+    """name 의 버전을 +1 (commit 은 호출 쪽 트랜잭션에서). 새 버전을 돌려준다."""
+    if db.get_bind().dialect.update_returning:
+        # UPDATE .. RETURNING 한 번 (SQLite 3.35+, Postgres)
+        version = db.execute(_bump_stmt(name).returning(CacheVersion.version)).scalar()
+        if version is not None:
+            return version
+    elif db.execute(_bump_stmt(name)).rowcount:
+        return get_cache_version(db, name)
+    db.add(CacheVersion(name=name, version=1))
+    db.flush()
+    return 1
+
+# -------------------------
+# 비동기 (라우터 / async 파이프라인). 인자와 결과는 동기 버전과 같다
+# -------------------------
+async def save_diary_log_async(db: AsyncSession, **values: Any) -> int:
+    values = diary_log_values(**values)
+    row = DiaryLog(**values)
+    db.add(row)
+    await add_rollups_async(db, [values])
+    await db.commit()
+    return row.id
+
+async def add_rollups_async(db: AsyncSession, rows: Iterable[Dict[str, Any]]) -> None:
+    params = _rollup_params(rollup_deltas(rows))
+    if not params:
+        return
+    stmt = _rollup_upsert_stmt(async_engine.dialect.name)
+    if stmt is not None:
+        await db.execute(stmt, params)
+        return
+    for p in params:
+        result = await db.execute(update(DailyRollup).where(_rollup_key(p)).values(value=DailyRollup.value + p["value"]))
+        if not result.rowcount:
+            db.add(DailyRollup(**p))
+    await db.flush()
+
+async def get_user_preset_async(db: AsyncSession, user_id: Optional[str]) -> Optional[str]:
+    settings = await get_user_settings_async(db, user_id)
+    return settings[0] if settings else None
+
+async def get_user_settings_async(db: AsyncSession, user_id: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+    if not user_id:
+        return None
+    row = (await db.execute(_settings_stmt(user_id))).first()
+    return (row.preset, row.mood_default) if row else None
+
+async def get_cache_version_async(db: AsyncSession, name: str) -> int:
+    return (await db.execute(_version_stmt(name))).scalar() or 0
+
+async def upsert_user_preset_async(db: AsyncSession, user_id: str, preset: str, mood_default: Optional[str]) -> None:
+    """프리셋 저장 (commit 은 호출 쪽)."""
+    stmt = _preset_upsert_stmt(async_engine.dialect.name, user_id, preset, mood_default)
+    if stmt is not None:
+        await db.execute(stmt)
+        return
+    up = (await db.execute(select(UserPreset).where(UserPreset.user_id == user_id))).scalar_one_or_none()
+    if up is None:
+        db.add(UserPreset(user_id=user_id, preset=preset, mood_default=mood_default))
+    else:
+        up.preset = preset
+        up.mood_default = mood_default
+
+async def bump_cache_version_async(db: AsyncSession, name: str) -> int:
+    if async_engine.dialect.update_returning:
+        version = (await db.execute(_bump_stmt(name).returning(CacheVersion.version))).scalar()
+        if version is not None:
+            return version
+    elif (await db.execute(_bump_stmt(name))).rowcount:
+        return await get_cache_version_async(db, name)
+    db.add(CacheVersion(name=name, version=1))
+    await db.flush()
+    return 1
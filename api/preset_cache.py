@@ -0,0 +1,215 @@
+# api/preset_cache.py
+"""
+사용자 프리셋 / mood_default 캐시 (프로세스 내 TTL + LRU).
+
+user_id 가 있는 답장마다 user_presets 를 SELECT 하던 것을 캐시에서 꺼낸다.
+프리셋은 거의 안 바뀌므로:
+
+- 항목은 PRESET_CACHE_TTL 초 동안 유효, 최대 PRESET_CACHE_MAX 명 (오래 안 쓴 것부터 제거)
+- 저장된 프리셋이 없는 사용자도 "없음"으로 캐시 (대부분의 사용자가 여기에 해당)
+- POST /user/preset 은 같은 트랜잭션에서 cache_versions 의 버전을 올리고, 이 워커 캐시에는 새 값을 바로 넣는다
+- 다른 워커는 PRESET_VERSION_CHECK_S 초마다 버전을 한 번 읽어서 바뀌었으면 캐시를 통째로 비운다
+  (즉 다른 워커에 반영되기까지 최대 PRESET_VERSION_CHECK_S 초)
+
+    settings = preset_cache.get(db, user_id)          # UserSettings(preset, mood_default) 또는 None
+    settings = await preset_cache.aget(adb, user_id)  # 비동기 세션 (라우터 / async 파이프라인)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from api.models import (
+    PRESET_CACHE_NAME, get_cache_version, get_cache_version_async, get_user_settings, get_user_settings_async
+)
+
+PRESET_CACHE_TTL = float(os.getenv("PRESET_CACHE_TTL", "300"))  # 0이면 캐시 끔
+PRESET_CACHE_MAX = int(os.getenv("PRESET_CACHE_MAX", "10000"))
+PRESET_VERSION_CHECK_S = float(os.getenv("PRESET_VERSION_CHECK_S", "1"))
+
+CACHE_NAME = PRESET_CACHE_NAME
+
+logger = logging.getLogger("app")
+
+
+class UserSettings(NamedTuple):
+    preset: str
+    mood_default: Optional[str]
+
+
+def _settings(row: Optional[Tuple[str, Optional[str]]]) -> Optional[UserSettings]:
+    return UserSettings(*row) if row else None
+
+
+class PresetCache:
+    def __init__(
+        self,
+        ttl: float = PRESET_CACHE_TTL,
+        maxsize: int = PRESET_CACHE_MAX,
+        version_check_s: float = PRESET_VERSION_CHECK_S,
+        loader: Callable[[Session, str], Optional[Tuple[str, Optional[str]]]] = get_user_settings,
+        aloader: Callable[[AsyncSession, str], Awaitable[Optional[Tuple[str, Optional[str]]]]] = get_user_settings_async,
+    ):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.version_check_s = version_check_s
+        self.loader = loader
+        self.aloader = aloader
+        self._data: "OrderedDict[str, Tuple[float, Optional[UserSettings]]]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        # 저장/무효화마다 +1. miss 로 읽는 동안 바뀌었으면 읽은 (옛) 값을 넣지 않는다
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.version_checks = 0
+        self.stale_skips = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    # -----------------------------
+    # 조회
+    # -----------------------------
+    def get(self, db: Session, user_id: Optional[str]) -> Optional[UserSettings]:
+        if not user_id:
+            return None
+        if not self.enabled:
+            return _settings(self.loader(db, user_id))
+        if self._version_due():
+            try:
+                self._apply_version(get_cache_version(db, CACHE_NAME))
+            except Exception as e:
+                # 확인 못 하면 TTL 에 맡긴다
+                logger.warning(f"[preset-cache] version check failed: {e}")
+        hit, value, gen = self._lookup(user_id)
+        if hit:
+            return value
+        value = _settings(self.loader(db, user_id))
+        self._put(user_id, value, gen)
+        return value
+
+    async def aget(self, db: AsyncSession, user_id: Optional[str]) -> Optional[UserSettings]:
+        if not user_id:
+            return None
+        if not self.enabled:
+            return _settings(await self.aloader(db, user_id))
+        if self._version_due():
+            try:
+                self._apply_version(await get_cache_version_async(db, CACHE_NAME))
+            except Exception as e:
+                logger.warning(f"[preset-cache] version check failed: {e}")
+        hit, value, gen = self._lookup(user_id)
+        if hit:
+            return value
+        value = _settings(await self.aloader(db, user_id))
+        self._put(user_id, value, gen)
+        return value
+
+    def _lookup(self, user_id: str) -> Tuple[bool, Optional[UserSettings], int]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(user_id)
+                self.hits += 1
+                return True, entry[1], self._generation
+            self.misses += 1
+            return False, None, self._generation
+
+    def _put(self, user_id: str, value: Optional[UserSettings], gen: Optional[int] = None) -> None:
+        """gen: miss 때의 세대. 그 사이 written()/invalidate 가 있었으면 넣지 않는다."""
+        with self._lock:
+            if gen is not None and gen != self._generation:
+                self.stale_skips += 1
+                return
+            self._data[user_id] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _version_due(self) -> bool:
+        # 다른 워커가 프리셋을 바꿨는지 (버전 카운터) 주기적으로만 확인
+        now = time.monotonic()
+        if now - self._checked_at < self.version_check_s:
+            return False
+        self._checked_at = now
+        return True
+
+    def _apply_version(self, version: int) -> None:
+        with self._lock:
+            self.version_checks += 1
+            if self._version is not None and version != self._version:
+                self._clear_locked()
+            self._version = version
+
+    # -----------------------------
+    # 무효화 (쓰기 쪽)
+    # -----------------------------
+    def written(self, user_id: str, settings: UserSettings, version: int) -> None:
+        """
+        이 워커에서 프리셋을 저장한 직후 (write-through).
+        version 이 아는 버전의 바로 다음이면 다른 워커의 변경은 없었으니 새 값만 넣고,
+        아니면 그 사이 다른 변경이 있었으므로 전부 비운다.
+        """
+        with self._lock:
+            if self._version is not None and version != self._version + 1:
+                self._clear_locked()
+            self._generation += 1
+            self._version = version
+            self._checked_at = time.monotonic()
+        if self.enabled:
+            self._put(user_id, settings)
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._clear_locked()
+            elif self._data.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def _clear_locked(self) -> None:
+        self._generation += 1
+        if self._data:
+            self.invalidations += 1
+        self._data.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+            self._version = None
+            self._checked_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "version_checks": self.version_checks,
+                "stale_skips": self.stale_skips,
+            }
+
+
+preset_cache = PresetCache()
@@ -0,0 +1,118 @@
+# api/readiness.py
+"""
+기동 직후 모델/클라이언트 워밍업과 /ready 상태 관리.
+
+- 컴포넌트마다 warm 함수를 등록하고, 앱 시작 시 백그라운드 스레드에서 순서대로 실행
+- 각 컴포넌트의 상태(pending/loading/ready/disabled/error)와 소요 시간을 기록
+- required 컴포넌트가 전부 ready/disabled 일 때만 /ready 가 200 → LB 는 워밍업 끝난 워커로만 라우팅
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("app")
+
+# warm 함수가 이 값을 돌려주면 "설정상 사용 안 함" (예: EMO_MODEL 미지정)
+DISABLED = "disabled"
+
+
+class Component:
+    def __init__(self, name: str, warm: Callable[[], Optional[str]], required: bool):
+        self.name = name
+        self.warm = warm
+        self.required = required
+        self.status = "pending"
+        self.load_ms: Optional[int] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ("ready", DISABLED)
+
+    def to_dict(self) -> Dict:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "load_ms": self.load_ms,
+            "error": self.error,
+        }
+
+
+class Readiness:
+    def __init__(self):
+        self._components: List[Component] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, warm: Callable[[], Optional[str]], *, required: bool = True) -> None:
+        with self._lock:
+            self._components.append(Component(name, warm, required))
+
+    def run(self) -> None:
+        """등록된 warm 함수를 순서대로 실행 (한 컴포넌트 실패가 나머지를 막지 않음)."""
+        for c in list(self._components):
+            c.status = "loading"
+            t0 = time.perf_counter()
+            try:
+                res = c.warm()
+                c.status = DISABLED if res == DISABLED else "ready"
+            except Exception as e:
+                c.status = "error"
+                c.error = str(e)[:300]
+                logger.warning(f"[warmup] {c.name} failed: {e}")
+            c.load_ms = int((time.perf_counter() - t0) * 1000)
+            logger.info(f"[warmup] {c.name} {c.status} {c.load_ms}ms")
+
+    def start_background(self) -> threading.Thread:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def is_ready(self) -> bool:
+        return all(c.ok for c in self._components if c.required)
+
+    def snapshot(self) -> Dict:
+        return {
+            "ready": self.is_ready(),
+            "components": {c.name: c.to_dict() for c in self._components},
+        }
+
+
+# -----------------------------
+# 기본 워밍업 대상
+# -----------------------------
+def _warm_analyzer() -> None:
+    from diary_replier.analyzer import analyze
+    from diary_replier.guard import safety_scan
+    text = "워밍업: 오늘은 조금 피곤했지만 뿌듯한 하루였다."
+    analyze(text)
+    safety_scan(text)
+
+
+def _warm_emo_model() -> Optional[str]:
+    from diary_replier import analyzer_hf
+    if not analyzer_hf._EMO_MODEL:
+        return DISABLED
+    if not analyzer_hf.available():
+        raise RuntimeError(analyzer_hf._err or "EMO_MODEL load failed")
+    analyzer_hf.predict_emotions("워밍업: 오늘은 조금 피곤했지만 뿌듯한 하루였다.", topk=1)
+    return None
+
+
+def _warm_llm_clients() -> None:
+    # 일기/chat-to-diary/그림일기가 공유하는 동기 풀에 keep-alive 연결(TLS 포함)을 미리 연다.
+    # (비동기 풀은 이벤트 루프가 필요해서 lifespan 에서 apreconnect)
+    from diary_replier.llm_providers.registry import registry
+    registry.preconnect()
+
+
+def register_default_warmups(readiness: Readiness, *, warm_llm: bool = True) -> None:
+    readiness.register("analyzer", _warm_analyzer)
+    readiness.register("emo_model", _warm_emo_model)
+    if warm_llm:
+        # LLM 연결 실패는 요청 시 재시도로 복구 가능하니 readiness 를 막지 않는다
+        readiness.register("llm_clients", _warm_llm_clients, required=False)
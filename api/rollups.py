@@ -0,0 +1,136 @@
+# api/rollups.py
+"""
+일별 롤업(diary_daily_rollups) 재집계와 주/월 추이.
+
+롤업은 로그를 저장할 때 같은 트랜잭션에서 더해진다 (api.models.add_rollups).
+여기는 그걸 읽고 다시 만드는 쪽:
+
+- rebuild_rollups : diary_logs 에서 다시 집계 (처음 도입할 때 백필, 어긋났을 때). scripts/rebuild_rollups.py
+- trend_buckets   : 주(월요일 시작) / 월 버킷 경계
+- summarize       : 롤업 행 → 버킷별 로그 수 / 감정·valence 분포 / 안전 플래그 / 평균 지연
+
+/diary/trends 는 버킷당 (일수 × 지표 수) 행만 읽으므로 기록이 쌓여도 비용이 같다.
+"""
+
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from api.archive import archive_reader, month_range
+from api.models import DailyRollup, DiaryLog, LogArchive, add_rollups
+
+_ROLLUP_SOURCE = (
+    DiaryLog.user_id, DiaryLog.ts, DiaryLog.valence, DiaryLog.emotions, DiaryLog.safety_flag, DiaryLog.latency_ms,
+)
+
+
+# -----------------------------
+# 재집계
+# -----------------------------
+def rebuild_rollups(
+    db: Session, user_id: Optional[str] = None, since: Optional[date] = None, chunk: int = 5000
+) -> int:
+    """
+    범위(user_id / since 부터)의 롤업을 지우고 diary_logs 와 보관된 달(api.archive)에서 다시 쌓는다. 읽은 로그 수.
+    지우기와 다시 쌓기는 한 트랜잭션 (commit 은 호출 쪽). hot 로그는 chunk 개씩 스트리밍, 보관 파일은 달 단위.
+    """
+    d = delete(DailyRollup)
+    q = select(*_ROLLUP_SOURCE).where(DiaryLog.user_id.isnot(None))
+    if user_id:
+        d = d.where(DailyRollup.user_id == user_id)
+        q = q.where(DiaryLog.user_id == user_id)
+    if since:
+        d = d.where(DailyRollup.day >= since)
+        q = q.where(DiaryLog.ts >= datetime.combine(since, dtime.min))
+    db.execute(d)
+
+    n = 0
+    for part in db.execute(q.execution_options(yield_per=chunk)).partitions():
+        rows = [r._asdict() for r in part]
+        add_rollups(db, rows)
+        n += len(rows)
+
+    # 보관 작업이 hot 에서 지운 달
+    for entry in db.execute(select(LogArchive)).scalars().all():
+        if since and month_range(entry.month)[1] <= datetime.combine(since, dtime.min):
+            continue
+        rows = [r._asdict() for r in archive_reader.execute(entry.month, entry.path, q)]
+        add_rollups(db, rows)
+        n += len(rows)
+    return n
+
+
+# -----------------------------
+# 추이
+# -----------------------------
+def bucket_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _next_start(start: date, period: str) -> date:
+    if period == "week":
+        return start + timedelta(days=7)
+    return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def _prev_start(start: date, period: str) -> date:
+    if period == "week":
+        return start - timedelta(days=7)
+    return bucket_start(start - timedelta(days=1), "month")
+
+
+def trend_buckets(period: str, buckets: int, until: date) -> List[Tuple[date, date]]:
+    """until 이 들어 있는 버킷까지 최근 buckets 개의 [start, end) (오래된 것부터)."""
+    start = bucket_start(until, period)
+    out = []
+    for _ in range(buckets):
+        out.append((start, _next_start(start, period)))
+        start = _prev_start(start, period)
+    return out[::-1]
+
+
+def trend_query(user_id: str, start: date, end: date):
+    # PK (user_id, day, metric) 범위 스캔
+    return select(DailyRollup.day, DailyRollup.metric, DailyRollup.value).where(
+        DailyRollup.user_id == user_id, DailyRollup.day >= start, DailyRollup.day < end
+    )
+
+
+def _sorted_counts(counts: Dict[str, int]) -> Dict[str, int]:
+    return dict(sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])))
+
+
+def summarize(rows: Iterable[Any], spans: List[Tuple[date, date]]) -> List[Dict[str, Any]]:
+    """(day, metric, value) 행 → 버킷별 요약 (spans 순서, 로그가 없는 버킷도 0 으로)."""
+    acc = [{"logs": 0, "safety_hits": 0, "latency_ms": 0, "emotion": {}, "valence": {}} for _ in spans]
+    slot: Dict[date, Optional[int]] = {}  # 행마다 버킷을 찾지 않게 날짜별로 한 번
+    for day, metric, value in rows:
+        if day not in slot:
+            slot[day] = next((k for k, (s, e) in enumerate(spans) if s <= day < e), None)
+        i = slot[day]
+        if i is None:
+            continue
+        kind, _, code = metric.partition(":")
+        if kind not in acc[i]:
+            continue
+        if code:
+            acc[i][kind][code] = acc[i][kind].get(code, 0) + value
+        else:
+            acc[i][kind] += value
+
+    out = []
+    for (start, end), a in zip(spans, acc):
+        out.append({
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "logs": a["logs"],
+            "safety_hits": a["safety_hits"],
+            "avg_latency_ms": round(a["latency_ms"] / a["logs"], 1) if a["logs"] else None,
+            "valence": _sorted_counts(a["valence"]),
+            "emotions": _sorted_counts(a["emotion"]),
+        })
+    return out
@@ -1,13 +1,14 @@
+from typing import AsyncIterator
+
 from fastapi import Header
-from sqlalchemy.orm import Session
-from api.models import get_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.models import AsyncSessionLocal
 
-def get_db():
-    db = get_session()
-    try:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    # 요청 하나에 세션 하나. 연결은 쿼리할 때만 잡고 (파이프라인은 프리셋 조회 직후 닫는다),
+    # 응답 뒤(예외가 나도) 항상 닫아서 풀에 돌려준다
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 class UserCtx:
     def __init__(self, user_id: str | None, preset_override: str | None):
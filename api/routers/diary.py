@@ -1,53 +1,284 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+import asyncio
+import json
+import logging
+from datetime import date, datetime, timezone
+from typing import Literal
 
-from diary_replier.schemas import DiaryInput, DiaryReplyOutput
-from diary_replier.pipeline import run_pipeline_with_logging
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from diary_replier.schemas import (
+    DiaryInput, DiaryReplyOutput, DiaryBatchInput, DiaryBatchOutput, DiaryAnalysisOutput
+)
+from diary_replier.pipeline import (
+    run_pipeline_with_logging_async, stream_pipeline_with_logging, reply_flight, reply_degraded
+)
+from diary_replier.analyzer import analyze_many
+from diary_replier.features import extract_features_many
+from diary_replier.guard import safety_scan
+from diary_replier.reply_cache import reply_cache, reply_cache_status
+from diary_replier.singleflight import coalesced
+from diary_replier.stages import server_timing, stage_timings
+from diary_replier import analyzer, analyzer_hf, generator, metrics
+from diary_replier.compaction import compaction_stats
+from diary_replier.llm_providers.registry import registry as llm_registry
 from api.routers.deps import get_db, get_user_ctx, UserCtx
-from api.models import DiaryLog
+from api.models import DiaryLog, LogArchive, async_engine, engine, has_emotion, is_flagged
+from api.storage import engine_stats
+from api.archive import archive_reader, month_range
+from api.log_writer import log_writer
+from api.rollups import summarize, trend_buckets, trend_query
+from api.preset_cache import preset_cache
 
 router = APIRouter(
     prefix="/diary",
     tags=["diary"],
 )
+logger = logging.getLogger("app")
 
 
 @router.post("/reply", response_model=DiaryReplyOutput)
-def make_reply(
+async def make_reply(
     body: DiaryInput,
-    db: Session = Depends(get_db),
+    response: Response,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
     user_ctx: UserCtx = Depends(get_user_ctx),
 ):
-    return run_pipeline_with_logging(
+    # LLM 호출을 await 하는 동안 워커 스레드를 점유하지 않는다
+    reply_cache_status.set(None)
+    coalesced.set(False)
+    reply_degraded.set(False)
+    stage_timings.set(None)
+    out = await run_pipeline_with_logging_async(
         body,
         user_id=user_ctx.user_id,
         preset_override=user_ctx.preset_override,
         db=db,
+        after_response=background_tasks.add_task,  # 로그 저장은 응답을 보낸 뒤
     )
+    # 답장 캐시 사용 여부: hit / miss / bypass
+    response.headers["X-Reply-Cache"] = reply_cache_status.get() or "bypass"
+    if coalesced.get():
+        # 동시에 들어온 동일 요청의 LLM 결과를 공유함 (로그 행은 요청마다 따로 저장)
+        response.headers["X-Coalesced"] = "1"
+    if reply_degraded.get():
+        # LLM 서킷이 열려 있어 기본 답장으로 응답함
+        response.headers["X-Degraded"] = "1"
+    timings = stage_timings.get()
+    if timings:
+        # 단계별 소요(ms) — 브라우저/프록시에서 임계 경로 확인용
+        response.headers["Server-Timing"] = server_timing(timings)
+    return out
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/reply/stream")
+async def make_reply_stream(
+    body: DiaryInput,
+    user_ctx: UserCtx = Depends(get_user_ctx),
+):
+    """
+    /diary/reply 의 SSE 버전. meta(분석/안전 플래그) → delta... → reply_short → reply_normal → done 순.
+    앱은 reply_short 이벤트가 오자마자 보여줄 수 있다.
+    """
+    async def events():
+        try:
+            async for event, data in stream_pipeline_with_logging(
+                body,
+                user_id=user_ctx.user_id,
+                preset_override=user_ctx.preset_override,
+            ):
+                yield _sse(event, data)
+        except Exception as e:
+            # 헤더는 이미 나갔으니 상태코드 대신 error 이벤트로 알린다
+            logger.exception("reply stream failed")
+            yield _sse("error", {"message": str(e)[:300]})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/analyze/batch", response_model=DiaryBatchOutput)
+def analyze_batch(body: DiaryBatchInput):
+    """
+    여러 일기의 감정 분석 + 안전 스캔만 한 번에 수행 (LLM 호출 없음, DB 저장 없음).
+    백엔드 재채점용. 최대 개수는 ANALYZE_BATCH_MAX.
+    """
+    texts = [d.text for d in body.diaries]
+    features = extract_features_many(texts)
+    analyses = analyze_many(texts, features)
+
+    results = []
+    for d, f, analysis in zip(body.diaries, features, analyses):
+        safety_flag, flags = safety_scan(d.text, f)
+        results.append(DiaryAnalysisOutput(
+            user_id=d.user_id,
+            date=d.date,
+            safety_flag=safety_flag,
+            flags=flags,
+            analysis=analysis,
+        ))
+    return DiaryBatchOutput(results=results)
+
+
+@router.get("/stats")
+def stats():
+    """
+    캐시 / 요청 합치기 / 배처 카운터. saved = 합쳐져서 생략된 LLM 호출 수.
+    llm_usage.cached_ratio = 프로바이더 prompt cache 로 재사용된 입력 토큰 비율.
+    compaction.tokens_saved = 긴 일기 압축으로 줄인 추정 토큰 수,
+    latency_ms.generate.compacted / generate.full = 압축 여부별 LLM 구간 p50/p95.
+    """
+    return {
+        "reply_flight": reply_flight.stats(),
+        "llm_usage": generator.usage_stats(),
+        "llm_pool": llm_registry.pool_stats(),
+        "llm_rate": llm_registry.limiter.stats() if llm_registry.limiter else None,
+        "log_writer": log_writer.stats(),
+        "db": engine_stats(async_engine),
+        "db_sync": engine_stats(engine),  # 로그 저장 워커
+        "archive": archive_reader.stats(),
+        "preset_cache": preset_cache.stats(),
+        "llm_resilience": generator.resilience_stats(),
+        "compaction": compaction_stats(),
+        "latency_ms": metrics.latency_stats(),
+        "reply_cache": reply_cache.stats(),
+        "analysis_cache": analyzer.analysis_cache.stats(),
+        "emo_cache": analyzer_hf.prediction_cache.stats(),
+        "emo_batcher": analyzer_hf.batch_stats(),
+    }
+
+
+# /diary/logs 가 돌려줄 수 있는 필드 → 컬럼. 기본은 메타데이터만 (일기 본문/답장은 fields 로 요청할 때만 SELECT)
+_LOG_FIELDS = {
+    "id": DiaryLog.id,
+    "ts": DiaryLog.ts,
+    "user_id": DiaryLog.user_id,
+    "preset": DiaryLog.preset_used,
+    "mood": DiaryLog.mood_hint,
+    "valence": DiaryLog.valence,
+    "emotions": DiaryLog.emotions,
+    "keywords": DiaryLog.keywords,
+    "summary": DiaryLog.summary,
+    "safety_flag": DiaryLog.safety_flag,
+    "flags": DiaryLog.flags,
+    "latency_ms": DiaryLog.latency_ms,
+    "input_tokens": DiaryLog.input_tokens,
+    "cached_tokens": DiaryLog.cached_tokens,
+    "text": DiaryLog.text,
+    "reply_short": DiaryLog.reply_short,
+    "reply_normal": DiaryLog.reply_normal,
+}
+_DEFAULT_LOG_FIELDS = ("id", "ts", "user_id", "preset", "mood", "valence", "emotions", "keywords", "summary")
+
+
+def _log_fields(fields: str | None) -> list[str]:
+    if not fields:
+        return list(_DEFAULT_LOG_FIELDS)
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [n for n in names if n not in _LOG_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def _month_overlaps(month: str, since: datetime | None, until: datetime | None) -> bool:
+    start, end = month_range(month)
+    # 보관 월 경계는 naive UTC
+    since, until = (d.astimezone(timezone.utc).replace(tzinfo=None) if d and d.tzinfo else d for d in (since, until))
+    return (since is None or end > since) and (until is None or start < until)
 
 
 @router.get("/logs")
-def list_logs(
+async def list_logs(
+    response: Response,
     user_id: str | None = None,
-    limit: int = Query(20, le=200),
-    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=200),
+    cursor: int | None = Query(None, description="이전 페이지 응답의 X-Next-Cursor (그보다 오래된 로그부터)"),
+    fields: str | None = Query(None, description="쉼표로 구분한 필드 목록 (기본: 메타데이터만)"),
+    emotion: str | None = Query(None, description="emotions 에 이 감정이 들어 있는 로그만"),
+    flagged: bool | None = Query(None, description="safety_flag 가 선(true) / 안 선(false) 로그만"),
+    since: datetime | None = Query(None, description="ts >= since (UTC)"),
+    until: datetime | None = Query(None, description="ts < until (UTC)"),
+    archived: bool = Query(False, description="hot 테이블에서 모자라면 보관된 달(읽기 전용)에서 이어 읽기"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    최신순 로그. 키셋 페이지: 응답 헤더 X-Next-Cursor 를 다음 요청의 cursor 로 넘긴다 (마지막 페이지면 없음).
+    (user_id, id) 복합 인덱스로 몇 번째 페이지든 page 크기만큼만 읽는다.
+    emotion / flagged / since / until 은 DB 에서 거른다
+    (Postgres 는 emotions GIN, 플래그는 부분 인덱스, 기간은 (user_id, ts) 인덱스).
+    archived=true 면 보관 파일까지 같은 조건 / 같은 커서로 이어진다 (다음 페이지에도 archived=true).
+    순서는 hot 과 보관분을 합친 id 내림차순(저장 순서)이라, 보관된 달에 늦게 들어온 행(스필 재삽입 등)은
+    ts 가 아니라 저장된 자리에 나온다.
+    """
+    names = _log_fields(fields)
+
+    def page(dialect: str, cursor: int | None, limit: int):
+        # 커서용 id 는 항상 SELECT
+        q = select(DiaryLog.id.label("id"), *(_LOG_FIELDS[n].label(n) for n in names if n != "id"))
+        if user_id:
+            q = q.where(DiaryLog.user_id == user_id)
+        if cursor is not None:
+            q = q.where(DiaryLog.id < cursor)
+        if emotion:
+            q = q.where(has_emotion(dialect, emotion))
+        if flagged is not None:
+            q = q.where(is_flagged(flagged))
+        if since is not None:
+            q = q.where(DiaryLog.ts >= since)
+        if until is not None:
+            q = q.where(DiaryLog.ts < until)
+        return q.order_by(DiaryLog.id.desc()).limit(limit)
+
+    rows = (await db.execute(page(async_engine.dialect.name, cursor, limit))).all()
+    if archived:
+        # 보관 파일에도 hot 보다 id 가 큰 행이 있을 수 있다 (보관된 달에 늦게 들어와 다음 보관 때 합쳐진 행)
+        # → 같은 커서로 양쪽을 읽어 id 순으로 합친다. hot 이 꽉 찼으면 그 마지막 id 보다 큰 행이 있는 파일만 연다
+        floor = rows[-1].id if len(rows) == limit else None
+        entries = (await db.execute(select(LogArchive))).scalars().all()
+        entries = [
+            e for e in entries
+            if _month_overlaps(e.month, since, until) and (floor is None or (e.max_id or 0) > floor)
+        ]
+        if entries:
+            rest = await asyncio.to_thread(
+                archive_reader.read_page, entries, lambda c, n: page("sqlite", c, n), cursor, limit,
+            )
+            rows = sorted(rows + rest, key=lambda r: r.id, reverse=True)[:limit]
+
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    out = []
+    for r in rows:
+        item = {n: r._mapping[n] for n in names}
+        if item.get("ts") is not None:
+            item["ts"] = item["ts"].isoformat()
+        out.append(item)
+    return out
+
+
+@router.get("/trends")
+async def trends(
+    user_id: str,
+    period: Literal["week", "month"] = "week",
+    buckets: int = Query(8, ge=1, le=52),
+    until: date | None = Query(None, description="이 날짜가 든 버킷까지 (UTC, 기본 오늘)"),
+    db: AsyncSession = Depends(get_db),
 ):
-    q = db.query(DiaryLog).order_by(DiaryLog.id.desc())
-    if user_id:
-        q = q.filter(DiaryLog.user_id == user_id)
-
-    rows = q.limit(limit).all()
-    return [
-        {
-            "id": r.id,
-            "ts": r.ts.isoformat(),
-            "user_id": r.user_id,
-            "preset": r.preset_used,
-            "mood": r.mood_hint,
-            "valence": r.valence,
-            "emotions": r.emotions,
-            "keywords": r.keywords,
-            "summary": r.summary,
-        }
-        for r in rows
-    ]
+    """
+    주(월요일 시작) / 월 단위 감정·valence 분포, 안전 플래그 수, 평균 지연.
+    diary_logs 가 아니라 일별 롤업만 읽는다 (버킷당 일수 × 지표 수 행).
+    """
+    spans = trend_buckets(period, buckets, until or datetime.utcnow().date())
+    rows = (await db.execute(trend_query(user_id, spans[0][0], spans[-1][1]))).all()
+    return {"user_id": user_id, "period": period, "buckets": summarize(rows, spans)}
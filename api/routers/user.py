@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from api.models import UserPreset, get_session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.models import UserPreset, bump_cache_version_async, upsert_user_preset_async
+from api.preset_cache import CACHE_NAME, UserSettings, preset_cache
+from api.routers.deps import get_db
 
 router = APIRouter(prefix="/user", tags=["user"])
 
@@ -11,28 +14,23 @@ class PresetIn(BaseModel):
     mood_default: str | None = None
 
 @router.post("/preset")
-def set_preset(body: PresetIn, db: Session = Depends(get_session)):
-    up = db.query(UserPreset).filter_by(user_id=body.user_id).first()
-    if not up:
-        up = UserPreset(
-            user_id=body.user_id,
-            preset=body.preset,
-            mood_default=body.mood_default
-        )
-        db.add(up)
-    else:
-        up.preset = body.preset
-        up.mood_default = body.mood_default
-    db.commit()
+async def set_preset(body: PresetIn, db: AsyncSession = Depends(get_db)):
+    await upsert_user_preset_async(db, body.user_id, body.preset, body.mood_default)
+    # 다른 워커의 프리셋 캐시도 무효화되도록 같은 트랜잭션에서 버전을 올린다
+    version = await bump_cache_version_async(db, CACHE_NAME)
+    await db.commit()
+    preset_cache.written(body.user_id, UserSettings(body.preset, body.mood_default), version)
     return {"ok": True, "user_id": body.user_id, "preset": body.preset}
 
 @router.get("/preset/{user_id}")
-def get_preset(user_id: str, db: Session = Depends(get_session)):
-    up = db.query(UserPreset).filter_by(user_id=user_id).first()
-    if not up:
+async def get_preset(user_id: str, db: AsyncSession = Depends(get_db)):
+    row = (
+        await db.execute(select(UserPreset.preset, UserPreset.mood_default).filter_by(user_id=user_id))
+    ).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Preset not found")
     return {
         "user_id": user_id,
-        "preset": up.preset,
-        "mood_default": up.mood_default
+        "preset": row.preset,
+        "mood_default": row.mood_default
     }
@@ -0,0 +1,179 @@
+# api/storage.py
+"""
+DB 엔진 생성 + 방언별 성능 프로필.
+
+create_engine 기본값 그대로면 SQLite 는 rollback 저널 + synchronous=FULL + busy timeout 없음이라
+동시 /diary/reply 에서 "database is locked" 와 느린 commit 이 난다. Postgres 등은 풀 크기/recycle/pre-ping 이 없다.
+여기서 URL 방언을 보고 프로필을 골라 엔진을 만든다.
+
+- sqlite  : 연결마다 PRAGMA (journal_mode=WAL, busy_timeout, synchronous=NORMAL, mmap_size, cache_size, temp_store)
+            + 풀 크기. 메모리 DB 는 WAL/mmap 을 건너뜀
+- 그 외    : pool_size / max_overflow / pool_timeout / pool_recycle / pool_pre_ping (+ Postgres statement_timeout)
+- DB_PROFILE=default 면 예전처럼 create_engine 기본값 (벤치 비교용)
+
+    from api.storage import create_db_engine, create_async_db_engine, engine_stats
+    engine = create_db_engine(DB_URL)                 # 로그 워커 스레드 / 스키마 / 스크립트
+    async_engine = create_async_db_engine(DB_URL)     # 라우터 (sqlite+aiosqlite, postgresql+asyncpg)
+
+비동기 엔진은 같은 URL 의 드라이버만 비동기용으로 바꾼다 (DATABASE_ASYNC_URL 로 직접 줄 수도 있음).
+
+풀 크기는 동시에 실행 중인 쿼리 수 기준이다 (요청 세션은 쿼리하는 동안만 연결을 잡는다).
+모자라면 DB_POOL_TIMEOUT 만큼 기다리다 실패하므로 engine_stats 의 checked_out 으로 확인한다.
+"""
+
+import os
+import weakref
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+DB_PROFILE = os.getenv("DB_PROFILE", "auto")  # auto | default
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # Postgres 만, 0이면 안 씀
+
+SQLITE_WAL = os.getenv("SQLITE_WAL", "1") == "1"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # WAL 에서는 NORMAL 이어도 DB 손상 없음 (전원이 나가면 마지막 commit 만 잃을 수 있음)
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+
+# 엔진별로 적용한 프로필 (engine_stats 용)
+_applied: "weakref.WeakKeyDictionary[Engine, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+# 방언 → 비동기 드라이버 (URL 에 이미 비동기 드라이버가 있으면 그대로)
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+
+def async_url(url: str) -> str:
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in _ASYNC_DRIVERS or u.get_driver_name() in _ASYNC_DRIVERS.values():
+        return url
+    return u.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def sqlite_pragmas(url: str, profile: Optional[str] = None) -> List[str]:
+    """연결마다 실행할 PRAGMA 목록 (sqlite 가 아니거나 default 프로필이면 빈 목록)."""
+    u = make_url(url)
+    if (profile or DB_PROFILE) == "default" or u.get_backend_name() != "sqlite":
+        return []
+    pragmas = [f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}"]
+    if not _is_memory_sqlite(u):
+        if SQLITE_WAL:
+            pragmas.append("PRAGMA journal_mode=WAL")
+        if SQLITE_MMAP_MB > 0:
+            pragmas.append(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+    pragmas += [
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}",  # 음수 = KiB 단위
+        "PRAGMA temp_store=MEMORY",
+    ]
+    return pragmas
+
+
+def engine_options(url: str, profile: Optional[str] = None) -> Dict[str, Any]:
+    """create_engine 에 넘길 kwargs (방언별 프로필)."""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    opts: Dict[str, Any] = {}
+    if backend == "sqlite":
+        # 요청 스레드 / to_thread / 로그 워커가 같은 풀의 연결을 돌려 쓴다
+        opts["connect_args"] = {"check_same_thread": False}
+    if (profile or DB_PROFILE) == "default":
+        return opts
+
+    if backend == "sqlite":
+        opts["connect_args"]["timeout"] = SQLITE_BUSY_TIMEOUT_MS / 1000
+        if not _is_memory_sqlite(u):
+            # 파일 DB 는 QueuePool. 연결이 싸니 recycle/pre-ping 은 필요 없다
+            opts.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+        return opts
+
+    opts.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,   # LB/서버의 idle 연결 정리보다 먼저 교체
+        pool_pre_ping=DB_POOL_PRE_PING,  # 끊긴 연결을 요청에서 처음 알게 되지 않도록
+        pool_use_lifo=True,              # 한가할 때 여분 연결이 recycle 로 자연히 줄게
+    )
+    if backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS > 0:
+        opts["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return opts
+
+
+def create_db_engine(url: str, profile: Optional[str] = None, **overrides: Any) -> Engine:
+    """프로필을 적용한 엔진. overrides 는 create_engine kwargs 를 덮어쓴다."""
+    opts = engine_options(url, profile)
+    opts.update(overrides)
+    engine = create_engine(url, **opts)
+    _apply_profile(engine, url, profile)
+    return engine
+
+
+def create_async_db_engine(url: str, profile: Optional[str] = None, **overrides: Any) -> AsyncEngine:
+    """같은 프로필의 비동기 엔진 (드라이버는 async_url 로 바꿈)."""
+    url = async_url(url)
+    opts = engine_options(url, profile)
+    u = make_url(url)
+    if u.get_driver_name() == "asyncpg" and "options" in opts.get("connect_args", {}):
+        # asyncpg 는 libpq options 대신 server_settings
+        opts["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    opts.update(overrides)
+    engine = create_async_engine(url, **opts)
+    _apply_profile(engine.sync_engine, url, profile)
+    return engine
+
+
+def _apply_profile(engine: Engine, url: str, profile: Optional[str]) -> None:
+    pragmas = sqlite_pragmas(url, profile)
+    if pragmas:
+        # aiosqlite 도 connect 이벤트에서는 동기 어댑터 커서를 준다
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_conn, _record):
+            cur = dbapi_conn.cursor()
+            try:
+                for p in pragmas:
+                    cur.execute(p)
+            finally:
+                cur.close()
+    _applied[engine] = {
+        "profile": "default" if (profile or DB_PROFILE) == "default" else engine.dialect.name,
+        "pragmas": pragmas,
+    }
+
+
+def engine_stats(engine: Engine | AsyncEngine) -> Dict[str, Any]:
+    """/diary/stats 용: 프로필 + 풀 사용량 (checked_out 이 size+overflow 에 붙으면 풀 부족)."""
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+    pool = engine.pool
+    applied = _applied.get(engine, {})
+    out: Dict[str, Any] = {
+        "dialect": engine.dialect.name,
+        "driver": engine.dialect.driver,
+        "profile": applied.get("profile"),
+        "pool": type(pool).__name__,
+    }
+    if hasattr(pool, "checkedout"):
+        out.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),  # QueuePool.overflow() 는 연결이 적을 때 음수
+            max_overflow=getattr(pool, "_max_overflow", None),
+        )
+    if applied.get("pragmas"):
+        out["pragmas"] = [p.replace("PRAGMA ", "") for p in applied["pragmas"]]
+    return out
@@ -1,11 +1,12 @@
 # diary_replier/analyzer.py
 
-import re
-from collections import Counter
-from typing import List
+import os
+from typing import List, Optional, Sequence
 
 from .schemas import AnalysisResult
-from .analyzer_hf import available as hf_available, predict_emotions as hf_predict
+from .lexicon import get_matcher
+from .features import TextFeatures, extract_features, extract_features_many
+from .result_cache import ResultCache
 
 # -----------------------------
 # 감정 키워드 사전 (영문 코드 5개로 통일)
@@ -101,15 +102,13 @@ NEG_WORDS = ["힘들", "실수", "후회", "불안", "우울", "짜증", "화나
 # -----------------------------
 # 감정 감지 → happy/sad/angry/shy/empty 코드 리스트로 반환
 # -----------------------------
-def _detect_emotions(text: str) -> List[str]:
+def _detect_emotions(text: str, features: Optional[TextFeatures] = None) -> List[str]:
     """
     텍스트에서 감정 키워드를 찾아서
     happy/sad/angry/shy/empty 중 최대 3개까지 반환.
+    (features 를 넘기면 사전 스캔을 다시 하지 않는다)
     """
-    found: List[str] = []
-    for code, kws in EMO_CODE_LEX.items():
-        if any(k in text for k in kws):
-            found.append(code)
+    found: List[str] = extract_features(text, features).emotions
 
     # 발견된 감정이 너무 많으면 앞에서부터 3개만
     return found[:3]
@@ -118,16 +117,17 @@ def _detect_emotions(text: str) -> List[str]:
 # -----------------------------
 # valence 판단 (positive / negative / neutral)
 # -----------------------------
-def _judge_valence(text: str) -> str:
+def _judge_valence(text: str, features: Optional[TextFeatures] = None) -> str:
     """
     대략적인 분위기를 positive / negative / neutral 로만 나눔.
     감정 코드(emotions)는 따로 happy/sad/... 로 리턴.
     """
-    pos = sum(text.count(w) for w in POS_WORDS)
-    neg = sum(text.count(w) for w in NEG_WORDS)
+    feats = extract_features(text, features)
+    pos = feats.pos_count  # == sum(text.count(w) for w in POS_WORDS)
+    neg = feats.neg_count
 
     # 감정 코드도 참고해서 보정
-    emos = _detect_emotions(text)
+    emos = _detect_emotions(text, feats)
 
     # happy가 있으면 positive 쪽으로
     if "happy" in emos:
@@ -151,9 +151,9 @@ def _judge_valence(text: str) -> str:
 # -----------------------------
 # 요약
 # -----------------------------
-def _make_summary(text: str) -> str:
-    sents = re.split(r"[.!?？。…\n]+", text.strip())
-    sents = [s for s in sents if s]
+def _make_summary(text: str, features: Optional[TextFeatures] = None) -> str:
+    # 문장 분리는 TextFeatures 에서 한 번만 (기존 re.split 결과와 동일)
+    sents = extract_features(text, features).sentences
     if not sents:
         return ""
     head = sents[0][:120]
@@ -167,17 +167,30 @@ def _make_summary(text: str) -> str:
 # -----------------------------
 # 메인 analyze 함수
 # -----------------------------
-def analyze(text: str) -> AnalysisResult:
+# 같은 텍스트 재분석 방지용 LRU (0 이면 끔). 사전 버전이 바뀌면 자동으로 비워진다.
+analysis_cache = ResultCache(int(os.getenv("ANALYZE_CACHE_SIZE", "4096")), name="analyze")
+
+
+def analyze(text: str, features: Optional[TextFeatures] = None) -> AnalysisResult:
     """
     diary-replier에서 사용하는 분석 함수.
 
     - valence : "positive" / "negative" / "neutral"
     - emotions: ["happy"] / ["sad"] / ... 중 1개 이상
     - summary : 간단 요약
+
+    features 를 넘기면 (pipeline 처럼 safety_scan 과 공유할 때) 그대로 재사용한다.
+    결과는 텍스트 내용 + 사전 버전 기준으로 캐시된다.
     """
-    valence = _judge_valence(text)
-    detected = _detect_emotions(text)
-    summary = _make_summary(text)
+    res = analysis_cache.get_or_compute(text, get_matcher().version, lambda: _analyze(text, features))
+    return res.model_copy(deep=True)  # 호출자가 고쳐도 캐시 값은 그대로
+
+
+def _analyze(text: str, features: Optional[TextFeatures] = None) -> AnalysisResult:
+    feats = extract_features(text, features)
+    valence = _judge_valence(text, feats)
+    detected = _detect_emotions(text, feats)
+    summary = _make_summary(text, feats)
 
     # 🔥 1) neutral이면 무조건 ["empty"]
     if valence == "neutral":
@@ -208,6 +221,28 @@ def analyze(text: str) -> AnalysisResult:
     )
 
 
+# -----------------------------
+# 배치 analyze
+# -----------------------------
+def analyze_many(
+    texts: Sequence[str],
+    features: Optional[Sequence[TextFeatures]] = None,
+) -> List[AnalysisResult]:
+    """
+    여러 일기를 한 번에 분석. (재채점/백필용)
+
+    매처를 한 번만 가져와서 모든 텍스트를 정규식 한 번으로 스캔하고,
+    결과는 텍스트마다 analyze(text) 를 부른 것과 같다.
+    """
+    if features is None:
+        features = extract_features_many(texts)
+    return [analyze(t, f) for t, f in zip(texts, features)]
+
+
+# 모듈 import 시점에 사전 컴파일 (LEXICON_CACHE_DIR 가 있으면 디스크 캐시 사용)
+get_matcher()
+
+
 # -----------------------------
 # (테스트용) LLM Stub
 # -----------------------------
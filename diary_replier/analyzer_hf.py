@@ -1,11 +1,26 @@
 import os
-from typing import List
+import asyncio
+import threading
+from typing import List, Optional, TYPE_CHECKING
 from dotenv import load_dotenv
 
+from .batching import MicroBatcher
+from .features import split_sentences
+from .result_cache import MISS, ResultCache, text_key
+
+if TYPE_CHECKING:
+    from .features import TextFeatures
+
 load_dotenv()
 
 _EMO_MODEL = os.getenv("EMO_MODEL")  # 빈 값이면 사용 안 함
 _EMO_TOPK = int(os.getenv("EMO_TOPK", "2"))
+_EMO_BATCH_MAX = int(os.getenv("EMO_BATCH_MAX", "16"))  # 1 이면 배칭 끄고 단건 호출
+_EMO_BATCH_WAIT_MS = float(os.getenv("EMO_BATCH_WAIT_MS", "5"))  # 첫 요청 후 모으는 최대 대기
+# 추론 런타임: default(기존 fp32 pipeline) / quantized(동적 int8, CPU) / onnx(optimum onnxruntime, CPU)
+_EMO_RUNTIME = (os.getenv("EMO_RUNTIME") or "default").lower()
+_EMO_MAX_TOKENS = int(os.getenv("EMO_MAX_TOKENS", "256"))  # 청크당 최대 토큰, 0 이면 청크/자르기 안 함
+_EMO_THREADS = int(os.getenv("EMO_THREADS", "0"))  # 0 이면 torch 기본값
 
 # 라벨 매핑은 모델에 따라 다름. 일단 보편 label 이름만 정규화 예시 제공.
 _DEFAULT_MAP = {
@@ -19,30 +34,179 @@ _DEFAULT_MAP = {
 
 _pipe = None
 _err = None
+_load_lock = threading.Lock()  # async 경로는 스레드에서 로드하므로 동시에 한 번만 만들게
 
 def _lazy_load():
     global _pipe, _err
     if _pipe is not None or _err is not None:
         return
-    if not _EMO_MODEL:
-        _err = "no model specified"
-        return
-    try:
-        from transformers import pipeline
-        _pipe = pipeline("text-classification", model=_EMO_MODEL, tokenizer=_EMO_MODEL, top_k=None)
-    except Exception as e:
-        _err = str(e)
+    with _load_lock:
+        if _pipe is not None or _err is not None:
+            return
+        if not _EMO_MODEL:
+            _err = "no model specified"
+            return
+        try:
+            _pipe = _build_pipe(_EMO_MODEL, _EMO_RUNTIME)
+        except Exception as e:
+            _err = str(e)
+
+def _build_pipe(model_name: str, runtime: str):
+    from transformers import pipeline
+
+    if runtime == "default":
+        return pipeline("text-classification", model=model_name, tokenizer=model_name, top_k=None)
+
+    if _EMO_THREADS:
+        import torch
+        torch.set_num_threads(_EMO_THREADS)
+
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if runtime == "quantized":
+        # Linear 레이어만 int8 동적 양자화 (가중치 메모리 ~1/4, CPU 추론 가속)
+        import torch
+        from transformers import AutoModelForSequenceClassification
+        model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif runtime == "onnx":
+        # optimum[onnxruntime] 필요. model.onnx 가 없으면 로드 시 export
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        exported = os.path.isfile(os.path.join(model_name, "model.onnx"))
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=not exported)
+    else:
+        raise ValueError(f"unknown EMO_RUNTIME: {runtime}")
+    return pipeline("text-classification", model=model, tokenizer=tokenizer, top_k=None, device=-1)
 
 def available() -> bool:
     _lazy_load()
     return _pipe is not None
 
-def predict_emotions(text: str, topk: int | None = None) -> List[str]:
+def _chunk_text(text: str, tokenizer, max_tokens: int) -> List[str]:
+    """
+    긴 텍스트를 문장 단위로 묶어서 청크당 max_tokens 이하가 되게 나눈다.
+    한 문장이 max_tokens 보다 길면 그 문장은 pipeline 의 truncation 으로 잘린다.
+    """
+    if max_tokens <= 0 or tokenizer is None:
+        return [text]
+    budget = max(1, max_tokens - 2)  # [CLS]/[SEP]
+    if len(tokenizer(text, add_special_tokens=False)["input_ids"]) <= budget:
+        return [text]
+
+    chunks: List[str] = []
+    cur: List[str] = []
+    cur_len = 0
+    for sent in split_sentences(text):
+        sent = sent.strip()
+        if not sent:
+            continue
+        n = len(tokenizer(sent, add_special_tokens=False)["input_ids"])
+        if cur and cur_len + n > budget:
+            chunks.append(" ".join(cur))
+            cur, cur_len = [], 0
+        cur.append(sent)
+        cur_len += n
+    if cur:
+        chunks.append(" ".join(cur))
+    return chunks or [text]
+
+def _mean_scores(outputs: List[List[dict]]) -> List[dict]:
+    """청크별 [{label, score}, ...] 를 라벨별 평균 점수로 합친다."""
+    if len(outputs) == 1:
+        return outputs[0]
+    total: dict = {}
+    for out in outputs:
+        for item in out:
+            total[item["label"]] = total.get(item["label"], 0.0) + float(item.get("score", 0))
+    n = len(outputs)
+    merged = [{"label": lab, "score": sc / n} for lab, sc in total.items()]
+    return sorted(merged, key=lambda x: x["score"], reverse=True)
+
+def _run_batch(texts: List[str]) -> List:
+    """
+    입력마다 [{label, score}, ...] 하나씩 돌려준다.
+    긴 텍스트는 청크로 나눠 전부 한 배치로 돌린 뒤 라벨 점수를 평균낸다.
+    """
+    tokenizer = getattr(_pipe, "tokenizer", None)
+    spans = []
+    flat: List[str] = []
+    for t in texts:
+        chunks = _chunk_text(t, tokenizer, _EMO_MAX_TOKENS)
+        spans.append((len(flat), len(flat) + len(chunks)))
+        flat.extend(chunks)
+
+    kwargs = {"batch_size": len(flat)}
+    if _EMO_MAX_TOKENS > 0 and tokenizer is not None:
+        kwargs.update(truncation=True, max_length=_EMO_MAX_TOKENS)
+    out = _pipe(flat, **kwargs)
+    # top_k=None + 리스트 입력 → 입력마다 list[dict]. (혹시 dict 하나면 리스트로 감싼다)
+    out = [o if isinstance(o, list) else [o] for o in out]
+    return [_mean_scores(out[a:b]) for a, b in spans]
+
+# 동시에 들어온 predict_emotions 호출을 모아서 pipeline 한 번으로 처리
+_batcher = MicroBatcher(_run_batch, max_batch=_EMO_BATCH_MAX, max_wait_ms=_EMO_BATCH_WAIT_MS, name="emo-hf")
+
+# 텍스트별 라벨 점수 캐시. 모델/런타임/청크 설정이 바뀌면 자동으로 비워진다.
+prediction_cache = ResultCache(int(os.getenv("EMO_CACHE_SIZE", "4096")), name="emo-hf")
+
+def _model_version() -> str:
+    return f"{_EMO_MODEL}|{_EMO_RUNTIME}|{_EMO_MAX_TOKENS}"
+
+def _classify_uncached(text: str):
+    if _EMO_BATCH_MAX <= 1:
+        return _run_batch([text])[0]
+    return _batcher(text)
+
+def _classify(text: str):
+    return prediction_cache.get_or_compute(text, _model_version(), lambda: _classify_uncached(text))
+
+def batch_stats() -> dict:
+    """배치 크기 / 큐 대기 시간 통계."""
+    return _batcher.stats()
+
+def predict_emotions(text: str, topk: int | None = None, features: Optional["TextFeatures"] = None) -> List[str]:
+    """
+    features 를 넘기면 정규화된 텍스트를 모델 입력으로 쓰고,
+    같은 요청 안에서 다시 불려도 모델을 한 번만 돌린다.
+    """
     _lazy_load()
     if _pipe is None:
         return []  # 폴백은 기존 analyzer.py가 담당
     k = topk or _EMO_TOPK
-    out = _pipe(text)
+    if features is not None:
+        key = f"hf_emotions:{k}"
+        if key not in features.memo:
+            features.memo[key] = _to_labels(_classify(features.normalized), k)
+        return list(features.memo[key])
+    return _to_labels(_classify(text), k)
+
+async def predict_emotions_async(text: str, topk: int | None = None, features: Optional["TextFeatures"] = None) -> List[str]:
+    """async 라우트용. 이벤트 루프를 막지 않고 배처 결과를 기다린다."""
+    if _pipe is None and _err is None:
+        # 첫 호출의 파이프라인 생성(양자화 / ONNX 변환 포함)은 몇 초 걸릴 수 있다 → 스레드에서
+        await asyncio.to_thread(_lazy_load)
+    if _pipe is None:
+        return []
+    k = topk or _EMO_TOPK
+    memo_key = f"hf_emotions:{k}"
+    if features is not None and memo_key in features.memo:
+        return list(features.memo[memo_key])
+    src = features.normalized if features is not None else text
+    version = _model_version()
+    cache_key = text_key(src)
+    raw = prediction_cache.get(cache_key, version)
+    if raw is MISS:
+        if _EMO_BATCH_MAX <= 1:
+            raw = (await asyncio.to_thread(_run_batch, [src]))[0]
+        else:
+            raw = await _batcher.acall(src)
+        prediction_cache.put(cache_key, version, raw)
+    labels = _to_labels(raw, k)
+    if features is not None:
+        features.memo[memo_key] = labels
+    return list(labels)
+
+def _to_labels(out, k: int) -> List[str]:
     # transformers >=4.36: list[dict] or list[list[dict]] 형태 → 통일
     if isinstance(out, list) and out and isinstance(out[0], dict):
         candidates = out
@@ -0,0 +1,139 @@
+# diary_replier/batching.py
+"""
+동시에 들어온 단건 호출을 모아서 배치 함수 한 번으로 처리하는 in-process 마이크로 배처.
+
+- 첫 요청이 들어오면 최대 max_wait_ms 동안, 최대 max_batch 개까지 모아서 fn(list) 호출
+- 호출자마다 자기 결과만 받는다 (concurrent.futures.Future)
+- 동기 호출: batcher(x) / 비동기 호출: await batcher.acall(x)
+- stats() 로 배치 크기 / 큐 대기 시간 통계 확인
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], Sequence[Any]],
+        *,
+        max_batch: int = 16,
+        max_wait_ms: float = 5.0,
+        name: str = "batcher",
+    ):
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+
+        self._q: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_seen = 0
+        self._size_hist: Dict[int, int] = {}
+        self._wait_sum = 0.0
+        self._wait_max = 0.0
+
+    # -----------------------------
+    # 호출 API
+    # -----------------------------
+    def submit(self, item: Any) -> Future:
+        self._ensure_worker()
+        fut: Future = Future()
+        self._q.put((item, fut, time.perf_counter()))
+        return fut
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        return self.submit(item).result(timeout=timeout)
+
+    async def acall(self, item: Any) -> Any:
+        # 워커 스레드가 결과를 채우면 이벤트 루프 쪽 future 로 넘어온다 (루프를 막지 않음)
+        return await asyncio.wrap_future(self.submit(item))
+
+    # -----------------------------
+    # 통계
+    # -----------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "name": self.name,
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "max_batch_size": self._max_seen,
+                "batch_size_hist": dict(sorted(self._size_hist.items())),
+                "avg_queue_wait_ms": round(self._wait_sum / self._items * 1000, 3) if self._items else 0.0,
+                "max_queue_wait_ms": round(self._wait_max * 1000, 3),
+                "queued": self._q.qsize(),
+            }
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._batches = self._items = self._max_seen = 0
+            self._size_hist = {}
+            self._wait_sum = self._wait_max = 0.0
+
+    # -----------------------------
+    # 워커
+    # -----------------------------
+    def _ensure_worker(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                t = threading.Thread(target=self._loop, name=f"{self.name}-worker", daemon=True)
+                t.start()
+                self._thread = t
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._q.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._q.get_nowait())  # 이미 쌓여 있는 건 기다리지 않고 같이 처리
+                else:
+                    batch.append(self._q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self._record(len(batch), [started - enq for _, _, enq in batch])
+
+            items = [item for item, _, _ in batch]
+            try:
+                results = list(self.fn(items))
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut, _), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+    def _record(self, size: int, waits: List[float]) -> None:
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            self._max_seen = max(self._max_seen, size)
+            self._size_hist[size] = self._size_hist.get(size, 0) + 1
+            self._wait_sum += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
@@ -0,0 +1,140 @@
+# diary_replier/compaction.py
+"""
+긴 일기를 LLM 에 보내기 전에 토큰 예산 안으로 줄이는 추출식 압축.
+
+- 토큰 수는 로컬에서 추정 (한글 음절 / 영숫자 / 기타 문자별 가중치, 토크나이저 불필요)
+- 예산(COMPACT_TOKEN_BUDGET) 이하면 그대로 보낸다
+- 넘으면 문장 단위로 고른다: 첫 문장 + 마지막 문장 + 위험 표현 문장 + 감정/긍부정 사전에 걸린 문장
+  (사전 히트 수가 많은 문장 우선, 예산 안에서) → 원래 순서대로 이어 붙이고 빠진 구간은 "…" 로 표시
+- 요약/재작성은 하지 않는다 (원문 문장 그대로). DB 에는 원문이 저장된다 (pipeline 에서)
+"""
+
+import bisect
+import math
+import os
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+from .features import TextFeatures, extract_features
+
+COMPACT_TOKEN_BUDGET = int(os.getenv("COMPACT_TOKEN_BUDGET", "600"))  # 0 이면 압축 안 함
+# 한글 음절 1자당 추정 토큰 수 (o200k 계열 ≈ 1.0, cl100k 계열이면 1.5 정도로 올린다)
+COMPACT_TOKENS_PER_HANGUL = float(os.getenv("COMPACT_TOKENS_PER_HANGUL", "1.0"))
+
+_GAP = "…"  # 빠진 문장 구간 표시
+_SIGNAL_GROUPS = ("risk", "emo", "pos", "neg")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    한국어 위주 텍스트의 토큰 수 추정.
+    한글 음절 × COMPACT_TOKENS_PER_HANGUL + 영숫자 4자당 1 + 기타 기호/문자 1개당 1 (공백 제외).
+    """
+    hangul = alnum = other = 0
+    for ch in text:
+        o = ord(ch)
+        if 0xAC00 <= o <= 0xD7A3 or 0x3131 <= o <= 0x318E:
+            hangul += 1
+        elif ch.isascii() and ch.isalnum():
+            alnum += 1
+        elif not ch.isspace():
+            other += 1
+    return int(math.ceil(hangul * COMPACT_TOKENS_PER_HANGUL + alnum / 4 + other))
+
+
+class Compacted(NamedTuple):
+    text: str               # LLM 에 보낼 텍스트
+    compacted: bool
+    tokens_before: int
+    tokens_after: int
+    sentences_kept: int
+    sentences_total: int
+
+
+def _sentence_with_delim(text: str, start: int, end: int) -> str:
+    # 문장 분리 때 빠진 종결 부호(.!? 등)를 한 글자 붙여서 원문 느낌 유지
+    if end < len(text) and not text[end].isspace():
+        end += 1
+    return text[start:end].strip()
+
+
+def compact(text: str, features: Optional[TextFeatures] = None, budget: Optional[int] = None) -> Compacted:
+    budget = COMPACT_TOKEN_BUDGET if budget is None else budget
+    before = estimate_tokens(text)
+    if budget <= 0 or before <= budget:
+        return Compacted(text, False, before, before, -1, -1)
+
+    f = extract_features(text, features)
+    spans = f.sentence_spans
+    n = len(spans)
+    if n <= 2:
+        return Compacted(text, False, before, before, n, n)
+
+    # 문장별 사전 신호 (위험 > 감정/긍부정 히트 수)
+    risk = [0] * n
+    signal = [0] * n
+    starts = [s for s, _ in spans]
+    for h in f.hits.hits():
+        if h.group not in _SIGNAL_GROUPS:
+            continue
+        i = bisect.bisect_right(starts, h.start) - 1
+        if i < 0 or h.start >= spans[i][1]:
+            continue
+        if h.group == "risk":
+            risk[i] += 1
+        else:
+            signal[i] += 1
+
+    sents = [_sentence_with_delim(text, s, e) for s, e in spans]
+    cost = [estimate_tokens(s) for s in sents]
+
+    keep = {0, n - 1}
+    used = cost[0] + cost[n - 1]
+    # 위험 문장은 예산과 무관하게 유지 (안전 대응 문맥)
+    for i in range(n):
+        if risk[i] and i not in keep:
+            keep.add(i)
+            used += cost[i]
+    candidates = sorted(
+        (i for i in range(n) if signal[i] and i not in keep),
+        key=lambda i: (-signal[i], i),
+    )
+    for i in candidates:
+        if used + cost[i] > budget:
+            continue
+        keep.add(i)
+        used += cost[i]
+
+    parts: List[str] = []
+    prev = -1
+    for i in sorted(keep):
+        if parts and i != prev + 1:
+            parts.append(_GAP)
+        parts.append(sents[i])
+        prev = i
+    out = " ".join(parts)
+    after = estimate_tokens(out)
+    return Compacted(out, True, before, after, len(keep), n)
+
+
+# -----------------------------
+# 누적 통계 (/diary/stats)
+# -----------------------------
+_lock = threading.Lock()
+_totals = {"requests": 0, "compacted": 0, "tokens_before": 0, "tokens_after": 0}
+
+
+def record(c: Compacted) -> None:
+    with _lock:
+        _totals["requests"] += 1
+        _totals["compacted"] += int(c.compacted)
+        _totals["tokens_before"] += c.tokens_before
+        _totals["tokens_after"] += c.tokens_after
+
+
+def compaction_stats() -> Dict:
+    with _lock:
+        t = dict(_totals)
+    t["tokens_saved"] = t["tokens_before"] - t["tokens_after"]
+    t["budget"] = COMPACT_TOKEN_BUDGET
+    return t
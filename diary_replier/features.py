@@ -0,0 +1,85 @@
+# diary_replier/features.py
+"""
+요청 1건의 텍스트에서 분석 단계가 공통으로 쓰는 값을 한 번만 계산해 두는 객체.
+
+analyze / _judge_valence / _make_summary / safety_scan / analyzer_hf 가
+같은 TextFeatures 를 받아서 읽기만 한다. (사전 스캔, 문장 분리 모두 요청당 1회)
+"""
+
+import re
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .lexicon import LexiconHits, get_matcher
+
+# _make_summary 가 쓰던 re.split(r"[.!?？。…\n]+") 의 빈 조각 제외 결과와 같다
+_SENT_RE = re.compile(r"[^.!?？。…\n]+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """요약/청크 분리용 문장 목록 (빈 조각 제외)."""
+    return _SENT_RE.findall(text.strip())
+
+
+class TextFeatures:
+    """
+    - text           : 원문 (사전 매칭은 원문 기준이라 기존 결과와 동일)
+    - normalized     : 앞뒤 공백 제거한 텍스트 (요약/모델 입력용)
+    - sentence_spans : 원문 기준 (start, end) 문장 경계
+    - hits           : 모든 사전의 히트 위치/개수 (LexiconHits)
+    - emotions / pos_count / neg_count / risk : hits 에서 뽑은 값
+    - memo           : 다른 단계 결과 보관용 (예: HF 예측)
+    """
+
+    def __init__(self, text: str, hits: Optional[LexiconHits] = None):
+        self.text = text
+        self.memo: Dict[str, Any] = {}
+        if hits is not None:
+            self.hits = hits  # 배치 스캔 결과를 미리 채워 넣는 경우
+
+    @cached_property
+    def normalized(self) -> str:
+        return self.text.strip()
+
+    @cached_property
+    def sentence_spans(self) -> List[Tuple[int, int]]:
+        offset = len(self.text) - len(self.text.lstrip())
+        return [(m.start() + offset, m.end() + offset) for m in _SENT_RE.finditer(self.normalized)]
+
+    @cached_property
+    def sentences(self) -> List[str]:
+        return [self.text[s:e] for s, e in self.sentence_spans]
+
+    @cached_property
+    def hits(self) -> LexiconHits:
+        return get_matcher().scan(self.text)
+
+    @cached_property
+    def emotions(self) -> List[str]:
+        """사전에 걸린 감정 코드 전체 (선언 순서). 상위 3개 자르기는 analyzer 에서."""
+        return self.hits.labels("emo")
+
+    @cached_property
+    def pos_count(self) -> int:
+        return self.hits.count("pos")
+
+    @cached_property
+    def neg_count(self) -> int:
+        return self.hits.count("neg")
+
+    @cached_property
+    def risk(self) -> Dict[str, bool]:
+        return {lab: self.hits.any("risk", lab) for lab, _ in self.hits.matcher.entries("risk")}
+
+
+def extract_features(text: str, features: Optional[TextFeatures] = None) -> TextFeatures:
+    """features 가 이미 있으면 그대로, 없으면 새로 만든다."""
+    if features is not None:
+        return features
+    return TextFeatures(text)
+
+
+def extract_features_many(texts: Sequence[str]) -> List[TextFeatures]:
+    """여러 텍스트의 사전 스캔을 정규식 한 번으로 처리해서 TextFeatures 목록을 만든다."""
+    texts = list(texts)
+    return [TextFeatures(t, h) for t, h in zip(texts, get_matcher().scan_many(texts))]
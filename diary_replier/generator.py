@@ -1,65 +1,32 @@
 import os
 import json
 import time
+import asyncio
+import threading
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Optional
 from dotenv import load_dotenv
-from openai import OpenAI
-from openai import APIError, RateLimitError
+from openai import APIError, RateLimitError, APIConnectionError, APIStatusError
+from . import metrics
+from .resilience import CircuitBreaker, HedgeStats, hedged
+from .llm_providers.registry import registry
+from .json_stream import JsonFieldStream
+from .prompt import (  # noqa: F401  (SYSTEM_BASE/PRESETS/EXAMPLES 는 기존 import 경로 유지)
+    SYSTEM_BASE, PRESETS, EXAMPLES, PROMPT_TAG, build_messages, prompt_cache_key, resolve_preset,
+)
+from .reply_cache import reply_cache, reply_cache_status, reply_key, HIT, MISS, BYPASS
 
 load_dotenv()
-_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# 레지스트리의 공유 커넥션 풀 사용 (chat-to-diary / 그림일기와 같은 풀)
+_client = registry.openai()
+# async 라우트용. 대기 중인 호출이 스레드를 잡지 않는다
+_async_client = registry.async_openai()
 _MODEL = os.getenv("MODEL_NAME", "gpt-4o-mini")
 
-SYSTEM_BASE = (
-    "너는 한국어로 답하는 '일기 답장 비서'야. 공감 먼저, 해결책은 최대 2개."
-    "가르치려 들지 말고, 판단/진단/낙인 금지. 사적 정보 요구 금지."
-    "반말을 쓰되 존중 유지. 과장 없이 현실적인 톤."
-)
-EXAMPLES = [
-    {
-        "text": "요즘 너무 피곤해서 뭐든 시작이 힘들어.",
-        "reply_short": "요즘 많이 지쳤구나. 잠깐 쉬어가도 괜찮아.",
-        "reply_normal": "피곤이 쌓이면 의욕이 떨어지는 게 당연해. 오늘은 욕심내지 말고 작은 목표 하나만 정하고, 쉬는 시간도 계획에 넣어보자."
-    },
-    {
-        "text": "친구랑 다투고 나니 마음이 복잡해.",
-        "reply_short": "속상했겠다. 네 마음을 솔직히 전해보는 것도 도움이 돼.",
-        "reply_normal": "다툼 뒤엔 마음이 흔들리기 마련이야. 감정이 가라앉은 뒤에, 네가 느낀 핵심을 부드럽게 전해보자. 관계는 대화로 단단해져."
-    }
-]
-
-def _examples_block() -> str:
-    lines = ["[예시] 아래 형식을 참고해 답변 톤과 길이를 맞춰라."]
-    for ex in EXAMPLES:
-        lines.append(f"- (일기) {ex['text']}")
-        lines.append(f"  (짧은답) {ex['reply_short']}")
-        lines.append(f"  (보통답) {ex['reply_normal']}")
-    return "\n".join(lines)
-
-def _build_prompt_json(text: str, mood: str | None, preset: str) -> str:
-    style = PRESETS.get(preset, PRESETS["warm"])
-    mood_line = mood or "미지정"
-    return f"""
-{_examples_block()}
-
-[일기]
-{text}
-
-[지침]
-- 말투 preset: {preset} ({"/".join(PRESETS.keys())})
-- 기분 힌트: {mood_line}
-- 스타일: {style}
-- 구조: 요점 1줄 → 공감 1줄 → 제안 1~2개(선택)
-- reply_short: 두세 문장(100자 내외), reply_normal: 200~280자
-
-반드시 아래 JSON으로만 답해. 그 외 문자는 출력하지 마.
-{{"reply_short":"...", "reply_normal":"..."}}
-""".strip()
-
-PRESETS = {
-    "warm": "따뜻하고 다정하게. 위로 + 구체적 제안 1~2개.",
-    "coach": "직설적이되 예의 있게. TODO 2~3개를 번호로.",
-    "short": "핵심만 두세 문장.",
-}
+# 토큰 사용량: 요청별(contextvar) + 누적(usage_stats)
+llm_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar("llm_usage", default=None)
+_usage_lock = threading.Lock()
+_usage_totals = {"requests": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
 
 def _call_with_retry(fn, max_retry: int = 3, base_wait: float = 0.8):
     """
@@ -73,49 +40,233 @@ def _call_with_retry(fn, max_retry: int = 3, base_wait: float = 0.8):
                 raise
             time.sleep(base_wait * (2 ** i))
 
-def _build_prompt_json(text: str, mood: str | None, preset: str) -> str:
-    style = PRESETS.get(preset, PRESETS["warm"])
-    mood_line = mood or "미지정"
-    # 모델이 반드시 JSON만 출력하도록 강제
-    return f"""
-[일기]
-{text}
-
-[지침]
-- 말투 preset: {preset} ({"/".join(PRESETS.keys())})
-- 기분 힌트: {mood_line}
-- 스타일: {style}
-- 구조: 요점 1줄 → 공감 1줄 → 제안 1~2개(선택)
-- reply_short: 두세 문장(100자 내외), reply_normal: 200~280자
-
-반드시 아래 JSON으로만 답해. 그 외 문자는 출력하지 마.
-{{"reply_short":"...", "reply_normal":"..."}}
-""".strip()
+async def _call_with_retry_async(fn, max_retry: int = 3, base_wait: float = 0.8):
+    """
+    _call_with_retry 의 async 버전. 백오프 동안 이벤트 루프를 막지 않는다.
+    fn 은 awaitable 을 돌려주는 함수.
+    """
+    for i in range(max_retry):
+        try:
+            return await fn()
+        except (RateLimitError, APIError) as e:
+            if i == max_retry - 1:
+                raise
+            await asyncio.sleep(base_wait * (2 ** i))
+
+# -----------------------------
+# 꼬리 지연 헤지 / 서킷 브레이커 (generate_pair 경로)
+# -----------------------------
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_MS = float(os.getenv("HEDGE_MIN_DELAY_MS", "300"))
+
+llm_breaker = CircuitBreaker(
+    "llm",
+    failure_threshold=int(os.getenv("CB_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("CB_RESET_SECONDS", "30")),
+)
+hedge_stats = HedgeStats()
+
+def _hedge_delay() -> float | None:
+    """
+    최근 LLM 호출 지연의 HEDGE_PERCENTILE 값(초). 표본이 부족하면 헤지 안 함(None).
+    """
+    if not HEDGE_ENABLED:
+        return None
+    w = metrics.window("llm.call")
+    if len(w) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(w.percentile(HEDGE_PERCENTILE), HEDGE_MIN_DELAY_MS) / 1000
+
+def _is_outage(e: BaseException) -> bool:
+    # 연결 실패/타임아웃/5xx 만 장애로 본다 (4xx, 429 는 요청 쪽 문제라 브레이커와 무관)
+    return isinstance(e, APIConnectionError) or (isinstance(e, APIStatusError) and e.status_code >= 500)
+
+def _guarded_call(fn):
+    """
+    동기 1회 시도: 브레이커 확인 → 호출 → 지연 기록.
+    (동기 경로는 스레드를 더 잡지 않도록 헤지하지 않는다)
+    """
+    with llm_breaker.guard(_is_outage):
+        t0 = time.perf_counter()
+        res = fn()
+        metrics.observe("llm.call", (time.perf_counter() - t0) * 1000)
+    return res
+
+async def _guarded_call_async(fn):
+    """
+    비동기 1회 시도: 브레이커 확인 → 헤지 호출 → 지연 기록.
+    """
+    async def timed():
+        t0 = time.perf_counter()
+        res = await fn()
+        metrics.observe("llm.call", (time.perf_counter() - t0) * 1000)
+        return res
+
+    # 429/4xx 나 취소로 끝나도 half-open 시험 호출 자리는 guard 가 정리한다
+    with llm_breaker.guard(_is_outage):
+        return await hedged(timed, _hedge_delay(), hedge_stats)
+
+def resilience_stats() -> Dict[str, Any]:
+    delay = _hedge_delay()
+    return {
+        "breaker": llm_breaker.stats(),
+        "hedge": hedge_stats.snapshot(),
+        "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+    }
+
+_PAIR_FIELDS = ("reply_short", "reply_normal")
+
+def _cache_key(text: str, mood: str | None, preset: str) -> str:
+    return reply_key(text, mood, resolve_preset(preset), f"{_MODEL}:{PROMPT_TAG}")
+
+def _record_usage(usage) -> Optional[Dict[str, int]]:
+    """
+    Responses API usage → {"input_tokens", "cached_tokens", "output_tokens"}.
+    cached_tokens 는 프로바이더 prompt cache 에서 재사용된 입력 토큰 수.
+    """
+    if usage is None:
+        return None
+    details = getattr(usage, "input_tokens_details", None)
+    u = {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+    }
+    llm_usage.set(u)
+    with _usage_lock:
+        _usage_totals["requests"] += 1
+        for k, v in u.items():
+            _usage_totals[k] += v
+    return u
+
+def usage_stats() -> Dict[str, Any]:
+    with _usage_lock:
+        t = dict(_usage_totals)
+    t["cached_ratio"] = round(t["cached_tokens"] / t["input_tokens"], 4) if t["input_tokens"] else 0.0
+    return t
+
+def _request_kwargs(text: str, mood: str | None, preset: str) -> Dict[str, Any]:
+    # 고정 프리픽스(system) → 일기(user) 순서. 프리셋별 prompt_cache_key 로 같은 캐시에 모은다
+    return {
+        "model": _MODEL,
+        "input": build_messages(text, mood, preset),
+        "prompt_cache_key": prompt_cache_key(preset),
+    }
 
 def generate_pair(text: str, mood: str | None, preset: str) -> tuple[str, str]:
     """
     단일 호출로 reply_short / reply_normal 동시 생성 (JSON 파싱).
+    같은 (정규화 텍스트, mood, preset, 모델) 은 답장 캐시에서 돌려준다.
+    """
+    llm_usage.set(None)
+    if not reply_cache.enabled:
+        reply_cache_status.set(BYPASS)
+        return _generate_pair_llm(text, mood, preset)[:2]
+
+    key = _cache_key(text, mood, preset)
+    cached = reply_cache.get(key)
+    if cached is not None:
+        reply_cache_status.set(HIT)
+        return cached
+
+    reply_cache_status.set(MISS)
+    rs, rn, ok = _generate_pair_llm(text, mood, preset)
+    if ok:
+        reply_cache.put(key, rs, rn)
+    return rs, rn
+
+async def generate_pair_async(text: str, mood: str | None, preset: str) -> tuple[str, str]:
+    """
+    generate_pair 의 async 버전 (AsyncOpenAI + asyncio 백오프).
+    캐시 파일 접근은 스레드로 넘긴다.
+    """
+    llm_usage.set(None)
+    if not reply_cache.enabled:
+        reply_cache_status.set(BYPASS)
+        return (await _generate_pair_llm_async(text, mood, preset))[:2]
+
+    key = _cache_key(text, mood, preset)
+    cached = await asyncio.to_thread(reply_cache.get, key)
+    if cached is not None:
+        reply_cache_status.set(HIT)
+        return cached
+
+    reply_cache_status.set(MISS)
+    rs, rn, ok = await _generate_pair_llm_async(text, mood, preset)
+    if ok:
+        await asyncio.to_thread(reply_cache.put, key, rs, rn)
+    return rs, rn
+
+async def stream_pair_async(text: str, mood: str | None, preset: str) -> AsyncIterator[tuple[str, str, str]]:
+    """
+    generate_pair 의 스트리밍 버전. 토큰이 오는 대로 JSON 을 점진 파싱해서 이벤트를 낸다.
+      ("delta", 필드명, 조각)  : 필드 값의 새 조각
+      ("field", 필드명, 값)    : 필드 값 완성 (strip 된 값)
+      ("done", reply_short, reply_normal) : 마지막 1회
+    JSON 이 깨지면 field 이벤트 없이 done 에 폴백 값이 실린다. 캐시 hit 이면 field 두 개 + done 만 나온다.
+    """
+    llm_usage.set(None)
+    key = _cache_key(text, mood, preset) if reply_cache.enabled else None
+    cached = await asyncio.to_thread(reply_cache.get, key) if key else None
+    if cached is not None:
+        reply_cache_status.set(HIT)
+        yield "field", "reply_short", cached[0]
+        yield "field", "reply_normal", cached[1]
+        yield "done", cached[0], cached[1]
+        return
+    reply_cache_status.set(MISS if key else BYPASS)
+
+    # 재시도는 스트림 연결까지만 (토큰을 보내기 시작한 뒤엔 되돌릴 수 없음)
+    kwargs = _request_kwargs(text, mood, preset)
+    # 스트림은 헤지하지 않는다 (연결 단계만 브레이커 확인)
+    with llm_breaker.guard(_is_outage):
+        stream = await _call_with_retry_async(lambda: _async_client.responses.create(**kwargs, stream=True))
+    parser = JsonFieldStream(_PAIR_FIELDS)
+    raw: list[str] = []
+    async for ev in stream:
+        if ev.type == "response.completed":
+            _record_usage(getattr(ev.response, "usage", None))
+        if ev.type != "response.output_text.delta":
+            continue
+        raw.append(ev.delta)
+        for kind, field, piece in parser.feed(ev.delta):
+            yield kind, field, piece.strip() if kind == "field" else piece
+
+    rs, rn, ok = _parse_pair("".join(raw))
+    if ok and key:
+        await asyncio.to_thread(reply_cache.put, key, rs, rn)
+    yield "done", rs, rn
+
+def _generate_pair_llm(text: str, mood: str | None, preset: str) -> tuple[str, str, bool]:
+    kwargs = _request_kwargs(text, mood, preset)
+    res = _call_with_retry(lambda: _guarded_call(lambda: _client.responses.create(**kwargs)))
+    _record_usage(res.usage)
+    return _parse_pair(res.output_text)
+
+async def _generate_pair_llm_async(text: str, mood: str | None, preset: str) -> tuple[str, str, bool]:
+    kwargs = _request_kwargs(text, mood, preset)
+    res = await _call_with_retry_async(lambda: _guarded_call_async(lambda: _async_client.responses.create(**kwargs)))
+    _record_usage(res.usage)
+    return _parse_pair(res.output_text)
+
+def _parse_pair(output_text: str) -> tuple[str, str, bool]:
+    """
+    (reply_short, reply_normal, 파싱 성공 여부). 폴백 결과는 캐시하지 않는다.
     """
-    prompt = _build_prompt_json(text, mood, preset)
-    res = _call_with_retry(lambda: _client.responses.create(
-        model=_MODEL,
-        input=[
-            {"role": "system", "content": SYSTEM_BASE},
-            {"role": "user", "content": prompt},
-        ],
-    ))
     # JSON 파싱
     try:
-        data = json.loads(res.output_text)
+        data = json.loads(output_text)
         rs = (data.get("reply_short", "") or "").strip()
         rn = (data.get("reply_normal", "") or "").strip()
         if not rs or not rn:
             raise ValueError("empty fields")
-        return rs, rn
+        return rs, rn, True
     except Exception:
         # 파싱 실패 시 최소한의 폴백 (둘 다 한 본문으로 반환)
-        txt = res.output_text.strip()
-        return txt[:120], txt
+        txt = output_text.strip()
+        return txt[:120], txt, False
 
 def generate_reply(prompt: str) -> str:
     """
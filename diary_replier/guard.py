@@ -1,4 +1,6 @@
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+
+from .features import TextFeatures, extract_features
 
 # 매우 기본적인 금칙 패턴 (필요 시 확장/정교화)
 RISK_PATTERNS = {
@@ -7,12 +9,13 @@ RISK_PATTERNS = {
     "abuse": ["학대", "가해", "괴롭힘", "스토킹"],
 }
 
-def safety_scan(text: str) -> Tuple[bool, Dict]:
+def safety_scan(text: str, features: Optional[TextFeatures] = None) -> Tuple[bool, Dict]:
+    # lexicon 매처가 text.lower() 기준으로 RISK_PATTERNS 를 한 번에 찾는다 (analyze 와 스캔 공유)
+    risk = extract_features(text, features).risk
     flags = {}
     hit_any = False
-    low_text = text.lower()
-    for k, toks in RISK_PATTERNS.items():
-        hit = any(t in low_text for t in toks)
+    for k in RISK_PATTERNS:
+        hit = risk.get(k, False)
         flags[k] = hit
         hit_any = hit_any or hit
     return hit_any, flags
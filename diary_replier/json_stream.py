@@ -0,0 +1,155 @@
+# diary_replier/json_stream.py
+"""
+스트리밍 중인 LLM 출력에서 최상위 JSON 객체의 문자열 필드를 점진적으로 뽑아낸다.
+
+    p = JsonFieldStream(["reply_short", "reply_normal"])
+    for chunk in tokens:
+        for kind, field, text in p.feed(chunk):
+            # kind == "delta": 필드 값의 새로 디코딩된 조각
+            # kind == "field": 필드 값이 닫힘 (완성된 전체 값)
+
+- 청크 경계가 문자열/이스케이프(\\n, \\uXXXX, 서로게이트 쌍) 중간이어도 된다
+- 객체 앞의 잡음(```json 펜스 등)은 '{' 까지 건너뛴다
+- 추적하지 않는 키의 값(숫자/배열/객체)은 읽고 버린다
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Event = Tuple[str, str, str]  # (kind, field, text)
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JsonFieldStream:
+    def __init__(self, fields: Iterable[str]):
+        self.fields = set(fields)
+        self.values: Dict[str, str] = {}   # 완성된 필드
+        self._buf = ""
+        self._pos = 0
+        self._state = "seek_obj"
+        self._key: Optional[str] = None
+        self._acc: List[str] = []
+        self._depth = 0                    # 추적하지 않는 값 건너뛸 때 괄호 깊이
+
+    @property
+    def finished(self) -> bool:
+        return self._state == "end"
+
+    def feed(self, chunk: str) -> List[Event]:
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        events: List[Event] = []
+        while self._pos < len(self._buf) and self._state != "end":
+            if not self._step(events):
+                break  # 다음 청크가 있어야 진행 가능
+        return events
+
+    # -----------------------------
+    # 상태 머신
+    # -----------------------------
+    def _step(self, events: List[Event]) -> bool:
+        ch = self._buf[self._pos]
+        st = self._state
+
+        if st == "seek_obj":
+            self._pos += 1
+            if ch == "{":
+                self._state = "seek_key"
+            return True
+
+        if st == "seek_key":
+            self._pos += 1
+            if ch == '"':
+                self._state, self._acc = "key", []
+            elif ch == "}":
+                self._state = "end"
+            return True
+
+        if st in ("key", "value"):
+            piece, closed = self._read_string()
+            if piece:
+                self._acc.append(piece)
+                if st == "value" and self._key in self.fields:
+                    events.append(("delta", self._key, piece))
+            if not closed:
+                return False
+            text = "".join(self._acc)
+            if st == "key":
+                self._key, self._state = text, "seek_colon"
+            else:
+                if self._key in self.fields:
+                    self.values[self._key] = text
+                    events.append(("field", self._key, text))
+                self._state = "seek_key"
+            return True
+
+        if st == "seek_colon":
+            self._pos += 1
+            if ch == ":":
+                self._state = "seek_value"
+            return True
+
+        if st == "seek_value":
+            if ch.isspace():
+                self._pos += 1
+            elif ch == '"':
+                self._pos += 1
+                self._state, self._acc = "value", []
+            else:
+                self._state, self._depth = "skip_value", 0
+            return True
+
+        if st == "skip_value":
+            if ch in "[{":
+                self._depth += 1
+            elif ch in "]}":
+                if self._depth == 0:
+                    self._state = "seek_key"  # '}' 는 seek_key 에서 처리
+                    return True
+                self._depth -= 1
+            elif ch == "," and self._depth == 0:
+                self._state = "seek_key"
+            self._pos += 1
+            return True
+
+        return False
+
+    def _read_string(self) -> Tuple[str, bool]:
+        """
+        현재 위치부터 닫는 따옴표 전까지 디코딩. (조각, 닫혔는지)
+        이스케이프가 청크 끝에서 잘리면 그 앞까지만 읽고 멈춘다.
+        """
+        buf, i, out = self._buf, self._pos, []
+        n = len(buf)
+        while i < n:
+            ch = buf[i]
+            if ch == '"':
+                self._pos = i + 1
+                return "".join(out), True
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            if i + 1 >= n:
+                break
+            esc = buf[i + 1]
+            if esc != "u":
+                out.append(_ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            if i + 6 > n:
+                break
+            cp = int(buf[i + 2:i + 6], 16)
+            if 0xD800 <= cp < 0xDC00:
+                # 서로게이트 쌍: 뒤쪽 \uXXXX 까지 있어야 한 글자
+                if i + 12 > n:
+                    break
+                if buf[i + 6:i + 8] == "\\u":
+                    lo = int(buf[i + 8:i + 12], 16)
+                    out.append(chr(0x10000 + ((cp - 0xD800) << 10) + (lo - 0xDC00)))
+                    i += 12
+                    continue
+            out.append(chr(cp))
+            i += 6
+        self._pos = i
+        return "".join(out), False
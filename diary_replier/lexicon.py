@@ -0,0 +1,344 @@
+# diary_replier/lexicon.py
+"""
+감정/긍부정/위험 사전을 하나의 다중 패턴 매처(트라이 정규식)로 컴파일해서
+텍스트를 한 번만 훑고 모든 사전의 히트를 찾는 모듈.
+
+- analyzer(EMO_CODE_LEX / POS_WORDS / NEG_WORDS)와 guard(RISK_PATTERNS)가 같이 사용
+- 결과는 기존 `k in text` / `text.count(w)` 방식과 완전히 같아야 한다
+- LEXICON_CACHE_DIR 가 지정되면 컴파일 결과를 pickle로 저장해서 워커 기동을 빠르게 한다
+- 단어 목록을 바꾼 뒤에는 reload() 로 다시 컴파일
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+from bisect import bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+_CACHE_DIR = os.getenv("LEXICON_CACHE_DIR")  # 빈 값이면 디스크 캐시 사용 안 함
+_FORMAT = 1  # pickle 구조가 바뀌면 올려서 예전 캐시 무효화
+_SEP = "\x00"  # scan_many 에서 텍스트를 이어 붙일 때 쓰는 구분자
+
+Lexicons = Dict[str, Dict[str, List[str]]]  # group -> label -> words
+
+
+class Hit(NamedTuple):
+    start: int
+    end: int
+    group: str
+    label: str
+    word: str
+
+
+def _fold_safe(word: str) -> bool:
+    """
+    word가 lower()의 영향을 받지 않는 문자로만 이루어졌는지.
+    그렇다면 text.lower()에서 찾은 결과와 원문에서 찾은 결과가 같다.
+    (U+0307 은 'İ'.lower() 가 만들어내는 결합 문자라 예외 처리)
+    """
+    return all(ch.lower() == ch == ch.upper() and ch != "\u0307" for ch in word)
+
+
+# -----------------------------
+# 스캔 결과
+# -----------------------------
+class LexiconHits:
+    """
+    matcher.scan() 결과. 패턴별 시작 위치를 들고 있고,
+    그룹/라벨 단위로 any / count / labels 를 계산해준다.
+    """
+
+    __slots__ = ("_matcher", "_starts")
+
+    def __init__(self, matcher: "LexiconMatcher", starts: Dict[int, List[int]]):
+        self._matcher = matcher
+        self._starts = starts  # pattern id -> 시작 위치 (오름차순)
+
+    @property
+    def matcher(self) -> "LexiconMatcher":
+        return self._matcher
+
+    def _nonoverlap(self, pid: int) -> int:
+        # str.count 와 같은 규칙: 왼쪽부터 겹치지 않게 센다
+        starts = self._starts.get(pid)
+        if not starts:
+            return 0
+        size = len(self._matcher.patterns[pid])
+        n, last_end = 0, 0
+        for s in starts:
+            if s >= last_end:
+                n += 1
+                last_end = s + size
+        return n
+
+    def any(self, group: str, label: Optional[str] = None) -> bool:
+        for lab, pids in self._matcher.entries(group, label):
+            if any(pid in self._starts for pid in pids):
+                return True
+        return False
+
+    def count(self, group: str, label: Optional[str] = None) -> int:
+        """`sum(text.count(w) for w in words)` 와 같은 값 (중복 단어도 그대로 반영)."""
+        total = 0
+        for _, pids in self._matcher.entries(group, label):
+            total += sum(self._nonoverlap(pid) for pid in pids)
+        return total
+
+    def labels(self, group: str) -> List[str]:
+        """히트가 하나라도 있는 라벨 목록 (사전 선언 순서 유지)."""
+        return [lab for lab, pids in self._matcher.entries(group) if any(p in self._starts for p in pids)]
+
+    def hits(self, group: Optional[str] = None) -> List[Hit]:
+        """위치 정보가 필요한 경우용. (start, end) 순으로 정렬."""
+        out: List[Hit] = []
+        m = self._matcher
+        for pid, starts in self._starts.items():
+            word = m.patterns[pid]
+            for g, lab in m.owners[pid]:
+                if group is not None and g != group:
+                    continue
+                out.extend(Hit(s, s + len(word), g, lab, word) for s in starts)
+        out.sort(key=lambda h: (h.start, h.end, h.group, h.label))
+        return out
+
+
+# -----------------------------
+# 오토마톤
+# -----------------------------
+class LexiconMatcher:
+    """
+    여러 사전을 한 번에 컴파일한 다중 패턴 매처.
+
+    lexicons  : {group: {label: [word, ...]}}
+    casefold  : text.lower() 기준으로 찾아야 하는 그룹 (guard 의 risk 처럼)
+    """
+
+    def __init__(self, lexicons: Lexicons, casefold: Iterable[str] = ()):
+        self.casefold = frozenset(casefold)
+        self.version = lexicon_version(lexicons, self.casefold)
+
+        self.patterns: List[str] = []
+        self.owners: List[List[Tuple[str, str]]] = []
+        # group -> [(label, (pid, ...)), ...] : 중복 단어도 pid 를 그대로 반복해서 count 를 맞춘다
+        self._groups: Dict[str, List[Tuple[str, Tuple[int, ...]]]] = {}
+
+        pid_of: Dict[str, int] = {}
+        fold_safe = True
+        for group, table in lexicons.items():
+            rows = []
+            for label, words in table.items():
+                pids = []
+                for w in words:
+                    if not w:
+                        raise ValueError(f"empty word in lexicon {group}/{label}")
+                    pid = pid_of.get(w)
+                    if pid is None:
+                        pid = pid_of[w] = len(self.patterns)
+                        self.patterns.append(w)
+                        self.owners.append([])
+                    if (group, label) not in self.owners[pid]:
+                        self.owners[pid].append((group, label))
+                    pids.append(pid)
+                    if group in self.casefold and not _fold_safe(w):
+                        fold_safe = False
+                rows.append((label, tuple(pids)))
+            self._groups[group] = rows
+
+        # casefold 그룹의 단어가 전부 대소문자 무관 문자면 원문 한 번만 스캔해도 결과가 같다
+        self._fold_safe = fold_safe
+        if not fold_safe:
+            for pid, owners in enumerate(self.owners):
+                gs = {g for g, _ in owners}
+                if gs & self.casefold and gs - self.casefold:
+                    raise ValueError(f"word {self.patterns[pid]!r} shared by casefold and plain groups")
+        self._pid_of = pid_of
+        pattern, self._prefixes = _compile(self.patterns)
+        self._rx = re.compile(pattern)
+
+    # 직렬화 (디스크 캐시)
+    def __getstate__(self):
+        return {k: getattr(self, k) for k in (
+            "casefold", "version", "patterns", "owners", "_groups", "_fold_safe", "_pid_of", "_prefixes", "_rx"
+        )}
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+
+    def entries(self, group: str, label: Optional[str] = None) -> List[Tuple[str, Tuple[int, ...]]]:
+        rows = self._groups.get(group, [])
+        if label is None:
+            return rows
+        return [r for r in rows if r[0] == label]
+
+    def _run(self, text: str) -> Dict[int, List[int]]:
+        starts: Dict[int, List[int]] = {}
+        pid_of, prefixes = self._pid_of, self._prefixes
+        # 위치마다 가장 긴 단어 하나만 잡히고, 같은 위치의 짧은 단어는 전부 그 접두어라 표로 펼친다
+        for m in self._rx.finditer(text):
+            s = m.start()
+            for pid in prefixes[pid_of[m.group(1)]]:
+                lst = starts.get(pid)
+                if lst is None:
+                    starts[pid] = [s]
+                else:
+                    lst.append(s)
+        return starts
+
+    def scan_many(self, texts: List[str]) -> List[LexiconHits]:
+        """
+        여러 텍스트를 구분자로 이어 붙여 정규식 한 번으로 스캔한 뒤 텍스트별로 나눈다.
+        구분자(\x00)는 어떤 단어에도 없어서 텍스트 경계를 넘는 히트는 생기지 않는다.
+        """
+        if not texts:
+            return []
+        if not self._fold_safe or any(_SEP in t for t in texts) or any(_SEP in w for w in self.patterns):
+            return [self.scan(t) for t in texts]
+        bounds = []
+        pos = 0
+        for t in texts:
+            bounds.append(pos)
+            pos += len(t) + len(_SEP)
+        joined = _SEP.join(texts)
+        per_text: List[Dict[int, List[int]]] = [{} for _ in texts]
+        # pid 단위 결과를 위치 기준으로 텍스트에 분배 (starts 가 오름차순이라 텍스트별 순서도 유지)
+        for pid, starts in self._run(joined).items():
+            for s in starts:
+                i = bisect_right(bounds, s) - 1
+                per_text[i].setdefault(pid, []).append(s - bounds[i])
+        return [LexiconHits(self, st) for st in per_text]
+
+    def scan(self, text: str) -> LexiconHits:
+        starts = self._run(text)
+        if self.casefold and not self._fold_safe:
+            low = text.lower()
+            if low != text:
+                # casefold 그룹 결과만 소문자 텍스트 기준으로 교체
+                folded = self._run(low)
+                for pid in set(starts) | set(folded):
+                    if self.owners[pid][0][0] in self.casefold:
+                        if pid in folded:
+                            starts[pid] = folded[pid]
+                        else:
+                            starts.pop(pid, None)
+        return LexiconHits(self, starts)
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    trie: Dict[str, dict] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        kids = [re.escape(ch) + emit(sub) for ch, sub in sorted(node.items()) if ch]
+        if not kids:
+            return ""
+        body = kids[0] if len(kids) == 1 else "(?:" + "|".join(kids) + ")"
+        # 단어 끝이면서 더 긴 단어로 이어질 수 있는 노드: 탐욕적으로 긴 쪽부터 시도
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+def _compile(patterns: List[str]) -> Tuple[str, List[Tuple[int, ...]]]:
+    """
+    단어 목록을 트라이 형태의 정규식 하나로 컴파일한다.
+
+    - 첫 글자 문자집합 lookahead 로 후보가 아닌 위치는 re 엔진(C)이 바로 건너뛴다
+    - 트라이 분기라 후보 위치에서도 단어 길이만큼만 본다 → 텍스트 길이에 선형
+    - 캡처가 lookahead 안에 있어서 겹치는 히트(다른 시작 위치)도 전부 잡힌다
+    prefixes[pid] 는 pid 단어의 접두어인 단어들(자기 자신 포함).
+    """
+    if not patterns:
+        return "(?!)", []
+    first = "".join(sorted({re.escape(w[0]) for w in patterns}))
+    rx = f"(?=[{first}])(?=({_trie_regex(patterns)}))"
+    prefixes = [
+        tuple(q for q, other in enumerate(patterns) if w.startswith(other))
+        for w in patterns
+    ]
+    return rx, prefixes
+
+
+def lexicon_version(lexicons: Lexicons, casefold: Iterable[str] = ()) -> str:
+    raw = json.dumps([_FORMAT, lexicons, sorted(casefold)], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+# -----------------------------
+# 기본 매처 (analyzer + guard 사전)
+# -----------------------------
+def default_lexicons() -> Lexicons:
+    # 호출 시점의 모듈 값을 읽어야 reload() 가 바뀐 목록을 반영한다
+    from .analyzer import EMO_CODE_LEX, POS_WORDS, NEG_WORDS
+    from .guard import RISK_PATTERNS
+    return {
+        "emo": {k: list(v) for k, v in EMO_CODE_LEX.items()},
+        "pos": {"pos": list(POS_WORDS)},
+        "neg": {"neg": list(NEG_WORDS)},
+        "risk": {k: list(v) for k, v in RISK_PATTERNS.items()},
+    }
+
+
+_DEFAULT_CASEFOLD = ("risk",)
+_matcher: Optional[LexiconMatcher] = None
+_lock = threading.Lock()
+
+
+def _cache_path(version: str) -> Optional[str]:
+    if not _CACHE_DIR:
+        return None
+    return os.path.join(_CACHE_DIR, f"lexicon-{version}.pkl")
+
+
+def _load_or_build(lexicons: Lexicons) -> LexiconMatcher:
+    path = _cache_path(lexicon_version(lexicons, _DEFAULT_CASEFOLD))
+    if path and os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                m = pickle.load(f)
+            if isinstance(m, LexiconMatcher):
+                return m
+        except Exception:
+            pass  # 깨진 캐시는 무시하고 새로 만든다
+
+    m = LexiconMatcher(lexicons, casefold=_DEFAULT_CASEFOLD)
+    if path:
+        try:
+            os.makedirs(_CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(m, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+    return m
+
+
+def get_matcher() -> LexiconMatcher:
+    global _matcher
+    m = _matcher
+    if m is None:
+        with _lock:
+            if _matcher is None:
+                _matcher = _load_or_build(default_lexicons())
+            m = _matcher
+    return m
+
+
+def reload() -> LexiconMatcher:
+    """EMO_CODE_LEX / POS_WORDS / NEG_WORDS / RISK_PATTERNS 변경 후 호출."""
+    global _matcher
+    with _lock:
+        _matcher = _load_or_build(default_lexicons())
+        return _matcher
+
+
+def scan(text: str) -> LexiconHits:
+    return get_matcher().scan(text)
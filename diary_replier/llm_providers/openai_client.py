@@ -7,11 +7,32 @@ try:
 except ImportError:
     OpenAI = None
 
-class OpenAILLMClient:
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+from .base import BaseLLMClient
+
+class OpenAILLMClient(BaseLLMClient):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, client: Any = None):
+        super().__init__(model or os.getenv("DIARY_MODEL_NAME", "gpt-4o-mini"))
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        self.model = model or os.getenv("DIARY_MODEL_NAME", "gpt-4o-mini")
-        self._client = OpenAI(api_key=self.api_key) if OpenAI else None
+        self.model = self.model_name
+        # client 를 넘기면 (레지스트리의 공유 풀) 그대로 쓴다
+        if client is not None:
+            self._client = client
+        else:
+            self._client = OpenAI(api_key=self.api_key) if OpenAI else None
+
+    @property
+    def raw(self):
+        """openai.OpenAI SDK 클라이언트 (공유 풀)."""
+        return self._client
+
+    def call(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        return self.chat(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            **kwargs,
+        )
 
     def chat(self, messages: List[Dict[str, str]], temperature: float = 0.6) -> str:
         # openai 패키지 없거나 키 없으면 폴백
@@ -0,0 +1,655 @@
+# diary_replier/llm_providers/ratelimit.py
+"""
+LLM 아웃바운드 호출 제한기 (요청/토큰 버킷 + AIMD 동시성 창).
+
+모든 SDK 클라이언트가 registry 의 httpx 풀을 쓰므로 그 풀의 transport 를 감싸서
+generator / chat-to-diary / 그림일기 호출이 한 제한기를 거치게 한다.
+
+- 토큰 버킷 2개: 분당 요청 수(requests), 분당 토큰 수(tokens, 입력 추정 + 출력 예약)
+  버킷 상태는 SQLite 파일(LLM_RATE_STORE)에 있어서 같은 호스트의 워커 프로세스끼리 공유한다.
+  모자라면 빚을 지고(음수) 갚을 때까지 기다린다 → 버스트가 순서대로 줄을 선다
+- 응답의 x-ratelimit-* 헤더로 버킷을 보정: 남은 양(remaining)이 우리 추정보다 적으면 맞춘다
+  (다른 호스트/키 공유분까지 반영). LLM_RPM/LLM_TPM 을 안 정하면 limit 헤더 값을 한도로 배운다.
+  429 의 retry-after 동안은 모든 버킷을 막는다
+- AIMD 동시성 창(프로세스별): 성공하면 창을 조금씩(+1/창) 늘리고, 429/503 이면 절반으로 줄인다
+- 대기가 LLM_RATE_WAIT_MAX 초를 넘으면 보내지 않고 로컬 429(retry-after) 응답을 돌려준다
+  (SDK/재시도 로직이 보통의 429 처럼 다룬다)
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+import httpx
+
+LLM_RPM = int(os.getenv("LLM_RPM", "0"))  # 0 이면 응답 헤더로 배운다
+LLM_TPM = int(os.getenv("LLM_TPM", "0"))
+LLM_RATE_STORE = os.getenv("LLM_RATE_STORE", "./llm_ratelimit.db")  # 빈 값이면 프로세스 내(:memory:)
+LLM_RATE_WAIT_MAX = float(os.getenv("LLM_RATE_WAIT_MAX", "30"))
+LLM_OUTPUT_RESERVE = int(os.getenv("LLM_OUTPUT_RESERVE", "300"))  # max_tokens 가 없을 때 출력 예약 토큰
+LLM_CONCURRENCY_MAX = int(os.getenv("LLM_CONCURRENCY_MAX", "64"))
+LLM_CONCURRENCY_MIN = int(os.getenv("LLM_CONCURRENCY_MIN", "2"))
+
+REQUESTS, TOKENS = "requests", "tokens"
+LOCAL_LIMIT_HEADER = "x-local-ratelimit"
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """retry-after / x-ratelimit-reset-* 값("1s", "6m0s", "20ms", "0.5") → 초."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _UNIT_SECONDS[u] for n, u in parts)
+
+
+def _header_int(headers: httpx.Headers, name: str) -> Optional[int]:
+    v = headers.get(name)
+    try:
+        return int(float(v)) if v is not None else None
+    except ValueError:
+        return None
+
+
+# -----------------------------
+# 요청 토큰 추정
+# -----------------------------
+_TEXT_KEYS = ("input", "messages", "instructions", "content", "text")
+
+
+def _iter_text(node: Any) -> Iterable[str]:
+    # 메시지/입력 안의 문자열만 모은다 (image_url 등은 제외)
+    if isinstance(node, str):
+        yield node
+    elif isinstance(node, list):
+        for x in node:
+            yield from _iter_text(x)
+    elif isinstance(node, dict):
+        for k in _TEXT_KEYS:
+            if k in node:
+                yield from _iter_text(node[k])
+
+
+def estimate_request_tokens(content: bytes) -> int:
+    """요청 바디 → 입력 추정 토큰 + 출력 예약(max_output_tokens/max_tokens, 없으면 LLM_OUTPUT_RESERVE)."""
+    from diary_replier.compaction import estimate_tokens
+
+    try:
+        body = json.loads(content) if content else {}
+    except ValueError:
+        return LLM_OUTPUT_RESERVE
+    if not isinstance(body, dict):
+        return LLM_OUTPUT_RESERVE
+    text_in = sum(estimate_tokens(s) for s in _iter_text(body))
+    out = body.get("max_output_tokens") or body.get("max_completion_tokens") or body.get("max_tokens")
+    return text_in + int(out or LLM_OUTPUT_RESERVE)
+
+
+# -----------------------------
+# 버킷 저장소 (SQLite, 프로세스 간 공유)
+# -----------------------------
+class BucketStore:
+    """
+    name → (capacity, level, updated, blocked_until). 1 window(기본 60초)에 capacity 만큼 찬다.
+    capacity 가 0 이면 제한 없음. 모든 갱신은 BEGIN IMMEDIATE 트랜잭션 하나.
+    """
+
+    def __init__(self, path: Optional[str], *, window: float = 60.0):
+        self.path = path or ":memory:"
+        self.window = window
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0, isolation_level=None)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_buckets ("
+                " name TEXT PRIMARY KEY,"
+                " capacity REAL NOT NULL,"
+                " level REAL NOT NULL,"
+                " updated REAL NOT NULL,"
+                " blocked_until REAL NOT NULL DEFAULT 0)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _load(self, db: sqlite3.Connection, name: str, now: float) -> Tuple[float, float, float]:
+        row = db.execute(
+            "SELECT capacity, level, updated, blocked_until FROM llm_buckets WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return 0.0, 0.0, 0.0
+        capacity, level, updated, blocked = row
+        if capacity > 0:
+            level = min(capacity, level + (now - updated) * capacity / self.window)
+        return capacity, level, blocked
+
+    def _save(self, db, name: str, capacity: float, level: float, now: float, blocked: float) -> None:
+        db.execute(
+            "INSERT OR REPLACE INTO llm_buckets (name, capacity, level, updated, blocked_until) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (name, capacity, level, now, blocked),
+        )
+
+    def configure(self, name: str, capacity: float) -> None:
+        """한도를 정한다 (처음이면 가득 찬 상태로). 이미 있으면 한도만 바꾼다."""
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                old_cap, level, blocked = self._load(db, name, now)
+                if old_cap <= 0:
+                    level = capacity
+                self._save(db, name, capacity, min(level, capacity), now, blocked)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def take(self, amounts: Dict[str, float], max_wait: float) -> Optional[float]:
+        """
+        버킷들에서 amounts 만큼 한꺼번에 뺀다 (모자라면 빚).
+        기다려야 할 초를 돌려준다. max_wait 를 넘으면 빼지 않고 None.
+        한 요청이 한도보다 크면 한도만큼만 뺀다 (영원히 못 보내는 일 방지).
+        """
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                wait = 0.0
+                rows = {}
+                for name, n in amounts.items():
+                    capacity, level, blocked = self._load(db, name, now)
+                    rows[name] = (capacity, level, blocked)
+                    if capacity <= 0:
+                        continue
+                    after = level - min(n, capacity)
+                    debt_wait = -after * self.window / capacity if after < 0 else 0.0
+                    wait = max(wait, debt_wait, blocked - now)
+                if wait > max_wait:
+                    db.execute("ROLLBACK")
+                    return None
+                for name, n in amounts.items():
+                    capacity, level, blocked = rows[name]
+                    if capacity > 0:
+                        self._save(db, name, capacity, level - min(n, capacity), now, blocked)
+                db.execute("COMMIT")
+                return wait
+            except BaseException:
+                if db.in_transaction:
+                    db.execute("ROLLBACK")
+                raise
+
+    def sync(self, name: str, *, limit: Optional[int], remaining: Optional[int], learn_limit: bool) -> None:
+        """
+        응답 헤더 값으로 보정: 한도 학습, 남은 양이 더 적으면 맞춤.
+        (reset 헤더는 "다 찰 때까지" 시간이라 쓰지 않는다. remaining 에 맞춘 뒤엔 버킷 보충 속도로 충분)
+        """
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                capacity, level, blocked = self._load(db, name, now)
+                if learn_limit and limit:
+                    if capacity <= 0:
+                        level = float(limit)
+                    capacity = float(limit)
+                if capacity > 0:
+                    if remaining is not None:
+                        level = min(level, float(remaining))
+                    self._save(db, name, capacity, level, now, blocked)
+                db.execute("COMMIT")
+            except BaseException:
+                if db.in_transaction:
+                    db.execute("ROLLBACK")
+                raise
+
+    def refund(self, amounts: Dict[str, float]) -> None:
+        """take() 로 뺀 양을 되돌린다 (보내지 못하고 끝난 요청). 한도를 넘게 채우지는 않는다."""
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                for name, n in amounts.items():
+                    capacity, level, blocked = self._load(db, name, now)
+                    if capacity > 0:
+                        self._save(db, name, capacity, min(capacity, level + min(n, capacity)), now, blocked)
+                db.execute("COMMIT")
+            except BaseException:
+                if db.in_transaction:
+                    db.execute("ROLLBACK")
+                raise
+
+    def block(self, seconds: float) -> None:
+        """retry-after 만큼 모든 버킷을 막는다 (429 응답)."""
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "UPDATE llm_buckets SET blocked_until = MAX(blocked_until, ?)", (time.time() + seconds,)
+            )
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            if self._conn is None and self.path != ":memory:" and not os.path.exists(self.path):
+                return {}
+            db = self._db()
+            names = [r[0] for r in db.execute("SELECT name FROM llm_buckets")]
+            now = time.time()
+            out = {}
+            for name in names:
+                capacity, level, blocked = self._load(db, name, now)
+                out[name] = {
+                    "limit_per_window": capacity,
+                    "level": round(level, 1),
+                    "blocked_for_s": round(max(0.0, blocked - now), 2),
+                }
+            return out
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._conn is not None or self.path == ":memory:" or os.path.exists(self.path):
+                self._db().execute("DELETE FROM llm_buckets")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# -----------------------------
+# AIMD 동시성 창 (프로세스 내)
+# -----------------------------
+class ConcurrencyWindow:
+    """
+    동시에 나가 있는 호출 수 상한. 성공마다 limit += 1/limit (창 하나가 다 성공하면 +1),
+    과부하 신호(429/503)면 limit /= 2. 동기/비동기 호출자가 같은 창을 쓴다.
+    """
+
+    def __init__(self, max_limit: int = LLM_CONCURRENCY_MAX, min_limit: int = LLM_CONCURRENCY_MIN):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.decreases = 0
+        self._cond = threading.Condition()
+        self._async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    def _try_enter(self) -> bool:
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def _wake(self) -> None:
+        # _cond 잡은 상태에서 호출. 빈 자리만큼 깨운다 (깨어난 쪽이 다시 확인)
+        free = int(self.limit) - self.in_flight
+        if free <= 0:
+            return
+        self._cond.notify(free)
+        while free > 0 and self._async_waiters:
+            loop, fut = self._async_waiters.popleft()
+            loop.call_soon_threadsafe(lambda f=fut: f.done() or f.set_result(None))
+            free -= 1
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(self._try_enter, timeout)
+
+    async def aacquire(self, timeout: Optional[float] = None) -> bool:
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._cond:
+                if self._try_enter():
+                    return True
+                fut = loop.create_future()
+                self._async_waiters.append((loop, fut))
+            remaining = None if deadline is None else deadline - loop.time()
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(fut, remaining)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                with self._cond:
+                    try:
+                        self._async_waiters.remove((loop, fut))
+                    except ValueError:
+                        # 이미 깨워진 뒤에 그만둔다 → 받은 차례를 다음 대기자에게 넘긴다
+                        self._wake()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                return False
+
+    def release(self, *, overloaded: bool = False, success: bool = False) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if overloaded:
+                self.limit = max(float(self.min_limit), self.limit / 2)
+                self.decreases += 1
+            elif success:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "max": self.max_limit,
+                "min": self.min_limit,
+                "decreases": self.decreases,
+                "async_waiters": len(self._async_waiters),
+            }
+
+
+# -----------------------------
+# 제한기
+# -----------------------------
+class OutboundLimiter:
+    def __init__(
+        self,
+        store: BucketStore,
+        *,
+        rpm: int = LLM_RPM,
+        tpm: int = LLM_TPM,
+        window: Optional[ConcurrencyWindow] = None,
+        max_wait: float = LLM_RATE_WAIT_MAX,
+    ):
+        self.store = store
+        self.window = window or ConcurrencyWindow()
+        self.max_wait = max_wait
+        self._learn = {REQUESTS: rpm <= 0, TOKENS: tpm <= 0}
+        self._configured = False
+        self._configure_lock = threading.Lock()
+        self._limits = {REQUESTS: rpm, TOKENS: tpm}
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.queued = 0
+        self.wait_sum = 0.0
+        self.rejected = 0
+        self.refunded = 0  # 버킷에서 뺐지만 동시성 창을 못 얻어 되돌린 수
+        self.throttled = 0  # 서버 429 수
+
+    def _ensure_configured(self) -> None:
+        # 첫 호출 때 설정한 한도를 저장소에 반영 (import 만으로 파일을 만들지 않게)
+        if self._configured:
+            return
+        with self._configure_lock:
+            if not self._configured:
+                for name, cap in self._limits.items():
+                    if cap > 0:
+                        self.store.configure(name, cap)
+                self._configured = True
+
+    @staticmethod
+    def _amounts(request: httpx.Request) -> Dict[str, float]:
+        return {REQUESTS: 1.0, TOKENS: float(estimate_request_tokens(request.content))}
+
+    def _reserve(self, amounts: Dict[str, float]) -> Optional[float]:
+        self._ensure_configured()
+        wait = self.store.take(amounts, self.max_wait)
+        with self._stats_lock:
+            self.requests += 1
+            if wait is None:
+                self.rejected += 1
+            elif wait > 0:
+                self.queued += 1
+                self.wait_sum += wait
+        return wait
+
+    def _refund(self, amounts: Dict[str, float]) -> None:
+        self.store.refund(amounts)
+        with self._stats_lock:
+            self.refunded += 1
+
+    def acquire(self, request: httpx.Request) -> bool:
+        t0 = time.monotonic()
+        amounts = self._amounts(request)
+        wait = self._reserve(amounts)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        if self.window.acquire(max(0.0, self.max_wait - (time.monotonic() - t0))):
+            return True
+        self._refund(amounts)
+        return False
+
+    async def aacquire(self, request: httpx.Request) -> bool:
+        t0 = time.monotonic()
+        amounts = self._amounts(request)
+        loop = asyncio.get_running_loop()
+        # 저장소는 BEGIN IMMEDIATE 라 다른 워커와 락을 다툴 수 있다 (최대 sqlite timeout) → 스레드에서
+        reserving = loop.run_in_executor(None, self._reserve, amounts)
+        try:
+            wait = await asyncio.shield(reserving)
+        except asyncio.CancelledError:
+            # 스레드의 take() 는 끝까지 간다 → 빼졌으면 되돌린다
+            reserving.add_done_callback(
+                lambda f: f.cancelled() or f.exception() or f.result() is None
+                or loop.run_in_executor(None, self._refund, amounts)
+            )
+            raise
+        if wait is None:
+            return False
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+            ok = await self.window.aacquire(max(0.0, self.max_wait - (time.monotonic() - t0)))
+        except asyncio.CancelledError:
+            # 취소된 태스크는 더 기다리지 않고 되돌림만 스레드로 넘긴다
+            loop.run_in_executor(None, self._refund, amounts)
+            raise
+        if not ok:
+            await asyncio.to_thread(self._refund, amounts)
+        return ok
+
+    def observe(self, response: httpx.Response) -> None:
+        """응답 헤더로 버킷 보정 + 동시성 창 조절. 슬롯은 release() 에서 반납."""
+        h = response.headers
+        for name in (REQUESTS, TOKENS):
+            limit = _header_int(h, f"x-ratelimit-limit-{name}")
+            remaining = _header_int(h, f"x-ratelimit-remaining-{name}")
+            if limit is None and remaining is None:
+                continue
+            self.store.sync(
+                name,
+                limit=limit,
+                remaining=remaining,
+                learn_limit=self._learn[name],
+            )
+        if response.status_code == 429:
+            with self._stats_lock:
+                self.throttled += 1
+            retry_after = (
+                parse_duration(h.get("retry-after-ms")) / 1000 if h.get("retry-after-ms")
+                else parse_duration(h.get("retry-after"))
+            )
+            if retry_after:
+                self.store.block(retry_after)
+
+    async def aobserve(self, response: httpx.Response) -> None:
+        await asyncio.to_thread(self.observe, response)
+
+    def local_429(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            429,
+            headers={"retry-after": str(math.ceil(self.max_wait)), LOCAL_LIMIT_HEADER: "1"},
+            json={"error": {"message": "local LLM rate limit: queue wait too long", "type": "rate_limit_error"}},
+            request=request,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            s = {
+                "requests": self.requests,
+                "queued": self.queued,
+                "avg_wait_ms": round(self.wait_sum / self.queued * 1000, 1) if self.queued else 0.0,
+                "rejected": self.rejected,
+                "refunded": self.refunded,
+                "throttled_429": self.throttled,
+            }
+        s["store"] = self.store.path
+        s["buckets"] = self.store.snapshot()
+        s["concurrency"] = self.window.stats()
+        return s
+
+
+def _is_overloaded(status: int) -> bool:
+    return status in (429, 503)
+
+
+# -----------------------------
+# httpx transport 래퍼
+# -----------------------------
+class _ReleasingStream(httpx.SyncByteStream):
+    # 스트리밍 응답은 본문을 다 읽거나 닫을 때 슬롯을 반납한다
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+def _once(fn):
+    done = False
+
+    def wrapper(**kw):
+        nonlocal done
+        if not done:
+            done = True
+            fn(**kw)
+    return wrapper
+
+
+def _wrap_response(request: httpx.Request, response: httpx.Response, stream) -> httpx.Response:
+    return httpx.Response(
+        response.status_code,
+        headers=response.headers,
+        stream=stream,
+        extensions=response.extensions,
+        request=request,
+    )
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """POST(생성 호출)만 제한기를 거친다. GET(models.list 워밍업 등)은 그대로."""
+
+    def __init__(self, inner: httpx.BaseTransport, limiter: OutboundLimiter):
+        self.inner = inner
+        self.limiter = limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "POST":
+            return self.inner.handle_request(request)
+        if not self.limiter.acquire(request):
+            return self.limiter.local_429(request)
+        release = _once(self.limiter.window.release)
+        try:
+            response = self.inner.handle_request(request)
+        except BaseException:
+            release()
+            raise
+        try:
+            self.limiter.observe(response)
+        except BaseException:
+            release()
+            response.close()
+            raise
+        ok = response.status_code < 400
+        return _wrap_response(
+            request,
+            response,
+            _ReleasingStream(response.stream,
+                             lambda: release(overloaded=_is_overloaded(response.status_code), success=ok)),
+        )
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, limiter: OutboundLimiter):
+        self.inner = inner
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "POST":
+            return await self.inner.handle_async_request(request)
+        if not await self.limiter.aacquire(request):
+            return self.limiter.local_429(request)
+        release = _once(self.limiter.window.release)
+        try:
+            response = await self.inner.handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+        try:
+            await self.limiter.aobserve(response)
+        except BaseException:
+            release()
+            await response.aclose()
+            raise
+        ok = response.status_code < 400
+        return _wrap_response(
+            request,
+            response,
+            _AsyncReleasingStream(response.stream,
+                                  lambda: release(overloaded=_is_overloaded(response.status_code), success=ok)),
+        )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+limiter = OutboundLimiter(BucketStore(LLM_RATE_STORE))
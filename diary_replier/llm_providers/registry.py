@@ -0,0 +1,188 @@
+# diary_replier/llm_providers/registry.py
+"""
+LLM 프로바이더 레지스트리 + 공유 커넥션 풀.
+
+일기 답장 / chat-to-diary / 그림일기가 각자 OpenAI() 를 만들면 모듈마다 풀이 따로라
+TLS 핸드셰이크와 풀 한도가 따로 논다. 여기서 httpx 풀(동기/비동기 각 1개)을 하나씩만 만들고
+모든 SDK 클라이언트가 그 풀을 공유한다.
+
+    from diary_replier.llm_providers.registry import registry
+    client = registry.openai()          # openai.OpenAI (공유 풀)
+    aclient = registry.async_openai()   # openai.AsyncOpenAI (공유 풀)
+    llm = registry.get_provider()       # BaseLLMClient 구현 (LLM_PROVIDER, 기본 openai)
+
+풀 한도/타임아웃은 LLM_* 환경변수, 기동 시 preconnect() 로 keep-alive 연결을 미리 연다.
+풀의 transport 는 아웃바운드 제한기(ratelimit.py: 요청/토큰 버킷 + AIMD 동시성)로 감싼다 (LLM_RATE_LIMIT=0 이면 끔).
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import httpx
+
+from .base import BaseLLMClient
+from .ratelimit import AsyncRateLimitedTransport, OutboundLimiter, RateLimitedTransport, limiter as _default_limiter
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_SDK_MAX_RETRIES = int(os.getenv("LLM_SDK_MAX_RETRIES", "0"))  # 재시도는 generator._call_with_retry 가 한다
+LLM_PRECONNECT = int(os.getenv("LLM_PRECONNECT", "2"))
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+LLM_RATE_LIMIT = os.getenv("LLM_RATE_LIMIT", "1") == "1"
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+
+class LLMRegistry:
+    def __init__(self, limiter: Optional[OutboundLimiter] = None):
+        self.limiter = limiter
+        self._lock = threading.Lock()
+        self._http: Optional[httpx.Client] = None
+        self._ahttp: Optional[httpx.AsyncClient] = None
+        self._openai = None
+        self._async_openai = None
+        self._factories: Dict[str, Callable[["LLMRegistry"], BaseLLMClient]] = {}
+        self._providers: Dict[str, BaseLLMClient] = {}
+
+    # -----------------------------
+    # 공유 풀 / SDK 클라이언트
+    # -----------------------------
+    def http(self) -> httpx.Client:
+        with self._lock:
+            if self._http is None:
+                transport: httpx.BaseTransport = httpx.HTTPTransport(limits=_limits())
+                if self.limiter is not None:
+                    transport = RateLimitedTransport(transport, self.limiter)
+                self._http = httpx.Client(transport=transport, timeout=_timeout())
+            return self._http
+
+    def async_http(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._ahttp is None:
+                transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(limits=_limits())
+                if self.limiter is not None:
+                    transport = AsyncRateLimitedTransport(transport, self.limiter)
+                self._ahttp = httpx.AsyncClient(transport=transport, timeout=_timeout())
+            return self._ahttp
+
+    def openai(self):
+        if self._openai is None:
+            from openai import OpenAI
+            client = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                http_client=self.http(),
+                max_retries=LLM_SDK_MAX_RETRIES,
+            )
+            with self._lock:
+                self._openai = self._openai or client
+        return self._openai
+
+    def async_openai(self):
+        if self._async_openai is None:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                http_client=self.async_http(),
+                max_retries=LLM_SDK_MAX_RETRIES,
+            )
+            with self._lock:
+                self._async_openai = self._async_openai or client
+        return self._async_openai
+
+    # -----------------------------
+    # 프로바이더 (BaseLLMClient 구현)
+    # -----------------------------
+    def register(self, name: str, factory: Callable[["LLMRegistry"], BaseLLMClient]) -> None:
+        with self._lock:
+            self._factories[name] = factory
+            self._providers.pop(name, None)
+
+    def get_provider(self, name: Optional[str] = None) -> BaseLLMClient:
+        name = name or LLM_PROVIDER
+        with self._lock:
+            if name in self._providers:
+                return self._providers[name]
+            factory = self._factories.get(name)
+        if factory is None:
+            raise KeyError(f"unknown LLM provider: {name}")
+        provider = factory(self)
+        with self._lock:
+            return self._providers.setdefault(name, provider)
+
+    # -----------------------------
+    # 기동/종료
+    # -----------------------------
+    def preconnect(self, n: int = LLM_PRECONNECT) -> int:
+        """
+        동기 풀에 keep-alive 연결(TLS 포함)을 n 개 미리 연다. 인증된 가벼운 GET(models.list).
+        동시에 보내야 연결이 n 개 생긴다 (순차면 1개를 재사용).
+        """
+        if n <= 0:
+            return 0
+        client = self.openai().with_options(timeout=LLM_CONNECT_TIMEOUT, max_retries=0)
+        with ThreadPoolExecutor(max_workers=n) as ex:
+            list(ex.map(lambda _: client.models.list(), range(n)))
+        return n
+
+    async def apreconnect(self, n: int = LLM_PRECONNECT) -> int:
+        """비동기 풀 버전. 이벤트 루프 안(lifespan)에서 호출."""
+        import asyncio
+        if n <= 0:
+            return 0
+        client = self.async_openai().with_options(timeout=LLM_CONNECT_TIMEOUT, max_retries=0)
+        await asyncio.gather(*(client.models.list() for _ in range(n)))
+        return n
+
+    def pool_stats(self) -> Dict:
+        return {
+            "max_connections": LLM_MAX_CONNECTIONS,
+            "max_keepalive": LLM_MAX_KEEPALIVE,
+            "keepalive_expiry": LLM_KEEPALIVE_EXPIRY,
+            "timeout": LLM_TIMEOUT,
+            "connect_timeout": LLM_CONNECT_TIMEOUT,
+            "sync_pool": self._http is not None,
+            "async_pool": self._ahttp is not None,
+            "providers": sorted(self._factories),
+            "rate_limited": self.limiter is not None,
+        }
+
+    # 프로세스를 끝낼 때(스크립트 등)만. 앱 lifespan 은 부르지 않는다 (import 때 받은 클라이언트를 모듈들이 계속 쓴다)
+    # 닫은 뒤 다시 openai()/http() 를 부르면 새 풀로 만든다
+    def close(self) -> None:
+        with self._lock:
+            http, self._http, self._openai = self._http, None, None
+            self._providers.clear()
+        if http is not None:
+            http.close()
+
+    async def aclose(self) -> None:
+        with self._lock:
+            ahttp, self._ahttp, self._async_openai = self._ahttp, None, None
+        if ahttp is not None:
+            await ahttp.aclose()
+
+
+registry = LLMRegistry(limiter=_default_limiter if LLM_RATE_LIMIT else None)
+
+
+def _openai_provider(reg: LLMRegistry) -> BaseLLMClient:
+    from .openai_client import OpenAILLMClient
+    return OpenAILLMClient(client=reg.openai())
+
+
+registry.register("openai", _openai_provider)
@@ -0,0 +1,93 @@
+# diary_replier/metrics.py
+"""
+프로세스 내 지연 시간 분포 (최근 N개 슬라이딩 윈도).
+
+    observe("generate", 812.0)
+    latency_stats()  # {"generate": {"count", "p50", "p95", "p99", "max"}}
+
+퍼센타일은 최근 값만 보므로 배포/부하 변화에 바로 따라간다.
+"""
+
+import math
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "1000"))
+
+
+def _nearest_rank(xs: List[float], p: float) -> float:
+    # xs 는 정렬된 상태
+    return xs[min(len(xs) - 1, max(0, math.ceil(p / 100 * len(xs)) - 1))]
+
+
+class LatencyWindow:
+    def __init__(self, maxlen: int = LATENCY_WINDOW):
+        self._values: Deque[float] = deque(maxlen=max(1, maxlen))
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def add(self, ms: float) -> None:
+        with self._lock:
+            self._values.append(ms)
+            self.total += 1
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """p: 0~100. 값이 없으면 None. (nearest-rank)"""
+        with self._lock:
+            if not self._values:
+                return None
+            xs = sorted(self._values)
+        return _nearest_rank(xs, p)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            xs = sorted(self._values)
+        if not xs:
+            return {"count": self.total, "window": 0}
+
+        def pct(p):
+            return round(_nearest_rank(xs, p), 1)
+
+        return {
+            "count": self.total,
+            "window": len(xs),
+            "p50": pct(50),
+            "p95": pct(95),
+            "p99": pct(99),
+            "max": round(xs[-1], 1),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self.total = 0
+
+
+_windows: Dict[str, LatencyWindow] = {}
+_windows_lock = threading.Lock()
+
+
+def window(name: str) -> LatencyWindow:
+    w = _windows.get(name)
+    if w is None:
+        with _windows_lock:
+            w = _windows.setdefault(name, LatencyWindow())
+    return w
+
+
+def observe(name: str, ms: float) -> None:
+    window(name).add(ms)
+
+
+def latency_stats() -> Dict[str, Dict]:
+    return {name: w.snapshot() for name, w in sorted(_windows.items())}
+
+
+def reset() -> None:
+    for w in list(_windows.values()):
+        w.clear()
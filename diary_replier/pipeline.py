@@ -1,10 +1,35 @@
 import time
+import logging
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .schemas import DiaryInput, DiaryReplyOutput
+from .schemas import DiaryInput, DiaryReplyOutput, AnalysisResult
 from .analyzer import analyze
+from .features import TextFeatures
 from .guard import safety_scan
-from .generator import generate_pair
-from api.models import save_diary_log, get_user_preset
+from .compaction import Compacted, compact, record as record_compaction
+from . import metrics
+from .generator import generate_pair, generate_pair_async, stream_pair_async, llm_usage
+from .reply_cache import reply_cache_status
+from .result_cache import text_key
+from .singleflight import SingleFlight, coalesced
+from .resilience import CircuitOpenError
+from .stages import Stage, StageGraph, StageRun, stage_timings
+from api.models import AsyncSessionLocal, get_session, save_diary_log, save_diary_log_async
+from api.log_writer import log_writer
+from api.preset_cache import UserSettings, preset_cache
+
+logger = logging.getLogger("app")
+
+# LLM 서킷이 열려 있어 기본 답장으로 대신했는지 (라우터가 X-Degraded 헤더로 노출)
+reply_degraded: ContextVar[bool] = ContextVar("reply_degraded", default=False)
+
+# 동시에 들어온 같은 (사용자, 일기, 프리셋, 무드) 는 generate_pair 한 번으로 합친다
+reply_flight = SingleFlight("generate_pair")
+
+# 로그 저장을 응답 뒤로 미룰 때 넘기는 함수 (예: BackgroundTasks.add_task)
+AfterResponse = Callable[..., Any]
 
 def run_pipeline(payload: DiaryInput) -> DiaryReplyOutput:
     # 기존 단독 실행(로그/DB 미사용) 유지
@@ -15,63 +40,366 @@ def run_pipeline_with_logging(
     *,
     user_id: str | None,
     preset_override: str | None,
-    db: Session | None
+    db: Session | None,
+    after_response: AfterResponse | None = None,
 ) -> DiaryReplyOutput:
-    return _run_core(payload, user_id=user_id, preset_override=preset_override, db=db)
+    return _run_core(payload, user_id=user_id, preset_override=preset_override, db=db, after_response=after_response)
 
-def _run_core(payload: DiaryInput, *, user_id, preset_override, db: Session | None):
-    t0 = time.time()
+async def run_pipeline_async(payload: DiaryInput) -> DiaryReplyOutput:
+    return await _run_core_async(payload, user_id=None, preset_override=None, db=None)
+
+async def run_pipeline_with_logging_async(
+    payload: DiaryInput,
+    *,
+    user_id: str | None,
+    preset_override: str | None,
+    db: AsyncSession | None,
+    after_response: AfterResponse | None = None,
+) -> DiaryReplyOutput:
+    """
+    async 라우트용. LLM 대기와 DB 조회/저장(AsyncSession)은 이벤트 루프에서(스레드 점유 없음),
+    짧은 동기 구간(분석)만 스레드로 넘긴다.
+    로그는 write-behind 저장기(api.log_writer)로 넘긴다. 저장기가 꺼져 있으면
+    after_response 를 줬을 때 after_response(fn, row) 로 응답 뒤에 저장한다 (자체 세션).
+    """
+    return await _run_core_async(
+        payload, user_id=user_id, preset_override=preset_override, db=db, after_response=after_response
+    )
+
+class _Prepared(NamedTuple):
+    analysis: AnalysisResult
+    safety_flag: bool
+    flags: Dict
+    preset: str
+    mood: Optional[str]
+    llm_text: str        # LLM 에 보낼 텍스트 (긴 일기는 압축본, DB 에는 원문 저장)
+    compacted: bool
 
-    # 1) 규칙 분석
-    analysis = analyze(payload.text)
+class _Generated(NamedTuple):
+    reply_short: str
+    reply_normal: str
+    cache_status: Optional[str]
+    usage: Optional[Dict[str, int]]
+    shared: bool         # 동시에 들어온 같은 요청의 결과를 같이 씀
+    degraded: bool       # 서킷이 열려 기본 답장으로 대신함
 
-    # 2) 안전 스캔
-    safety_flag, flags = safety_scan(payload.text)
+# -----------------------------
+# 단계 (ctx: payload / user_id / preset_override / db → 단계 이름별 결과)
+#
+#   features ─┬─ analyze ── mood ─┐
+#             ├─ safety           ├─ generate
+#             └─ compact ─────────┤
+#   preset (캐시/DB) ─────────────┘   (mood 도 preset 의 mood_default 를 fallback 으로 씀)
+#
+# 프리셋 조회는 분석과 동시에, 안전 스캔은 생성과 동시에 돈다. 로그 저장은 그래프 밖(응답 뒤)
+# -----------------------------
+def _stage_features(ctx) -> TextFeatures:
+    # 사전 스캔/문장 분리는 여기서 한 번만 → analyze / safety / compact 가 공유
+    return TextFeatures(ctx["payload"].text)
 
-    # 3) 프리셋/무드 결정 (우선순위: 요청 meta > 헤더 override > DB 저장 프리셋 > 기본 warm)
-    preset = (payload.meta or {}).get("preset")
-    if not preset and preset_override:
-        preset = preset_override
-    if not preset and db and user_id:
-        from_db = get_user_preset(db, user_id)
-        if from_db:
-            preset = from_db
-    preset = preset or "warm"
+def _stage_analyze(ctx) -> AnalysisResult:
+    return analyze(ctx["payload"].text, ctx["features"])
 
-    mood = (payload.meta or {}).get("mood")
+def _stage_safety(ctx) -> Tuple[bool, Dict]:
+    return safety_scan(ctx["payload"].text, ctx["features"])
+
+def _stage_preset(ctx) -> UserSettings:
+    # 우선순위: 요청 meta > 헤더 override > 저장 프리셋 > 기본 warm
+    # 저장 프리셋/mood_default 는 프리셋 캐시에서 (DB 는 캐시 miss 때만)
+    payload, user_id, db = ctx["payload"], ctx["user_id"], ctx["db"]
+    saved = None
+    if db is not None:
+        try:
+            saved = preset_cache.get(db, user_id)
+        finally:
+            # 조회가 끝나면 연결을 풀에 돌려준다 (LLM 을 기다리는 동안 잡고 있지 않게). 세션은 다시 쓸 수 있다
+            db.close()
+    preset = (payload.meta or {}).get("preset") or ctx["preset_override"] or (saved and saved.preset)
+    return UserSettings(preset or "warm", saved.mood_default if saved else None)
+
+async def _stage_preset_async(ctx) -> UserSettings:
+    # async 경로는 AsyncSession 으로 (이벤트 루프에서 조회, 스레드 안 씀)
+    payload, user_id, db = ctx["payload"], ctx["user_id"], ctx["db"]
+    saved = None
+    if db is not None:
+        try:
+            saved = await preset_cache.aget(db, user_id)
+        finally:
+            await db.close()  # _stage_preset 과 같은 이유
+    preset = (payload.meta or {}).get("preset") or ctx["preset_override"] or (saved and saved.preset)
+    return UserSettings(preset or "warm", saved.mood_default if saved else None)
+
+def _stage_mood(ctx) -> Optional[str]:
+    # 우선순위: 요청 meta > 분석 감정 > 사용자 mood_default (감정이 안 잡힌 "empty" 일 때)
+    mood = (ctx["payload"].meta or {}).get("mood")
+    analysis = ctx["analyze"]
     if not mood and analysis.emotions:
         mood = "/".join(analysis.emotions[:2])
+    if mood in (None, "empty") and ctx["preset"].mood_default:
+        mood = ctx["preset"].mood_default
+    return mood
+
+def _stage_compact(ctx) -> Compacted:
+    # 토큰 예산 초과 시 추출식 압축 (같은 features 재사용)
+    c = compact(ctx["payload"].text, ctx["features"])
+    record_compaction(c)
+    return c
+
+def _flight_key(ctx):
+    return (ctx["user_id"], text_key(ctx["payload"].text), ctx["preset"].preset, ctx["mood"])
+
+def _stage_generate(ctx) -> _Generated:
+    # 생성 (짧은/보통) — 진행 중인 동일 요청이 있으면 그 결과를 같이 쓴다
+    c: Compacted = ctx["compact"]
+
+    def _gen():
+        pair = generate_pair(c.text, ctx["mood"], ctx["preset"].preset)
+        return pair, reply_cache_status.get(), llm_usage.get()
+
+    started = time.time()
+    try:
+        (pair, cache_status, usage), shared = reply_flight.do(_flight_key(ctx), _gen)
+    except CircuitOpenError:
+        return _Generated(*DEGRADED_PAIR, None, None, False, True)
+    _observe_generate(c.compacted, started)
+    return _Generated(*pair, cache_status, None if shared else usage, shared, False)
+
+async def _stage_generate_async(ctx) -> _Generated:
+    # await 동안 스레드를 잡지 않는다, 동일 요청은 합친다
+    c: Compacted = ctx["compact"]
+
+    async def _gen():
+        pair = await generate_pair_async(c.text, ctx["mood"], ctx["preset"].preset)
+        return pair, reply_cache_status.get(), llm_usage.get()
+
+    started = time.time()
+    try:
+        (pair, cache_status, usage), shared = await reply_flight.ado(_flight_key(ctx), _gen)
+    except CircuitOpenError:
+        return _Generated(*DEGRADED_PAIR, None, None, False, True)
+    _observe_generate(c.compacted, started)
+    return _Generated(*pair, cache_status, None if shared else usage, shared, False)
+
+def _prepare_stages(preset_fn) -> List[Stage]:
+    return [
+        Stage("features", _stage_features),
+        Stage("preset", preset_fn),
+        Stage("analyze", _stage_analyze, ("features",)),
+        Stage("safety", _stage_safety, ("features",)),
+        Stage("compact", _stage_compact, ("features",)),
+        Stage("mood", _stage_mood, ("analyze", "preset"), blocking=False),
+    ]
+_GENERATE_DEPS = ("mood", "preset", "compact")
+
+# 동기 그래프는 Session, async 그래프는 AsyncSession 을 ctx["db"] 로 받는다
+# 동기 generate 는 LLM 호출 내내 막히므로 공유 단계 풀이 아니라 요청 스레드에서
+reply_graph = StageGraph(
+    "stages", _prepare_stages(_stage_preset) + [Stage("generate", _stage_generate, _GENERATE_DEPS, inline=True)]
+)
+reply_graph_async = StageGraph(
+    "stages", _prepare_stages(_stage_preset_async) + [Stage("generate", _stage_generate_async, _GENERATE_DEPS)]
+)
+# 스트리밍은 meta(분석/안전)를 먼저 보내야 해서 생성 전까지만
+prepare_graph = StageGraph("stream_stages", _prepare_stages(_stage_preset_async))
 
-    # 4) 생성 (짧은/보통)
-    reply_short, reply_normal = generate_pair(payload.text, mood, preset)
+def _stage_ctx(payload: DiaryInput, user_id, preset_override, db: Session | AsyncSession | None) -> Dict[str, Any]:
+    return {"payload": payload, "user_id": user_id, "preset_override": preset_override, "db": db}
 
-    if safety_flag:
-        reply_short += "\n\n혹시 위험하다고 느껴지면, 가까운 사람이나 전문 상담/상담센터에 바로 연락하자."
-        reply_normal += "\n\n지금이 힘든 만큼 도움을 받는 게 정말 중요해. 가까운 사람에게 이야기하거나, 전문 상담/상담센터에 연락해줘."
+def _prepared(results: Dict[str, Any]) -> _Prepared:
+    safety_flag, flags = results["safety"]
+    c: Compacted = results["compact"]
+    return _Prepared(results["analyze"], safety_flag, flags, results["preset"].preset, results["mood"], c.text, c.compacted)
+
+def _observe_generate(compacted: bool, started: float) -> None:
+    # 압축 여부별 LLM 구간 지연 분포 → /diary/stats 에서 p95 비교
+    ms = (time.time() - started) * 1000
+    metrics.observe("generate", ms)
+    metrics.observe("generate.compacted" if compacted else "generate.full", ms)
+
+_SAFETY_SUFFIX = {
+    "reply_short": "\n\n혹시 위험하다고 느껴지면, 가까운 사람이나 전문 상담/상담센터에 바로 연락하자.",
+    "reply_normal": "\n\n지금이 힘든 만큼 도움을 받는 게 정말 중요해. 가까운 사람에게 이야기하거나, 전문 상담/상담센터에 연락해줘.",
+}
+
+# 서킷이 열렸을 때 LLM 없이 바로 돌려주는 답장 (캐시에는 넣지 않는다)
+DEGRADED_PAIR = (
+    "오늘 하루를 적어줘서 고마워. 지금은 답장이 조금 늦어지고 있어, 네 마음은 잘 받았어.",
+    "오늘 하루를 이렇게 기록해줘서 고마워. 지금은 답장을 길게 준비하기 어려운 상황이라 짧게 남길게. "
+    "적어준 감정 하나하나가 다 소중해. 오늘은 스스로에게 조금 너그러워지고, 편하게 쉬었으면 좋겠어.",
+)
+
+def _with_safety(prep: _Prepared, reply_short: str, reply_normal: str) -> Tuple[str, str]:
+    if prep.safety_flag:
+        reply_short += _SAFETY_SUFFIX["reply_short"]
+        reply_normal += _SAFETY_SUFFIX["reply_normal"]
+    return reply_short, reply_normal
+
+def _finish(
+    payload: DiaryInput,
+    prep: _Prepared,
+    reply_short: str,
+    reply_normal: str,
+    *,
+    user_id,
+    t0: float,
+    usage: Optional[Dict[str, int]] = None,
+) -> Tuple[DiaryReplyOutput, Dict[str, Any]]:
+    """최종 응답 + 로그 행(save_diary_log 인자). 저장은 호출 쪽에서 (바로 또는 응답 뒤)."""
+    reply_short, reply_normal = _with_safety(prep, reply_short, reply_normal)
 
     out = DiaryReplyOutput(
         reply_short=reply_short,
         reply_normal=reply_normal,
-        safety_flag=safety_flag,
-        flags=flags,
-        analysis=analysis,
+        safety_flag=prep.safety_flag,
+        flags=prep.flags,
+        analysis=prep.analysis,
     )
 
-    # 5) 로그 저장
-    if db:
-        latency_ms = int((time.time() - t0) * 1000)
-        save_diary_log(
-            db,
-            user_id=user_id,
-            preset_used=preset,
-            mood_hint=mood,
-            text=payload.text,
-            reply_short=out.reply_short,
-            reply_normal=out.reply_normal,
-            analysis=out.analysis.model_dump(),
-            safety_flag=out.safety_flag,
-            flags=out.flags,
-            latency_ms=latency_ms,
-        )
+    latency_ms = int((time.time() - t0) * 1000)
+    metrics.observe("reply", latency_ms)
+    row = dict(
+        user_id=user_id,
+        preset_used=prep.preset,
+        mood_hint=prep.mood,
+        text=payload.text,
+        reply_short=out.reply_short,
+        reply_normal=out.reply_normal,
+        analysis=out.analysis.model_dump(),
+        safety_flag=out.safety_flag,
+        flags=out.flags,
+        latency_ms=latency_ms,
+        input_tokens=(usage or {}).get("input_tokens"),
+        cached_tokens=(usage or {}).get("cached_tokens"),
+    )
+    return out, row
+
+def save_log_detached(row: Dict[str, Any]) -> None:
+    """응답 뒤(백그라운드)에 로그 저장. 요청 세션은 이미 닫혔을 수 있어 자체 세션을 쓴다."""
+    started = time.time()
+    db = get_session()
+    try:
+        save_diary_log(db, **row)
+    except Exception:
+        logger.exception("diary log save failed")
+    finally:
+        db.close()
+    metrics.observe("stages.log", (time.time() - started) * 1000)
+
+async def save_log_detached_async(row: Dict[str, Any]) -> None:
+    """save_log_detached 의 비동기 버전 (async 라우트의 BackgroundTasks 용)."""
+    started = time.time()
+    try:
+        async with AsyncSessionLocal() as db:
+            await save_diary_log_async(db, **row)
+    except Exception:
+        logger.exception("diary log save failed")
+    metrics.observe("stages.log", (time.time() - started) * 1000)
+
+def _apply_run(run: StageRun) -> Tuple[_Prepared, _Generated]:
+    # 단계 안에서 정한 요청 상태를 호출자 컨텍스트로 옮긴다 (라우터가 헤더로 노출)
+    gen: _Generated = run.results["generate"]
+    reply_cache_status.set(gen.cache_status)
+    coalesced.set(gen.shared)
+    if gen.degraded:
+        reply_degraded.set(True)
+    stage_timings.set(run.durations())
+    return _prepared(run.results), gen
+
+def _run_core(payload: DiaryInput, *, user_id, preset_override, db: Session | None, after_response=None):
+    t0 = time.time()
+    run = reply_graph.run(_stage_ctx(payload, user_id, preset_override, db))
+    prep, gen = _apply_run(run)
+    if gen.degraded:
+        metrics.observe("reply.degraded", (time.time() - t0) * 1000)
+
+    out, row = _finish(payload, prep, gen.reply_short, gen.reply_normal, user_id=user_id, t0=t0, usage=gen.usage)
+    if db is not None:
+        if log_writer.enabled:
+            log_writer.submit(row)
+        elif after_response is not None:
+            after_response(save_log_detached, row)
+        else:
+            save_diary_log(db, **row)
+    return out
+
+async def _run_core_async(payload: DiaryInput, *, user_id, preset_override, db: AsyncSession | None, after_response=None):
+    t0 = time.time()
+    run = await reply_graph_async.arun(_stage_ctx(payload, user_id, preset_override, db))
+    prep, gen = _apply_run(run)
+    if gen.degraded:
+        metrics.observe("reply.degraded", (time.time() - t0) * 1000)
 
+    out, row = _finish(payload, prep, gen.reply_short, gen.reply_normal, user_id=user_id, t0=t0, usage=gen.usage)
+    if db is not None:
+        if log_writer.enabled:
+            # 로그 저장은 write-behind 큐로 (응답 지연에 DB 쓰기 시간이 들어가지 않는다)
+            log_writer.submit(row)
+        elif after_response is not None:
+            after_response(save_log_detached_async, row)
+        else:
+            await save_diary_log_async(db, **row)
     return out
+
+async def stream_pipeline_with_logging(
+    payload: DiaryInput,
+    *,
+    user_id: str | None,
+    preset_override: str | None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    /diary/reply/stream 용. (이벤트명, 데이터) 를 순서대로 낸다.
+      meta          : 분석/안전 플래그/프리셋/무드 (LLM 호출 전에 바로)
+      delta         : {"field", "text"} 생성 중인 필드의 토큰 조각
+      reply_short   : {"text"} 필드 완성 즉시 (안전 문구 포함 최종값)
+      reply_normal  : {"text"}
+      done          : /diary/reply 와 같은 최종 응답 (로그는 저장기 큐에 넣은 뒤)
+    응답 전송이 라우트 반환 뒤에도 이어지므로 DB 세션은 여기서 직접 (조회용 / 저장용 따로) 열고 닫는다.
+    """
+    t0 = time.time()
+    # 세션은 프리셋 조회와 마지막 저장에만 짧게 연다 (토큰 스트림 동안 연결을 잡지 않는다)
+    async with AsyncSessionLocal() as db:
+        run = await prepare_graph.arun(_stage_ctx(payload, user_id, preset_override, db))
+    prep = _prepared(run.results)
+    yield "meta", {
+        "safety_flag": prep.safety_flag,
+        "flags": prep.flags,
+        "analysis": prep.analysis.model_dump(),
+        "preset": prep.preset,
+        "mood": prep.mood,
+        "compacted": prep.compacted,
+    }
+
+    sent: Dict[str, str] = {}
+    reply_short = reply_normal = ""
+    started = time.time()
+    try:
+        async for kind, a, b in stream_pair_async(prep.llm_text, prep.mood, prep.preset):
+            if kind == "delta":
+                yield "delta", {"field": a, "text": b}
+            elif kind == "field" and a in _SAFETY_SUFFIX:
+                sent[a] = b + (_SAFETY_SUFFIX[a] if prep.safety_flag else "")
+                yield a, {"text": sent[a]}
+            elif kind == "done":
+                reply_short, reply_normal = a, b
+        _observe_generate(prep.compacted, started)
+    except CircuitOpenError:
+        # 서킷이 열려 있으면 (토큰이 나가기 전이라) 기본 답장으로 대신한다
+        reply_degraded.set(True)
+        reply_short, reply_normal = DEGRADED_PAIR
+
+    # JSON 이 깨져 field 이벤트가 안 나온 경우 폴백 값으로 채운다
+    final = dict(zip(_SAFETY_SUFFIX, _with_safety(prep, reply_short, reply_normal)))
+    for field, text in final.items():
+        if field not in sent:
+            yield field, {"text": text}
+
+    out, row = _finish(payload, prep, reply_short, reply_normal, user_id=user_id, t0=t0, usage=llm_usage.get())
+    if log_writer.enabled:
+        log_writer.submit(row)
+    else:
+        async with AsyncSessionLocal() as db:
+            await save_diary_log_async(db, **row)
+    done = out.model_dump()
+    if reply_degraded.get():
+        done["degraded"] = True
+    yield "done", done
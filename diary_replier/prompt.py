@@ -0,0 +1,98 @@
+# diary_replier/prompt.py
+"""
+generate_pair 프롬프트 조립 (프로바이더 prompt caching 친화적 배치).
+
+프로바이더는 "앞에서부터 똑같은" 토큰 구간만 캐시해서 재사용한다.
+그래서 요청마다 같은 부분을 앞에, 요청마다 다른 부분을 맨 뒤에 둔다.
+
+  system : SYSTEM_BASE → 프리셋 스타일 → 예시 → 지침/출력 스키마   (프리셋별 고정, import 시 1회 생성)
+  user   : 기분 힌트 → 일기 본문                                   (요청마다 다름)
+
+prompt_cache_key 도 프리셋별로 고정해서 같은 프리픽스가 같은 캐시로 라우팅되게 한다.
+"""
+
+import hashlib
+import json
+from typing import Dict, List
+
+SYSTEM_BASE = (
+    "너는 한국어로 답하는 '일기 답장 비서'야. 공감 먼저, 해결책은 최대 2개."
+    "가르치려 들지 말고, 판단/진단/낙인 금지. 사적 정보 요구 금지."
+    "반말을 쓰되 존중 유지. 과장 없이 현실적인 톤."
+)
+EXAMPLES = [
+    {
+        "text": "요즘 너무 피곤해서 뭐든 시작이 힘들어.",
+        "reply_short": "요즘 많이 지쳤구나. 잠깐 쉬어가도 괜찮아.",
+        "reply_normal": "피곤이 쌓이면 의욕이 떨어지는 게 당연해. 오늘은 욕심내지 말고 작은 목표 하나만 정하고, 쉬는 시간도 계획에 넣어보자."
+    },
+    {
+        "text": "친구랑 다투고 나니 마음이 복잡해.",
+        "reply_short": "속상했겠다. 네 마음을 솔직히 전해보는 것도 도움이 돼.",
+        "reply_normal": "다툼 뒤엔 마음이 흔들리기 마련이야. 감정이 가라앉은 뒤에, 네가 느낀 핵심을 부드럽게 전해보자. 관계는 대화로 단단해져."
+    }
+]
+PRESETS = {
+    "warm": "따뜻하고 다정하게. 위로 + 구체적 제안 1~2개.",
+    "coach": "직설적이되 예의 있게. TODO 2~3개를 번호로.",
+    "short": "핵심만 두세 문장.",
+}
+DEFAULT_PRESET = "warm"
+
+
+def _examples_block() -> str:
+    lines = ["[예시] 아래 형식을 참고해 답변 톤과 길이를 맞춰라."]
+    for ex in EXAMPLES:
+        lines.append(f"- (일기) {ex['text']}")
+        lines.append(f"  (짧은답) {ex['reply_short']}")
+        lines.append(f"  (보통답) {ex['reply_normal']}")
+    return "\n".join(lines)
+
+
+def _static_prefix(preset: str) -> str:
+    # 모델이 반드시 JSON만 출력하도록 강제
+    return f"""
+{SYSTEM_BASE}
+
+[말투]
+- preset: {preset} ({"/".join(PRESETS.keys())})
+- 스타일: {PRESETS[preset]}
+
+{_examples_block()}
+
+[지침]
+- 사용자 메시지의 [일기] 에 답장한다. [기분 힌트] 가 있으면 참고한다.
+- 구조: 요점 1줄 → 공감 1줄 → 제안 1~2개(선택)
+- reply_short: 두세 문장(100자 내외), reply_normal: 200~280자
+
+반드시 아래 JSON으로만 답해. 그 외 문자는 출력하지 마.
+{{"reply_short":"...", "reply_normal":"..."}}
+""".strip()
+
+
+# 프리셋별 고정 프리픽스 (import 시 1회)
+STATIC_PREFIX: Dict[str, str] = {p: _static_prefix(p) for p in PRESETS}
+
+# 프롬프트 구성 지문: 답장 캐시 키 / prompt_cache_key 에 섞는다
+PROMPT_TAG = hashlib.sha1(
+    json.dumps([STATIC_PREFIX, "user:v1"], ensure_ascii=False, sort_keys=True).encode("utf-8")
+).hexdigest()[:12]
+
+
+def resolve_preset(preset: str | None) -> str:
+    return preset if preset in PRESETS else DEFAULT_PRESET
+
+
+def build_user_message(text: str, mood: str | None) -> str:
+    return f"[기분 힌트]\n{mood or '미지정'}\n\n[일기]\n{text}"
+
+
+def build_messages(text: str, mood: str | None, preset: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": STATIC_PREFIX[resolve_preset(preset)]},
+        {"role": "user", "content": build_user_message(text, mood)},
+    ]
+
+
+def prompt_cache_key(preset: str) -> str:
+    return f"diary-reply:{resolve_preset(preset)}:{PROMPT_TAG}"
@@ -0,0 +1,154 @@
+# diary_replier/reply_cache.py
+"""
+generate_pair 앞에 두는 디스크(SQLite) 답장 캐시.
+
+Spring 백엔드 재시도/재렌더링으로 같은 (일기, 무드, 프리셋) 이 다시 들어오면
+LLM 을 부르지 않고 저장해 둔 reply_short / reply_normal 을 돌려준다.
+
+- 키: 정규화 텍스트(공백/문장부호 제거) + mood + preset + 모델명(+ 프롬프트 지문)
+- TTL(초) 지나면 만료, 최대 개수 초과 시 오래된 것부터 삭제
+- 파일 기반이라 재시작해도 유지, 여러 워커가 같은 파일을 공유 가능 (WAL)
+- 요청별 캐시 상태(hit/miss/bypass)는 contextvar 로 남겨 라우터가 헤더로 내보낸다
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+REPLY_CACHE_PATH = os.getenv("REPLY_CACHE_PATH", "./reply_cache.db")
+REPLY_CACHE_TTL = int(os.getenv("REPLY_CACHE_TTL", "86400"))
+REPLY_CACHE_MAX = int(os.getenv("REPLY_CACHE_MAX", "10000"))
+
+HIT, MISS, BYPASS = "hit", "miss", "bypass"
+
+# 이번 요청에서 답장 캐시가 어떻게 쓰였는지 (라우터가 X-Reply-Cache 헤더로 노출)
+reply_cache_status: ContextVar[Optional[str]] = ContextVar("reply_cache_status", default=None)
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    NFKC → 문장부호/기호 제거 → 공백 하나로 압축.
+    "오늘  좋았다!!" 와 "오늘 좋았다." 는 같은 키가 된다.
+    """
+    t = unicodedata.normalize("NFKC", text)
+    t = "".join(" " if unicodedata.category(ch)[0] in "PS" else ch for ch in t)
+    return _WS_RE.sub(" ", t).strip()
+
+
+def reply_key(text: str, mood: Optional[str], preset: str, model: str) -> str:
+    raw = "\x1f".join([normalize_text(text), mood or "", preset, model])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ReplyCache:
+    def __init__(self, path: str, *, ttl: int = REPLY_CACHE_TTL, maxsize: int = REPLY_CACHE_MAX):
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def _db(self) -> sqlite3.Connection:
+        # 호출 시점에 연다 (import 만으로 파일이 생기지 않게)
+        if self._conn is None:
+            d = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(d, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reply_cache ("
+                " key TEXT PRIMARY KEY,"
+                " reply_short TEXT NOT NULL,"
+                " reply_normal TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_reply_cache_created ON reply_cache(created_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._db().execute(
+                "SELECT reply_short, reply_normal FROM reply_cache WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0], row[1]
+
+    def put(self, key: str, reply_short: str, reply_normal: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            db = self._db()
+            now = time.time()
+            db.execute(
+                "INSERT OR REPLACE INTO reply_cache (key, reply_short, reply_normal, created_at) VALUES (?, ?, ?, ?)",
+                (key, reply_short, reply_normal, now),
+            )
+            # 만료분 정리 → 그래도 넘치면 오래된 것부터
+            cur = db.execute("DELETE FROM reply_cache WHERE created_at <= ?", (now - self.ttl,))
+            self.evictions += cur.rowcount
+            over = db.execute("SELECT COUNT(*) FROM reply_cache").fetchone()[0] - self.maxsize
+            if over > 0:
+                db.execute(
+                    "DELETE FROM reply_cache WHERE key IN "
+                    "(SELECT key FROM reply_cache ORDER BY created_at LIMIT ?)",
+                    (over,),
+                )
+                self.evictions += over
+            db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._conn is not None or os.path.exists(self.path):
+                self._db().execute("DELETE FROM reply_cache")
+                self._db().commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            size = (
+                self._db().execute("SELECT COUNT(*) FROM reply_cache").fetchone()[0]
+                if self._conn is not None else None
+            )
+            return {
+                "path": self.path,
+                "size": size,
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+reply_cache = ReplyCache(REPLY_CACHE_PATH)
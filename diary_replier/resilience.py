@@ -0,0 +1,186 @@
+# diary_replier/resilience.py
+"""
+LLM 호출 꼬리 지연 / 장애 대응.
+
+- hedged(): 첫 호출이 delay 안에 안 끝나면 같은 호출을 하나 더 보내고 먼저 끝난 쪽을 쓴다
+  (delay 는 최근 지연 분포의 퍼센타일로 정한다 → 평소엔 거의 안 나가고 느린 꼬리만 잘라낸다)
+- CircuitBreaker: 연속 실패가 threshold 를 넘으면 reset_timeout 동안 호출 자체를 막는다 (open).
+  그 뒤 한 건만 시험 삼아 보내고(half-open) 성공하면 닫는다. 막힌 동안은 CircuitOpenError 로 바로 실패
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """브레이커가 열려 있어서 호출하지 않음."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, *, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0      # open 으로 바뀐 횟수
+        self.rejected = 0    # open 상태라 막은 호출 수
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def before_call(self) -> bool:
+        """호출 직전에 부른다. 막혀 있으면 CircuitOpenError. 이 호출이 half-open 시험 호출이면 True."""
+        with self._lock:
+            st = self._current_state()
+            if st == CLOSED:
+                return False
+            if st == HALF_OPEN and not self._probing:
+                self._probing = True  # 시험 호출은 한 번에 하나만
+                return True
+            self.rejected += 1
+        raise CircuitOpenError(f"{self.name}: circuit open")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            st = self._current_state()
+            if st == HALF_OPEN or (st == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+                self.opened += 1
+
+    def release(self, probe: bool, cancelled: bool = False) -> None:
+        """
+        성공도 장애도 아닌 채로 끝난 호출 (4xx/429, 취소).
+        시험 호출이었으면 자리를 꼭 돌려준다 — 취소는 실패한 시험으로 보고 다시 open, 그 외는 다음 호출이 시험.
+        """
+        if not probe:
+            return
+        if cancelled:
+            self.record_failure()
+            return
+        with self._lock:
+            self._probing = False
+
+    @contextmanager
+    def guard(self, is_failure: Callable[[BaseException], bool]) -> Iterator[None]:
+        """
+        with breaker.guard(is_outage): ...  — before_call + 결과 기록을 모든 종료 경로에서.
+        정상 종료는 성공, is_failure(e) 면 실패, 다른 예외는 중립, 취소(CancelledError 등)는 release(cancelled=True).
+        """
+        probe = self.before_call()
+        try:
+            yield
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.release(probe)
+            raise
+        except BaseException:
+            self.release(probe, cancelled=True)
+            raise
+        else:
+            self.record_success()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+class HedgeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0       # 두 번째 호출을 보낸 횟수
+        self.hedge_wins = 0   # 두 번째 호출이 먼저 끝난 횟수
+
+    def add(self, *, hedged: bool, hedge_won: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.hedged += int(hedged)
+            self.hedge_wins += int(hedge_won)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            }
+
+
+async def hedged(
+    fn: Callable[[], Awaitable[Any]],
+    delay: Optional[float],
+    stats: Optional[HedgeStats] = None,
+) -> Any:
+    """
+    fn() 을 실행하고, delay 초 안에 안 끝나면 fn() 을 한 번 더 실행해서 먼저 성공한 결과를 돌려준다.
+    delay 가 None 이면 헤지 없이 한 번만. 하나가 실패해도 다른 쪽이 성공하면 성공으로 본다.
+    진 쪽은 취소한다.
+    """
+    tasks = [asyncio.ensure_future(fn())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            if stats:
+                stats.add(hedged=False, hedge_won=False)
+            return tasks[0].result()
+
+        tasks.append(asyncio.ensure_future(fn()))
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    if stats:
+                        stats.add(hedged=True, hedge_won=t is tasks[1])
+                    return t.result()
+                error = error or t.exception()
+        if stats:
+            stats.add(hedged=True, hedge_won=False)
+        raise error
+    finally:
+        # 진 쪽 / 호출자가 취소된 경우 남은 호출 정리
+        for t in tasks:
+            if not t.done():
+                t.cancel()
@@ -0,0 +1,99 @@
+# diary_replier/result_cache.py
+"""
+텍스트 내용 기반(content-addressed) LRU 결과 캐시.
+
+같은 일기가 재시도/되돌린 수정/백엔드 재동기화로 여러 번 들어와도
+규칙 분석과 HF 추론을 다시 하지 않도록 analyzer / analyzer_hf 앞에 둔다.
+
+- 키: 정규화(앞뒤 공백 제거)한 텍스트의 sha1
+- version: 사전 버전 / EMO_MODEL 설정 등. 값이 바뀌면 캐시 전체를 비운다
+- 크기 초과 시 가장 오래 안 쓴 항목부터 제거, hit/miss/eviction 카운터 제공
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+MISS = object()  # get() 이 캐시에 없을 때 돌려주는 표식
+
+
+def text_key(text: str) -> str:
+    # 사전 단어는 앞뒤 공백이 없어서 strip 해도 분석 결과가 같다 (TextFeatures.normalized 와 동일 규칙)
+    return hashlib.sha1(text.strip().encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, maxsize: int, name: str = "cache"):
+        self.maxsize = maxsize
+        self.name = name
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def _check_version(self, version: str) -> None:
+        if version != self._version:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._version = version
+
+    def get(self, key: str, version: str) -> Any:
+        with self._lock:
+            self._check_version(version)
+            val = self._data.get(key, MISS)
+            if val is MISS:
+                self.misses += 1
+                return MISS
+            self._data.move_to_end(key)
+            self.hits += 1
+            return val
+
+    def put(self, key: str, version: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, text: str, version: str, compute: Callable[[], Any]) -> Any:
+        if not self.enabled:
+            return compute()
+        key = text_key(text)
+        val = self.get(key, version)
+        if val is MISS:
+            val = compute()
+            self.put(key, version, val)
+        return val
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
@@ -1,6 +1,10 @@
+import os
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
 
+# /diary/analyze/batch 한 번에 받을 수 있는 일기 수
+ANALYZE_BATCH_MAX = int(os.getenv("ANALYZE_BATCH_MAX", "500"))
+
 class DiaryInput(BaseModel):
     text: str = Field(..., min_length=2, max_length=8000)
     user_id: Optional[str] = None
@@ -18,3 +22,16 @@ class DiaryReplyOutput(BaseModel):
     safety_flag: bool
     flags: Dict
     analysis: AnalysisResult
+
+class DiaryBatchInput(BaseModel):
+    diaries: List[DiaryInput] = Field(..., min_length=1, max_length=ANALYZE_BATCH_MAX)
+
+class DiaryAnalysisOutput(BaseModel):
+    user_id: Optional[str] = None
+    date: Optional[str] = None
+    safety_flag: bool
+    flags: Dict
+    analysis: AnalysisResult
+
+class DiaryBatchOutput(BaseModel):
+    results: List[DiaryAnalysisOutput]
@@ -0,0 +1,92 @@
+# diary_replier/singleflight.py
+"""
+동일 키로 동시에 들어온 호출을 하나로 합치는 single-flight.
+
+모바일 이중 제출 / 백엔드 재시도 팬아웃으로 같은 일기가 동시에 여러 번 들어오면
+첫 요청(leader)만 LLM 을 부르고, 나머지(follower)는 그 결과를 기다려 같이 쓴다.
+이미 끝난 결과를 보관하지는 않는다 (그건 reply_cache 의 몫).
+
+- 동기: flight.do(key, fn)          → (값, shared)
+- 비동기: await flight.ado(key, coro_fn) → (값, shared)
+- 동기/비동기 호출자가 같은 키를 공유할 수 있다 (concurrent.futures.Future 기반)
+- leader 가 실패하면 follower 도 같은 예외를 받는다
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+# 이번 요청의 LLM 결과가 다른 요청과 공유된 것인지 (라우터가 X-Coalesced 헤더로 노출)
+coalesced: ContextVar[bool] = ContextVar("coalesced", default=False)
+
+
+class SingleFlight:
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self.calls = 0    # 실제 실행 횟수 (leader)
+        self.shared = 0   # 합류해서 절약한 횟수 (follower)
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.shared += 1
+                return fut, False
+            fut = Future()
+            self._inflight[key] = fut
+            self.calls += 1
+            return fut, True
+
+    def _settle(self, key: Hashable, fut: Future, value: Any = None, exc: BaseException | None = None) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        if exc is not None:
+            if not isinstance(exc, Exception):
+                # leader 취소(CancelledError/KeyboardInterrupt)를 follower 에게 그대로 옮기지 않는다
+                exc = RuntimeError(f"{self.name}: leader aborted ({type(exc).__name__})")
+            fut.set_exception(exc)
+        else:
+            fut.set_result(value)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        fut, leader = self._join(key)
+        if not leader:
+            return fut.result(), True
+        try:
+            value = fn()
+        except BaseException as e:
+            self._settle(key, fut, exc=e)
+            raise
+        self._settle(key, fut, value)
+        return value, False
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        fut, leader = self._join(key)
+        if not leader:
+            # shield: follower 가 취소돼도 공유 future 는 건드리지 않는다
+            return await asyncio.shield(asyncio.wrap_future(fut)), True
+        try:
+            value = await fn()
+        except BaseException as e:
+            # leader 가 취소되면 follower 는 RuntimeError 를 받는다 (재시도는 호출자 몫)
+            self._settle(key, fut, exc=e)
+            raise
+        self._settle(key, fut, value)
+        return value, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "calls": self.calls,
+                "saved": self.shared,
+                "inflight": len(self._inflight),
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.calls = self.shared = 0
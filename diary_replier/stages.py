@@ -0,0 +1,172 @@
+# diary_replier/stages.py
+"""
+파이프라인 단계를 작은 의존 그래프(DAG)로 선언하고, 서로 기다릴 필요 없는 단계는 동시에 돌린다.
+
+    graph = StageGraph("reply", [
+        Stage("features", lambda c: TextFeatures(c["text"])),
+        Stage("analyze", lambda c: analyze(c["text"], c["features"]), ("features",)),
+        Stage("preset", lookup_preset),                 # 의존 없음 → features/analyze 와 동시에
+        Stage("generate", generate_async, ("analyze", "preset")),
+    ])
+    run = await graph.arun({"text": ...})   # 비동기: async 함수는 그대로, 동기 함수는 스레드로
+    run = graph.run({"text": ...})          # 동기: 스레드 풀(STAGE_WORKERS)에서 준비된 단계부터, inline 단계는 호출자 스레드에서
+    run.results["generate"], run.timings    # 단계별 (시작 오프셋 ms, 소요 ms)
+
+- 단계 함수는 ctx(dict) 하나를 받는다. 결과는 ctx[단계 이름] 에 들어가고 다음 단계가 읽는다
+- 단계가 하나라도 실패하면 나머지는 취소하고 그 예외를 그대로 올린다
+- 단계별 소요는 metrics 의 "<그래프>.<단계>" 창에, 전체 벽시계 / 직렬 합 / 임계 경로는
+  "<그래프>.wall" / "<그래프>.serial" / "<그래프>.critical" 창에 쌓인다 (/diary/stats)
+- 단계 안에서 바꾼 ContextVar 는 호출자에게 안 보인다 (태스크/스레드가 컨텍스트를 복사). 결과로 돌려줄 것
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from . import metrics
+
+# 이번 요청의 단계별 소요(ms) (라우터가 Server-Timing 헤더로 노출)
+stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+# 동기 그래프용 공유 풀 (짧은 CPU/DB 단계만. 오래 막는 LLM 호출은 inline 단계로 호출자 스레드에서)
+STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", "16"))
+_executor = ThreadPoolExecutor(max_workers=max(1, STAGE_WORKERS), thread_name_prefix="stage")
+
+
+class Stage(NamedTuple):
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    deps: Tuple[str, ...] = ()
+    blocking: bool = True   # 비동기 실행 시 동기 함수를 스레드로 넘길지 (False 면 루프에서 바로)
+    inline: bool = False    # 동기 실행 시 공유 풀 대신 호출자 스레드에서 (풀 스레드를 오래 잡는 단계)
+
+
+class StageRun(NamedTuple):
+    results: Dict[str, Any]
+    timings: Dict[str, Tuple[float, float]]  # name → (시작 오프셋 ms, 소요 ms)
+    wall_ms: float
+    serial_ms: float                         # 단계 소요 합 (전부 차례로 돌렸다면)
+    critical_path: List[str]
+
+    def durations(self) -> Dict[str, float]:
+        return {k: round(v[1], 1) for k, v in self.timings.items()}
+
+
+class StageGraph:
+    def __init__(self, name: str, stages: Sequence[Stage]):
+        self.name = name
+        self.stages: Dict[str, Stage] = {}
+        for s in stages:
+            if s.name in self.stages:
+                raise ValueError(f"{name}: duplicate stage {s.name!r}")
+            for d in s.deps:
+                if d not in self.stages:
+                    # 선언 순서 = 위상 순서 (의존 대상이 먼저 선언돼야 한다 → 순환 불가)
+                    raise ValueError(f"{name}: stage {s.name!r} depends on undeclared {d!r}")
+            self.stages[s.name] = s
+
+    # -----------------------------
+    # 실행
+    # -----------------------------
+    async def arun(self, ctx: Dict[str, Any]) -> StageRun:
+        t0 = time.perf_counter()
+        timings: Dict[str, Tuple[float, float]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(s: Stage):
+            if s.deps:
+                await asyncio.gather(*(tasks[d] for d in s.deps))
+            started = time.perf_counter()
+            if asyncio.iscoroutinefunction(s.fn):
+                value = await s.fn(ctx)
+            elif s.blocking:
+                value = await asyncio.to_thread(s.fn, ctx)
+            else:
+                value = s.fn(ctx)
+            ctx[s.name] = value
+            timings[s.name] = ((started - t0) * 1000, (time.perf_counter() - started) * 1000)
+            return value
+
+        for s in self.stages.values():
+            tasks[s.name] = asyncio.ensure_future(run_stage(s))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for t in tasks.values():
+                if not t.done():
+                    t.cancel()
+        return self._finish(ctx, timings, t0)
+
+    def run(self, ctx: Dict[str, Any], executor: Optional[ThreadPoolExecutor] = None) -> StageRun:
+        executor = executor or _executor
+        t0 = time.perf_counter()
+        timings: Dict[str, Tuple[float, float]] = {}
+        pending = dict(self.stages)
+        running: Dict[Future, str] = {}
+        # 호출자 컨텍스트(ContextVar)를 단계 스레드에서도 읽을 수 있게
+        parent = copy_context()
+
+        def call(s: Stage):
+            started = time.perf_counter()
+            value = parent.copy().run(s.fn, ctx)
+            return value, started, time.perf_counter()
+
+        def record(name: str, value: Any, started: float, ended: float) -> None:
+            ctx[name] = value
+            timings[name] = ((started - t0) * 1000, (ended - started) * 1000)
+
+        try:
+            while pending or running:
+                # 의존이 다 끝난 단계부터 제출 (대기 중인 스레드가 풀을 막지 않게 준비된 것만)
+                inline: List[Stage] = []
+                for name, s in list(pending.items()):
+                    if all(d in ctx for d in s.deps):
+                        if s.inline:
+                            inline.append(s)
+                        else:
+                            running[executor.submit(call, s)] = name
+                        del pending[name]
+                if inline:
+                    for s in inline:
+                        record(s.name, *call(s))
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    record(running.pop(fut), *fut.result())
+        finally:
+            for fut in running:
+                fut.cancel()
+        return self._finish(ctx, timings, t0)
+
+    # -----------------------------
+    # 기록
+    # -----------------------------
+    def critical_path(self, timings: Dict[str, Tuple[float, float]]) -> Tuple[List[str], float]:
+        """소요 기준 가장 긴 의존 경로 (이 경로만 줄이면 전체가 줄어든다)."""
+        best: Dict[str, Tuple[float, List[str]]] = {}
+        for name, s in self.stages.items():
+            dur = timings.get(name, (0.0, 0.0))[1]
+            prev = max((best[d] for d in s.deps), key=lambda x: x[0], default=(0.0, []))
+            best[name] = (prev[0] + dur, prev[1] + [name])
+        total, path = max(best.values(), key=lambda x: x[0], default=(0.0, []))
+        return path, total
+
+    def _finish(self, ctx: Dict[str, Any], timings: Dict[str, Tuple[float, float]], t0: float) -> StageRun:
+        wall = (time.perf_counter() - t0) * 1000
+        serial = sum(d for _, d in timings.values())
+        path, critical = self.critical_path(timings)
+        for name, (_, dur) in timings.items():
+            metrics.observe(f"{self.name}.{name}", dur)
+        metrics.observe(f"{self.name}.wall", wall)
+        metrics.observe(f"{self.name}.serial", serial)
+        metrics.observe(f"{self.name}.critical", critical)
+        results = {name: ctx[name] for name in self.stages}
+        return StageRun(results, timings, wall, serial, path)
+
+
+def server_timing(durations: Dict[str, float]) -> str:
+    """Server-Timing 헤더 값: "analyze;dur=1.2, preset;dur=3.4" """
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in durations.items())
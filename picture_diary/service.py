@@ -4,12 +4,12 @@ import json
 from typing import Dict, Any
 
 from fastapi import HTTPException
-from openai import OpenAI
+from diary_replier.llm_providers.registry import registry
 
 from .prompt_engine import build_vision_system_prompt
 from .schemas import PictureEmotionResponse
 
-client = OpenAI()  # OPENAI_API_KEY는 .env에서 로드됨
+client = registry.openai()  # OPENAI_API_KEY는 .env에서 로드됨, 공유 커넥션 풀
 
 
 def analyze_emotion_by_image_url(image_url: str) -> PictureEmotionResponse:
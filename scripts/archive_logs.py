@@ -0,0 +1,43 @@
+"""
+diary_logs 보관(retention) 작업: LOG_RETENTION_DAYS 보다 오래된 다 지난 달을
+ARCHIVE_DIR 의 월별 압축 파일(diary_logs_YYYY-MM.db.gz)로 옮기고 hot 테이블에서 지운다.
+cron 등으로 하루 한 번 돌리면 된다 (이미 옮긴 달은 건너뛰고, 늦게 들어온 옛 행만 합친다).
+
+--vacuum 은 지운 뒤 hot DB 파일 크기를 줄인다 (SQLite 만, 도는 동안 DB 전체 쓰기 락).
+
+    python scripts/archive_logs.py [--retention-days 180] [--dry-run] [--vacuum]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.archive import ARCHIVE_DIR, LOG_RETENTION_DAYS, archive_old_logs  # noqa: E402
+from api.models import SessionLocal, engine  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--retention-days", type=int, default=LOG_RETENTION_DAYS)
+    ap.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    ap.add_argument("--dry-run", action="store_true", help="옮길 달만 출력")
+    ap.add_argument("--vacuum", action="store_true", help="옮긴 뒤 VACUUM (SQLite)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        done = archive_old_logs(db, args.retention_days, args.archive_dir, dry_run=args.dry_run)
+    for m in done:
+        print(f"{m.month}: " + ("would archive" if args.dry_run else f"moved {m.moved}, {m.rows} rows in archive"))
+    if not done:
+        print("nothing to archive")
+    if args.vacuum and done and not args.dry_run and engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
+    print(f"done in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+분석 처리량(diaries/s) 비교: 단건 vs 배치.
+
+- in-process : analyze()+safety_scan() 를 일기마다 호출 vs analyze_many() 한 번
+- http       : /diary/analyze/batch 에 1건씩 N번 요청 vs N건을 한 번에 요청 (TestClient, LLM 호출 없음)
+
+    python scripts/bench_analyze_batch.py [--n 500] [--chars 400]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench-dummy-key")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api.main import app  # noqa: E402
+from diary_replier.analyzer import analyze, analyze_many  # noqa: E402
+from diary_replier.features import extract_features_many  # noqa: E402
+from diary_replier.guard import safety_scan  # noqa: E402
+
+PHRASES = [
+    "오늘은 학교에서 발표를 했다.", "생각보다 잘 끝나서 뿌듯했다.", "하루 종일 피곤하고 지쳤다.",
+    "친구랑 밥을 먹었다.", "그냥 그랬던 하루.", "조금 속상한 일도 있었다.", "내일은 나아지겠지?",
+]
+
+
+def make_texts(n: int, chars: int):
+    rnd = random.Random(0)
+    out = []
+    for _ in range(n):
+        t = ""
+        while len(t) < chars:
+            t += rnd.choice(PHRASES) + " "
+        out.append(t[:chars])
+    return out
+
+
+def rate(n: int, fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=500)
+    ap.add_argument("--chars", type=int, default=400)
+    args = ap.parse_args()
+    texts = make_texts(args.n, args.chars)
+
+    def single():
+        for t in texts:
+            analyze(t)
+            safety_scan(t)
+
+    def batch():
+        feats = extract_features_many(texts)
+        analyze_many(texts, feats)
+        for t, f in zip(texts, feats):
+            safety_scan(t, f)
+
+    single(), batch()  # warm-up
+    print(f"in-process single : {rate(args.n, single):9.0f} diaries/s")
+    print(f"in-process batch  : {rate(args.n, batch):9.0f} diaries/s")
+
+    client = TestClient(app)
+    url = app.url_path_for("analyze_batch")
+
+    def http_single():
+        for t in texts:
+            client.post(url, json={"diaries": [{"text": t}]}).raise_for_status()
+
+    def http_batch():
+        client.post(url, json={"diaries": [{"text": t} for t in texts]}).raise_for_status()
+
+    print(f"http single       : {rate(args.n, http_single):9.0f} diaries/s")
+    print(f"http batch        : {rate(args.n, http_batch):9.0f} diaries/s")
+
+
+if __name__ == "__main__":
+    main()
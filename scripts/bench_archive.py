@@ -0,0 +1,102 @@
+"""
+보관(retention) 전후 hot 테이블 비교.
+
+--months 개월치 로그를 넣고 (달마다 --per-month 행), 최근 --keep 개월만 남기고 보관한다.
+전후로 DB 파일 크기 / VACUUM / 전체 스캔(내보내기와 같은 모양) / 최신 페이지 시간을 찍고,
+보관된 달을 처음 읽을 때(압축 풀기)와 두 번째(캐시) 시간도 찍는다.
+
+    python scripts/bench_archive.py [--months 24] [--per-month 10000] [--keep 6]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/bench.db")
+os.environ.setdefault("ARCHIVE_DIR", f"{_tmp}/archive")
+os.environ.setdefault("ARCHIVE_CACHE_DIR", f"{_tmp}/archive_cache")
+
+from sqlalchemy import func, select  # noqa: E402
+
+from api.archive import ARCHIVE_DIR, archive_old_logs, archive_reader  # noqa: E402
+from api.models import DB_URL, DiaryLog, LogArchive, SessionLocal, engine, save_diary_logs  # noqa: E402
+
+START = datetime(2024, 1, 1)
+
+
+def seed(args):
+    body = "오늘은 발표가 끝나서 뿌듯했지만 조금 피곤했어. " * 10
+    step = timedelta(days=30) / args.per_month
+    with SessionLocal() as db:
+        batch = []
+        for m in range(args.months):
+            base = datetime(START.year + (START.month - 1 + m) // 12, (START.month - 1 + m) % 12 + 1, 1)
+            for i in range(args.per_month):
+                batch.append(dict(
+                    user_id=f"u{i % 500}", preset_used="warm", mood_hint=None, text=body,
+                    reply_short="짧은 답장", reply_normal="긴 답장 " * 40,
+                    analysis={"valence": "neutral", "emotions": ["happy"], "keywords": [], "summary": "s"},
+                    safety_flag=False, flags={}, latency_ms=1, ts=base + step * i,
+                ))
+                if len(batch) == 5000:
+                    save_diary_logs(db, batch)
+                    batch = []
+        save_diary_logs(db, batch)
+
+
+def measure(label):
+    path = DB_URL.split("///", 1)[1]
+    size = os.path.getsize(path) / 1e6
+    t0 = time.perf_counter()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+    vacuum = time.perf_counter() - t0
+    size_after = os.path.getsize(path) / 1e6
+    with SessionLocal() as db:
+        rows = db.execute(select(func.count()).select_from(DiaryLog)).scalar()
+        t0 = time.perf_counter()
+        for _ in db.execute(select(DiaryLog.text, DiaryLog.reply_normal, DiaryLog.emotions).execution_options(yield_per=5000)):
+            pass
+        scan = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        db.execute(select(DiaryLog.id).where(DiaryLog.user_id == "u7").order_by(DiaryLog.id.desc()).limit(20)).all()
+        page = (time.perf_counter() - t0) * 1000
+    print(f"{label:>7}: rows {rows:8d}  db {size:7.1f}MB (after VACUUM {size_after:7.1f}MB)  "
+          f"VACUUM {vacuum:5.2f}s  full scan {scan:5.2f}s  user page {page:5.2f}ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--months", type=int, default=24)
+    ap.add_argument("--per-month", type=int, default=10000)
+    ap.add_argument("--keep", type=int, default=6)
+    args = ap.parse_args()
+
+    seed(args)
+    measure("before")
+
+    now = START + timedelta(days=31 * args.months)
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        done = archive_old_logs(db, retention_days=31 * args.keep, now=now)
+    elapsed = time.perf_counter() - t0
+    gz = sum(os.path.getsize(os.path.join(ARCHIVE_DIR, f)) for f in os.listdir(ARCHIVE_DIR)) / 1e6
+    print(f"archived {len(done)} months ({sum(m.moved for m in done)} rows) in {elapsed:.1f}s, "
+          f"{gz:.1f}MB compressed")
+    measure("after")
+
+    with SessionLocal() as db:
+        entry = db.execute(select(LogArchive).order_by(LogArchive.month)).scalars().first()
+    stmt = select(DiaryLog.id).where(DiaryLog.user_id == "u7").order_by(DiaryLog.id.desc()).limit(20)
+    for label in ("cold", "warm"):
+        t0 = time.perf_counter()
+        archive_reader.execute(entry.month, entry.path, stmt)
+        print(f"archived month {entry.month} user page ({label}): {(time.perf_counter() - t0) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+/diary/reply 동시성 비교: 동기 파이프라인(스레드풀) vs async 파이프라인.
+
+가짜 LLM(tests/fake_llm.py, 지연 --latency-ms)에 붙여서 N 건을 동시에 보낸다.
+- sync  : run_pipeline 을 --threads 크기 스레드풀에서 실행 (기존 def 라우트와 동일한 구조, 기본 40 = AnyIO 기본 한도)
+- async : run_pipeline_async 를 asyncio.gather 로 동시에 실행
+
+    python scripts/bench_async_reply.py [--n 200] [--latency-ms 300] [--threads 40]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench-dummy-key")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from diary_replier import generator  # noqa: E402
+from diary_replier.pipeline import run_pipeline, run_pipeline_async  # noqa: E402
+from diary_replier.schemas import DiaryInput  # noqa: E402
+from tests.fake_llm import FakeLLM  # noqa: E402
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))] * 1000
+
+
+def _report(name, lat, elapsed, fake):
+    print(f"{name:>5}: {len(lat) / elapsed:7.1f} req/s  total {elapsed:6.2f}s  "
+          f"p50 {_pct(lat, 0.5):7.0f}ms  p95 {_pct(lat, 0.95):7.0f}ms  max in-flight {fake.max_in_flight}")
+
+
+def bench_sync(payloads, latency_ms, threads):
+    fake = FakeLLM(latency_ms=latency_ms)
+    generator._client = fake.sync_client()
+
+    # 지연은 제출 시점부터 잰다 (스레드풀 대기 포함 = 클라이언트가 느끼는 지연)
+    t0 = time.perf_counter()
+
+    def one(p):
+        run_pipeline(p)
+        return time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        lat = list(ex.map(one, payloads))
+    _report("sync", lat, time.perf_counter() - t0, fake)
+
+
+def bench_async(payloads, latency_ms):
+    fake = FakeLLM(latency_ms=latency_ms)
+    generator._async_client = fake.async_client()
+
+    t0 = time.perf_counter()
+
+    async def one(p):
+        await run_pipeline_async(p)
+        return time.perf_counter() - t0
+
+    async def main():
+        return await asyncio.gather(*(one(p) for p in payloads))
+
+    lat = asyncio.run(main())
+    _report("async", lat, time.perf_counter() - t0, fake)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200)
+    ap.add_argument("--latency-ms", type=float, default=300)
+    ap.add_argument("--threads", type=int, default=40)
+    args = ap.parse_args()
+
+    payloads = [DiaryInput(text=f"오늘은 조금 피곤했지만 뿌듯한 하루였다. ({i})") for i in range(args.n)]
+    print(f"n={args.n} latency={args.latency_ms:.0f}ms threads={args.threads}")
+    bench_sync(payloads, args.latency_ms, args.threads)
+    bench_async(payloads, args.latency_ms)
+
+
+if __name__ == "__main__":
+    main()
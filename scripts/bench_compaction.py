@@ -0,0 +1,93 @@
+"""
+긴 일기 압축 전/후 비교: 추정 입력 토큰, /diary/reply 지연 p50/p95.
+
+가짜 LLM(tests/fake_llm.py)은 기본 지연 --latency-ms + 입력 토큰당 --ms-per-token 만큼 늦게 답한다
+(실제 프로바이더의 prefill 비용 흉내). 같은 일기 세트를 COMPACT_TOKEN_BUDGET=0(압축 없음)과
+--budget 으로 각각 돌린다.
+
+    python scripts/bench_compaction.py [--n 100] [--budget 600] [--min-chars 1000] [--max-chars 8000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench-dummy-key")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("REPLY_CACHE_TTL", "0")
+
+from diary_replier import compaction, generator  # noqa: E402
+from diary_replier.metrics import LatencyWindow  # noqa: E402
+from diary_replier.pipeline import run_pipeline_async  # noqa: E402
+from diary_replier.schemas import DiaryInput  # noqa: E402
+from tests.fake_llm import FakeLLM  # noqa: E402
+
+PHRASES = [
+    "오늘은 학교에서 발표를 했다.", "생각보다 잘 끝나서 뿌듯했다.", "하루 종일 피곤하고 지쳤다.",
+    "친구랑 밥을 먹었다.", "버스를 타고 집에 왔다.", "조금 속상한 일도 있었다.", "숙제를 했다.",
+    "창밖을 보며 멍하니 있었다.", "내일은 나아지겠지?", "동생이랑 게임을 했다.",
+]
+
+
+def make_texts(n, lo, hi):
+    rnd = random.Random(0)
+    out = []
+    for _ in range(n):
+        target, t = rnd.randint(lo, hi), ""
+        while len(t) < target:
+            t += rnd.choice(PHRASES) + " "
+        out.append(t[:8000])
+    return out
+
+
+def run(texts, budget, args):
+    compaction.COMPACT_TOKEN_BUDGET = budget
+    generator._async_client = FakeLLM(latency_ms=args.latency_ms, ms_per_input_token=args.ms_per_token).async_client()
+    lat = LatencyWindow(maxlen=len(texts))
+    before = compaction.compaction_stats()
+
+    async def one(t):
+        t0 = time.perf_counter()
+        await run_pipeline_async(DiaryInput(text=t))
+        lat.add((time.perf_counter() - t0) * 1000)
+
+    async def main():
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def guarded(t):
+            async with sem:
+                await one(t)
+        await asyncio.gather(*(guarded(t) for t in texts))
+
+    asyncio.run(main())
+    after = compaction.compaction_stats()
+    tokens = after["tokens_after"] - before["tokens_after"]
+    saved = after["tokens_saved"] - before["tokens_saved"]
+    snap = lat.snapshot()
+    label = "off" if budget <= 0 else f"budget={budget}"
+    print(f"{label:>11}: input tokens {tokens:8d} (saved {saved:7d})  p50 {snap['p50']:7.0f}ms  p95 {snap['p95']:7.0f}ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100)
+    ap.add_argument("--budget", type=int, default=600)
+    ap.add_argument("--min-chars", type=int, default=1000)
+    ap.add_argument("--max-chars", type=int, default=8000)
+    ap.add_argument("--latency-ms", type=float, default=300)
+    ap.add_argument("--ms-per-token", type=float, default=0.3)
+    ap.add_argument("--concurrency", type=int, default=20)
+    args = ap.parse_args()
+
+    texts = make_texts(args.n, args.min_chars, args.max_chars)
+    print(f"n={args.n} chars={args.min_chars}~{args.max_chars} latency={args.latency_ms:.0f}ms+{args.ms_per_token}ms/token")
+    run(texts, 0, args)
+    run(texts, args.budget, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+DB 라우트 동시 처리량 비교: POST /user/preset + GET /user/preset/{id} + GET /diary/logs.
+
+- before : 예전 구조 (def 라우트 = 스레드풀, 동기 Session, /user 는 get_session 을 바로 주입해서 안 닫힘)
+- after  : 지금 라우터 (async def + AsyncSession, 요청마다 닫히는 get_db)
+
+같은 DB 파일에 앱을 ASGI 로 직접 붙여(httpx.ASGITransport) --concurrency 개씩 동시에 보낸다.
+끝난 뒤 풀에서 돌아오지 않은 연결 수(checked_out)도 찍는다.
+
+    python scripts/bench_db_routes.py [--n 2000] [--concurrency 50] [--write-ratio 0.2]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench-dummy-key")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("DB_POOL_TIMEOUT", "2")  # 풀이 바닥나면 30초씩 기다리지 말고 빨리 실패로 센다
+
+import httpx  # noqa: E402
+from fastapi import APIRouter, Depends, FastAPI  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from api.models import DiaryLog, SessionLocal, UserPreset, async_engine, engine, get_session, save_diary_logs  # noqa: E402
+from api.routers import diary, user  # noqa: E402
+from diary_replier.metrics import LatencyWindow  # noqa: E402
+
+
+def legacy_app() -> FastAPI:
+    # 바꾸기 전 라우터를 그대로 옮긴 것 (비교용)
+    users = APIRouter(prefix="/user")
+
+    @users.post("/preset")
+    def set_preset(body: user.PresetIn, db: Session = Depends(get_session)):
+        up = db.query(UserPreset).filter_by(user_id=body.user_id).first()
+        if not up:
+            db.add(UserPreset(user_id=body.user_id, preset=body.preset, mood_default=body.mood_default))
+        else:
+            up.preset = body.preset
+            up.mood_default = body.mood_default
+        db.commit()
+        return {"ok": True, "user_id": body.user_id, "preset": body.preset}
+
+    @users.get("/preset/{user_id}")
+    def get_preset(user_id: str, db: Session = Depends(get_session)):
+        up = db.query(UserPreset).filter_by(user_id=user_id).first()
+        return {"user_id": user_id, "preset": up.preset if up else None}
+
+    logs = APIRouter(prefix="/diary")
+
+    def get_db():
+        db = get_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @logs.get("/logs")
+    def list_logs(user_id: str | None = None, limit: int = 20, db: Session = Depends(get_db)):
+        q = db.query(DiaryLog).order_by(DiaryLog.id.desc())
+        if user_id:
+            q = q.filter(DiaryLog.user_id == user_id)
+        return [{"id": r.id, "ts": r.ts.isoformat(), "summary": r.summary} for r in q.limit(limit).all()]
+
+    app = FastAPI()
+    app.include_router(users, prefix="/user")
+    app.include_router(logs, prefix="/diary")
+    return app
+
+
+def current_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(diary.router, prefix="/diary")
+    app.include_router(user.router, prefix="/user")
+    return app
+
+
+def seed():
+    rows = [
+        dict(user_id=f"bench-u{i % 100}", preset_used="warm", mood_hint=None, text="일기 " * 100,
+             reply_short="s", reply_normal="n" * 400,
+             analysis={"valence": "neutral", "emotions": ["happy"], "keywords": [], "summary": "요약"},
+             safety_flag=False, flags={}, latency_ms=1)
+        for i in range(5000)
+    ]
+    with SessionLocal() as db:
+        save_diary_logs(db, rows)
+
+
+def run(label, app, pool_engine, args):
+    lat = LatencyWindow(maxlen=args.n)
+    errors = 0
+
+    async def main():
+        nonlocal errors
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            sem = asyncio.Semaphore(args.concurrency)
+            rnd = random.Random(0)
+
+            async def one(i):
+                nonlocal errors
+                uid = f"bench-u{rnd.randrange(100)}"
+                r = rnd.random()
+                async with sem:
+                    t0 = time.perf_counter()
+                    if r < args.write_ratio:
+                        resp = await client.post("/user/user/preset", json={"user_id": uid, "preset": "coach"})
+                    elif r < (1 + args.write_ratio) / 2:
+                        resp = await client.get(f"/user/user/preset/{uid}")
+                    else:
+                        resp = await client.get("/diary/diary/logs", params={"user_id": uid})
+                    lat.add((time.perf_counter() - t0) * 1000)
+                    if resp.status_code >= 500:
+                        errors += 1
+
+            await asyncio.gather(*(one(i) for i in range(args.n)))
+
+    t0 = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - t0
+    snap = lat.snapshot()
+    leaked = pool_engine.pool.checkedout()
+    gc.collect()
+    print(f"{label:>6}: {args.n / elapsed:7.0f} req/s  p50 {snap['p50']:6.1f}ms  p95 {snap['p95']:6.1f}ms  "
+          f"5xx {errors}  checked-out after run {leaked} (after gc {pool_engine.pool.checkedout()})")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--write-ratio", type=float, default=0.2)
+    args = ap.parse_args()
+
+    seed()
+    print(f"n={args.n} concurrency={args.concurrency} write-ratio={args.write_ratio}")
+    run("before", legacy_app(), engine, args)
+    run("after", current_app(), async_engine.sync_engine, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+EMO_MODEL 추론 런타임별 지연시간 / 메모리 비교.
+
+런타임마다 별도 프로세스에서 모델을 올려서 (메모리 측정이 섞이지 않게)
+로드 시간, RSS 증가량, 짧은/긴 일기 p50/p95 지연시간을 출력한다.
+
+    EMO_MODEL=beomi/KcELECTRA-base python scripts/bench_emo_runtime.py \
+        [--runtimes default,quantized,onnx] [--n 50]
+
+default 는 기존 경로 (fp32, EMO_MAX_TOKENS=0 → 청크/자르기 없음) 로 측정한다.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SHORT = "오늘은 발표가 끝나서 뿌듯했지만 조금 피곤했어."
+LONG = (
+    "아침부터 비가 와서 기분이 가라앉았다. 출근길 지하철은 사람이 너무 많았다. "
+    "회의에서는 내 의견이 잘 받아들여지지 않아서 속상했다. 점심은 혼자 먹었다. "
+    "오후에는 밀린 일을 처리하느라 정신이 없었고, 퇴근하고 나서야 조금 숨을 돌렸다. "
+) * 25  # 약 3,000자
+
+
+def _rss_mb() -> float:
+    # linux: KB 단위 최대 RSS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))]
+
+
+def child(n: int) -> dict:
+    from diary_replier import analyzer_hf
+
+    base = _rss_mb()
+    t0 = time.perf_counter()
+    if not analyzer_hf.available():
+        return {"error": analyzer_hf._err}
+    load_s = time.perf_counter() - t0
+    loaded = _rss_mb()
+
+    res = {"load_s": round(load_s, 2), "rss_model_mb": round(loaded - base, 1)}
+    for name, text in (("short", SHORT), ("long", LONG)):
+        analyzer_hf._classify(text)  # warm-up
+        lat = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            analyzer_hf._classify(text)
+            lat.append((time.perf_counter() - t0) * 1000)
+        res[f"{name}_p50_ms"] = round(statistics.median(lat), 1)
+        res[f"{name}_p95_ms"] = round(_pct(lat, 0.95), 1)
+    res["rss_peak_mb"] = round(_rss_mb(), 1)
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runtimes", default="default,quantized,onnx")
+    ap.add_argument("--n", type=int, default=30)
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.n)))
+        return
+
+    if not os.getenv("EMO_MODEL"):
+        sys.exit("EMO_MODEL 을 지정해야 합니다.")
+
+    for rt in args.runtimes.split(","):
+        env = dict(os.environ, EMO_RUNTIME=rt, EMO_BATCH_MAX="1")
+        if rt == "default":
+            env["EMO_MAX_TOKENS"] = "0"  # 기존 경로 그대로
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", "--n", str(args.n)],
+            env=env, capture_output=True, text=True, cwd=ROOT,
+        )
+        line = out.stdout.strip().splitlines()[-1] if out.stdout.strip() else out.stderr.strip()[-300:]
+        print(f"{rt:10s} {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+"이번 달 사용자 X 의 sad 로그" 조회 비교.
+
+- python : 예전 방식. 사용자 로그를 전부 읽어 emotions 를 파이썬에서 json.loads 해서 거른다
+           (SQLite 가 아니면 emotions 가 json.dumps 한 TEXT 였음)
+- db     : has_emotion + 기간 조건을 SQL 로 ((user_id, ts) 인덱스로 좁히고 DB 가 판단)
+
+    python scripts/bench_emotion_query.py [--rows 200000] [--heavy 20000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import cast, select, String  # noqa: E402
+
+from api.models import DiaryLog, SessionLocal, engine, has_emotion, save_diary_logs  # noqa: E402
+
+EMOTIONS = ["sad", "happy", "tired", "angry", "calm", "anxious"]
+START = datetime(2026, 1, 1)
+
+
+def seed(args):
+    rnd = random.Random(0)
+    with SessionLocal() as db:
+        if db.query(DiaryLog).count() >= args.rows:
+            return
+        batch = []
+        for i in range(args.rows):
+            uid = "heavy" if i % (args.rows // args.heavy) == 0 else f"u{i % 5000}"
+            batch.append(dict(
+                user_id=uid, preset_used="warm", mood_hint=None, text="일기 " * 50,
+                reply_short="s", reply_normal="n" * 300,
+                analysis={"valence": "neutral", "emotions": rnd.sample(EMOTIONS, 2), "keywords": [], "summary": "s"},
+                safety_flag=False, flags={}, latency_ms=1,
+                ts=START + timedelta(minutes=i * 2),
+            ))
+            if len(batch) == 5000:
+                save_diary_logs(db, batch)
+                batch = []
+        save_diary_logs(db, batch)
+
+
+def timed(fn, repeat=10):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200000)
+    ap.add_argument("--heavy", type=int, default=20000)
+    args = ap.parse_args()
+
+    seed(args)
+    with SessionLocal() as db:
+        last = db.execute(select(DiaryLog.ts).order_by(DiaryLog.id.desc()).limit(1)).scalar()
+    since = datetime(last.year, last.month, 1)
+
+    with SessionLocal() as db:
+        def in_python():
+            # 예전 TEXT 컬럼처럼 문자열로 받아 파이썬에서 파싱
+            rows = db.execute(
+                select(DiaryLog.id, DiaryLog.ts, cast(DiaryLog.emotions, String).label("emotions"))
+                .where(DiaryLog.user_id == "heavy")
+            ).all()
+            return [r.id for r in rows if r.ts >= since and "sad" in json.loads(r.emotions or "[]")]
+
+        def in_db():
+            return list(db.execute(
+                select(DiaryLog.id).where(
+                    DiaryLog.user_id == "heavy", DiaryLog.ts >= since,
+                    has_emotion(engine.dialect.name, "sad"),
+                )
+            ).scalars())
+
+        t_py, a = timed(in_python)
+        t_db, b = timed(in_db)
+    assert sorted(a) == sorted(b)
+    print(f"rows={args.rows} heavy={args.heavy} since={since:%Y-%m-%d} matches={len(b)}")
+    print(f"python: {t_py:8.2f}ms  db: {t_db:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+분석 단계 요청당 CPU 비교.
+
+- separate : analyze(text) + safety_scan(text) 를 각각 호출 (단계마다 스캔/문장 분리)
+- shared   : TextFeatures 하나를 만들어 두 단계가 공유
+
+    python scripts/bench_features.py [--chars 2000] [--n 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diary_replier.analyzer import analyze  # noqa: E402
+from diary_replier.features import TextFeatures  # noqa: E402
+from diary_replier.guard import safety_scan  # noqa: E402
+
+SAMPLE = (
+    "오늘은 학교에서 발표를 했는데 생각보다 잘 끝나서 뿌듯했지만 하루 종일 피곤하고 지쳤다. "
+    "친구랑 밥을 먹으면서 그냥 그랬던 이야기를 했다. 그래도 내일은 좀 더 나아지겠지? "
+)
+
+
+def separate(text: str):
+    return analyze(text), safety_scan(text)
+
+
+def shared(text: str):
+    f = TextFeatures(text)
+    return analyze(text, f), safety_scan(text, f)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chars", type=int, default=2000)
+    ap.add_argument("--n", type=int, default=2000)
+    args = ap.parse_args()
+
+    text = (SAMPLE * (args.chars // len(SAMPLE) + 1))[: args.chars]
+    assert separate(text) == shared(text)
+
+    res = {}
+    for name, fn in (("separate", separate), ("shared", shared)):
+        fn(text)
+        t0 = time.process_time()
+        for _ in range(args.n):
+            fn(text)
+        res[name] = (time.process_time() - t0) / args.n * 1e6
+        print(f"{name:9s} {res[name]:8.1f} us CPU/request")
+    print(f"saved     {res['separate'] - res['shared']:8.1f} us CPU/request "
+          f"({(1 - res['shared'] / res['separate']) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+lexicon 매처 처리량 벤치마크.
+
+기존 방식(키워드마다 `in` / str.count 로 전체 텍스트 스캔)과
+컴파일된 Aho-Corasick 한 번 스캔을 같은 입력으로 비교한다.
+
+    python scripts/bench_lexicon.py [--chars 8000] [--n 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diary_replier import lexicon  # noqa: E402
+from diary_replier.analyzer import EMO_CODE_LEX, POS_WORDS, NEG_WORDS  # noqa: E402
+from diary_replier.guard import RISK_PATTERNS  # noqa: E402
+
+SAMPLE = (
+    "오늘은 학교에서 발표를 했는데 생각보다 잘 끝나서 뿌듯했지만 하루 종일 피곤하고 지쳤다. "
+    "친구랑 밥을 먹으면서 그냥 그랬던 이야기를 했다. 그래도 내일은 좀 더 나아지겠지? "
+)
+
+
+def naive_scan(text: str):
+    emos = [c for c, kws in EMO_CODE_LEX.items() if any(k in text for k in kws)]
+    pos = sum(text.count(w) for w in POS_WORDS)
+    neg = sum(text.count(w) for w in NEG_WORDS)
+    low = text.lower()
+    risk = {k: any(t in low for t in toks) for k, toks in RISK_PATTERNS.items()}
+    return emos, pos, neg, risk
+
+
+def compiled_scan(text: str):
+    h = lexicon.scan(text)
+    risk = {k: h.any("risk", k) for k in RISK_PATTERNS}
+    return h.labels("emo"), h.count("pos"), h.count("neg"), risk
+
+
+def bench(fn, text: str, n: int) -> float:
+    fn(text)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn(text)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chars", type=int, default=8000)
+    ap.add_argument("--n", type=int, default=500)
+    args = ap.parse_args()
+
+    text = (SAMPLE * (args.chars // len(SAMPLE) + 1))[: args.chars]
+    assert naive_scan(text) == compiled_scan(text)
+
+    t0 = time.perf_counter()
+    m = lexicon.LexiconMatcher(lexicon.default_lexicons(), casefold=["risk"])
+    build_ms = (time.perf_counter() - t0) * 1000
+    print(f"patterns={len(m.patterns)} build={build_ms:.1f}ms chars={len(text)} n={args.n}")
+
+    for name, fn in (("naive", naive_scan), ("compiled", compiled_scan)):
+        dt = bench(fn, text, args.n)
+        mb = len(text.encode("utf-8")) * args.n / dt / 1e6
+        print(f"{name:9s} {dt / args.n * 1000:7.3f} ms/doc  {args.n / dt:8.1f} docs/s  {mb:6.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+diary_logs 저장 방식 비교: /diary/reply 지연 p50/p95 (LLM 은 가짜, DB 쓰기만 느리게).
+
+- inline       : 요청 안에서 save_diary_log (add + commit + refresh, 행마다 fsync / 쓰기 락 대기)
+- write-behind : 큐에 넣고 바로 응답, 워커가 배치로 INSERT + commit 한 번
+
+DB 쓰기 비용은 --db-ms 로 흉내 낸다 (commit 한 번당 sleep, 쓰기 락처럼 한 번에 하나씩).
+
+    python scripts/bench_log_writer.py [--n 300] [--concurrency 10] [--latency-ms 100] [--db-ms 15]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench-dummy-key")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("REPLY_CACHE_TTL", "0")
+os.environ.setdefault("LOG_SPILL_PATH", "")
+
+from api import log_writer as log_writer_mod  # noqa: E402
+from api.models import DiaryLog, SessionLocal  # noqa: E402
+from diary_replier import generator, pipeline  # noqa: E402
+from diary_replier.metrics import LatencyWindow  # noqa: E402
+from diary_replier.schemas import DiaryInput  # noqa: E402
+from tests.fake_llm import FakeLLM  # noqa: E402
+
+
+def slow_db(db_ms):
+    # SQLite 쓰기 락 흉내: commit 은 한 번에 하나, 한 번당 db_ms
+    write_lock = threading.Lock()
+    save_one, save_many = pipeline.save_diary_log, log_writer_mod.save_diary_logs
+
+    def one(db, **row):
+        with write_lock:
+            time.sleep(db_ms / 1000)
+            return save_one(db, **row)
+
+    def many(db, rows):
+        with write_lock:
+            time.sleep(db_ms / 1000)
+            return save_many(db, rows)
+
+    pipeline.save_diary_log = one
+    log_writer_mod.save_diary_logs = many
+
+
+def run(label, write_behind, args):
+    log_writer_mod.log_writer.enabled = write_behind
+    generator._async_client = FakeLLM(latency_ms=args.latency_ms).async_client()
+    lat = LatencyWindow(maxlen=args.n)
+
+    async def one(i):
+        with SessionLocal() as db:
+            t0 = time.perf_counter()
+            await pipeline.run_pipeline_with_logging_async(
+                DiaryInput(text=f"오늘은 발표가 끝나서 뿌듯했지만 조금 피곤했어 {label} {i}"),
+                user_id=f"bench-u{i % 10}",
+                preset_override=None,
+                db=db,
+            )
+            lat.add((time.perf_counter() - t0) * 1000)
+
+    async def main():
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def guarded(i):
+            async with sem:
+                await one(i)
+        await asyncio.gather(*(guarded(i) for i in range(args.n)))
+
+    t0 = time.perf_counter()
+    asyncio.run(main())
+    wall = time.perf_counter() - t0
+    log_writer_mod.log_writer.flush()
+    with SessionLocal() as db:
+        saved = db.query(DiaryLog).filter(DiaryLog.text.like(f"%{label}%")).count()
+
+    snap = lat.snapshot()
+    extra = ""
+    if write_behind:
+        s = log_writer_mod.log_writer.stats()
+        extra = f"  batches {s['batches']} (avg {s['avg_batch']})"
+    print(f"{label:>12}: p50 {snap['p50']:6.0f}ms  p95 {snap['p95']:6.0f}ms  "
+          f"{args.n / wall:6.1f} req/s  saved {saved}/{args.n}{extra}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=300)
+    ap.add_argument("--concurrency", type=int, default=10)
+    ap.add_argument("--latency-ms", type=float, default=100)
+    ap.add_argument("--db-ms", type=float, default=15)
+    args = ap.parse_args()
+
+    slow_db(args.db_ms)
+    print(f"n={args.n} concurrency={args.concurrency} llm={args.latency_ms:.0f}ms db-write={args.db_ms:.0f}ms")
+    run("inline", False, args)
+    run("write-behind", True, args)
+    log_writer_mod.log_writer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+/diary/logs 조회 비교: 헤비 유저의 깊은 페이지.
+
+- old      : 예전 쿼리 (DiaryLog 전체 행, user_id 단일 인덱스, ORDER BY id DESC) — 첫 페이지만 가능
+- offset   : OFFSET 으로 깊은 페이지 (같은 투영) — 앞 페이지를 다 읽고 버림
+- keyset   : WHERE user_id = ? AND id < cursor (user_id, id) 복합 인덱스 + 필요한 컬럼만
+
+인덱스 구성은 --index single|composite 로 바꿔 두 번 돌려 비교한다.
+
+    python scripts/bench_logs.py [--rows 200000] [--heavy 50000] [--page 20] [--depth 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import text  # noqa: E402
+
+from api.models import DiaryLog, SessionLocal, save_diary_logs  # noqa: E402
+
+META = (DiaryLog.id, DiaryLog.ts, DiaryLog.user_id, DiaryLog.preset_used, DiaryLog.mood_hint,
+        DiaryLog.valence, DiaryLog.emotions, DiaryLog.keywords, DiaryLog.summary)
+
+
+def seed(args):
+    body = "오늘은 발표가 끝나서 뿌듯했지만 조금 피곤했어. " * 20
+    with SessionLocal() as db:
+        if db.query(DiaryLog).count() >= args.rows:
+            return
+        batch = []
+        for i in range(args.rows):
+            uid = "heavy" if i % (args.rows // args.heavy) == 0 else f"u{i % 5000}"
+            batch.append(dict(
+                user_id=uid, preset_used="warm", mood_hint=None, text=body,
+                reply_short="짧은 답장 " * 10, reply_normal="긴 답장 " * 80,
+                analysis={"valence": "neutral", "emotions": ["happy"], "keywords": ["발표"], "summary": "발표"},
+                safety_flag=False, flags={}, latency_ms=1,
+            ))
+            if len(batch) == 5000:
+                save_diary_logs(db, batch)
+                batch = []
+        save_diary_logs(db, batch)
+
+
+def set_index(kind):
+    with SessionLocal() as db:
+        db.execute(text("DROP INDEX IF EXISTS ix_diary_logs_user_id_id"))
+        db.execute(text("DROP INDEX IF EXISTS ix_diary_logs_user_id"))
+        if kind == "single":
+            db.execute(text("CREATE INDEX ix_diary_logs_user_id ON diary_logs (user_id)"))
+        else:
+            db.execute(text("CREATE INDEX ix_diary_logs_user_id_id ON diary_logs (user_id, id)"))
+        db.execute(text("ANALYZE"))
+        db.commit()
+
+
+def timed(fn, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200000)
+    ap.add_argument("--heavy", type=int, default=50000)
+    ap.add_argument("--page", type=int, default=20)
+    ap.add_argument("--depth", type=int, default=2000, help="몇 번째 페이지를 잴지")
+    args = ap.parse_args()
+
+    seed(args)
+    with SessionLocal() as db:
+        ids = [r.id for r in db.query(DiaryLog.id).filter(DiaryLog.user_id == "heavy").order_by(DiaryLog.id.desc())]
+    offset = min(args.depth * args.page, len(ids) - args.page)
+    cursor = ids[offset - 1]
+    print(f"rows={args.rows} heavy={len(ids)} page={args.page} depth offset={offset}")
+
+    for kind in ("single", "composite"):
+        set_index(kind)
+        with SessionLocal() as db:
+            def old():
+                db.query(DiaryLog).filter(DiaryLog.user_id == "heavy").order_by(DiaryLog.id.desc()).limit(args.page).all()
+                db.expunge_all()
+
+            def by_offset():
+                (db.query(*META).filter(DiaryLog.user_id == "heavy").order_by(DiaryLog.id.desc())
+                 .offset(offset).limit(args.page).all())
+
+            def keyset():
+                (db.query(*META).filter(DiaryLog.user_id == "heavy", DiaryLog.id < cursor)
+                 .order_by(DiaryLog.id.desc()).limit(args.page).all())
+
+            print(f"{kind:>9} index: old first page {timed(old):7.2f}ms  "
+                  f"offset deep page {timed(by_offset):7.2f}ms  keyset deep page {timed(keyset):7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
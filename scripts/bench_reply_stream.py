@@ -0,0 +1,67 @@
+"""
+첫 유용한 바이트까지의 시간: /diary/reply (전체 생성 후 응답) vs /diary/reply/stream.
+
+가짜 LLM(tests/fake_llm.py)에 첫 토큰 지연 --ttft-ms, 전체 생성 --latency-ms 를 주고
+파이프라인을 직접 돌려 meta / reply_short / done 이벤트 도착 시각을 잰다.
+
+    python scripts/bench_reply_stream.py [--n 20] [--latency-ms 2000] [--ttft-ms 300]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench-dummy-key")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("REPLY_CACHE_TTL", "0")  # 캐시 hit 로 재는 값이 왜곡되지 않게
+
+from diary_replier import generator  # noqa: E402
+from diary_replier.pipeline import run_pipeline_async, stream_pipeline_with_logging  # noqa: E402
+from diary_replier.schemas import DiaryInput  # noqa: E402
+from tests.fake_llm import FakeLLM  # noqa: E402
+
+
+async def one_blocking(p):
+    t0 = time.perf_counter()
+    await run_pipeline_async(p)
+    return time.perf_counter() - t0
+
+
+async def one_stream(p):
+    t0 = time.perf_counter()
+    marks = {}
+    async for event, _ in stream_pipeline_with_logging(p, user_id=None, preset_override=None):
+        marks.setdefault(event, time.perf_counter() - t0)
+    return marks
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20)
+    ap.add_argument("--latency-ms", type=float, default=2000)
+    ap.add_argument("--ttft-ms", type=float, default=300)
+    args = ap.parse_args()
+
+    generator._async_client = FakeLLM(latency_ms=args.latency_ms, ttft_ms=args.ttft_ms).async_client()
+    payloads = [DiaryInput(text=f"오늘은 조금 피곤했지만 뿌듯한 하루였다. ({i})") for i in range(args.n)]
+
+    async def run():
+        blocking = await asyncio.gather(*(one_blocking(p) for p in payloads))
+        streams = await asyncio.gather(*(one_stream(p) for p in payloads))
+        return blocking, streams
+
+    blocking, streams = asyncio.run(run())
+    ms = lambda xs: f"{statistics.median(xs) * 1000:7.0f}ms"  # noqa: E731
+    print(f"n={args.n} latency={args.latency_ms:.0f}ms ttft={args.ttft_ms:.0f}ms (median)")
+    print(f"/reply         full response  {ms(blocking)}")
+    print(f"/reply/stream  meta           {ms([s['meta'] for s in streams])}")
+    print(f"/reply/stream  reply_short    {ms([s['reply_short'] for s in streams])}")
+    print(f"/reply/stream  done           {ms([s['done'] for s in streams])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+파이프라인 단계 DAG 전/후 비교: /diary/reply 지연 p50/p95 + 단계별 소요.
+
+- serial : 예전 순서대로 한 줄로 (features → preset → analyze → safety → compact → mood → generate → 로그 저장)
+- dag    : 의존 그래프대로 (프리셋 DB 조회 ∥ 분석, 안전 스캔 ∥ 생성, 로그 저장은 응답 뒤)
+
+DB 가 느린 상황은 --db-ms 로 흉내 낸다 (프리셋 조회 / save_diary_log 앞에 sleep, 프리셋 캐시는 끔).
+
+    python scripts/bench_stages.py [--n 200] [--concurrency 10] [--latency-ms 300] [--db-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench-dummy-key")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("REPLY_CACHE_TTL", "0")
+os.environ.setdefault("PRESET_CACHE_TTL", "0")  # 프리셋 조회마다 DB 비용을 치르게
+
+from api.models import SessionLocal  # noqa: E402
+from api.preset_cache import preset_cache  # noqa: E402
+from diary_replier import generator, metrics, pipeline  # noqa: E402
+from diary_replier.metrics import LatencyWindow  # noqa: E402
+from diary_replier.schemas import DiaryInput  # noqa: E402
+from diary_replier.stages import Stage, StageGraph  # noqa: E402
+from tests.fake_llm import FakeLLM  # noqa: E402
+
+
+def serial_graph(graph: StageGraph) -> StageGraph:
+    # 같은 단계를 선언 순서대로 한 줄로 묶는다 (각 단계가 바로 앞 단계를 기다림)
+    stages, prev = [], None
+    for s in graph.stages.values():
+        deps = tuple(dict.fromkeys(s.deps + ((prev,) if prev else ())))
+        stages.append(Stage(s.name, s.fn, deps, s.blocking))
+        prev = s.name
+    return StageGraph(graph.name, stages)
+
+
+def slow_db(db_ms):
+    load_preset, save_diary_log = preset_cache.loader, pipeline.save_diary_log
+
+    def preset(db, user_id):
+        time.sleep(db_ms / 1000)
+        return load_preset(db, user_id)
+
+    def save(db, **row):
+        time.sleep(db_ms / 1000)
+        return save_diary_log(db, **row)
+
+    preset_cache.loader = preset
+    pipeline.save_diary_log = save
+
+
+def run(label, graph, deferred_log, args):
+    pipeline.reply_graph_async = graph
+    generator._async_client = FakeLLM(latency_ms=args.latency_ms).async_client()
+    metrics.reset()
+    lat = LatencyWindow(maxlen=args.n)
+    backlog = []
+
+    async def one(i):
+        with SessionLocal() as db:
+            t0 = time.perf_counter()
+            await pipeline.run_pipeline_with_logging_async(
+                DiaryInput(text=f"오늘은 발표가 끝나서 뿌듯했지만 조금 피곤했어 {label} {i}"),
+                user_id=f"bench-u{i % 10}",
+                preset_override=None,
+                db=db,
+                after_response=(lambda fn, row: backlog.append((fn, row))) if deferred_log else None,
+            )
+            lat.add((time.perf_counter() - t0) * 1000)
+
+    async def main():
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def guarded(i):
+            async with sem:
+                await one(i)
+        await asyncio.gather(*(guarded(i) for i in range(args.n)))
+
+    asyncio.run(main())
+    for fn, row in backlog:  # 응답 뒤 저장분 (측정 밖)
+        fn(row)
+
+    snap = lat.snapshot()
+    stats = metrics.latency_stats()
+    stages = "  ".join(
+        f"{name}={stats[f'stages.{name}']['p50']:.0f}"
+        for name in graph.stages if f"stages.{name}" in stats
+    )
+    print(f"{label:>6}: p50 {snap['p50']:7.0f}ms  p95 {snap['p95']:7.0f}ms  | stage p50(ms) {stages}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=10)  # 요청마다 세션 1개 (기본 풀 5+10)
+    ap.add_argument("--latency-ms", type=float, default=300)
+    ap.add_argument("--db-ms", type=float, default=20)
+    args = ap.parse_args()
+
+    slow_db(args.db_ms)
+    dag = pipeline.reply_graph_async
+    print(f"n={args.n} concurrency={args.concurrency} llm={args.latency_ms:.0f}ms db={args.db_ms:.0f}ms")
+    run("serial", serial_graph(dag), False, args)
+    run("dag", dag, True, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+DB 프로필별 동시 쓰기/읽기 처리량 (api/storage.py).
+
+스레드 --concurrency 개가 각각 diary_logs 에 한 행씩 commit(save_diary_log 와 같은 add+commit+refresh)하고,
+섞어서 사용자별 최근 로그 조회(/diary/logs 와 같은 쿼리)를 한다. 프로필마다 새 DB 파일.
+
+- sqlite-default : create_engine 기본값 (rollback 저널, synchronous=FULL, 풀 5+10)
+- sqlite         : WAL + busy_timeout + synchronous=NORMAL + mmap + 풀 DB_POOL_SIZE+DB_MAX_OVERFLOW
+- --url 로 Postgres 등을 주면 그 URL 도 default / 튜닝 프로필로 잰다 (드라이버 필요)
+
+    python scripts/bench_storage.py [--seconds 5] [--concurrency 16] [--read-ratio 0.5] [--url postgresql+psycopg2://...]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from api.models import Base, DiaryLog  # noqa: E402
+from api.storage import create_db_engine  # noqa: E402
+from diary_replier.metrics import LatencyWindow  # noqa: E402
+
+
+def run(label, url, profile, args):
+    engine = create_db_engine(url, profile)
+    Base.metadata.drop_all(engine, tables=[DiaryLog.__table__])
+    Base.metadata.create_all(engine, tables=[DiaryLog.__table__])
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    writes, reads = LatencyWindow(maxlen=100000), LatencyWindow(maxlen=100000)
+    errors = {"locked": 0, "other": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + args.seconds
+
+    def worker(n):
+        rnd = random.Random(n)
+        while time.perf_counter() < stop:
+            user = f"bench-u{rnd.randrange(50)}"
+            t0 = time.perf_counter()
+            try:
+                with Session() as db:
+                    if rnd.random() < args.read_ratio:
+                        db.query(DiaryLog).filter(DiaryLog.user_id == user).order_by(DiaryLog.id.desc()).limit(20).all()
+                        reads.add((time.perf_counter() - t0) * 1000)
+                    else:
+                        row = DiaryLog(user_id=user, text="오늘은 조금 피곤했다 " * 10, reply_short="s", reply_normal="n",
+                                       emotions=["피곤"], keywords=["피곤"], flags={}, latency_ms=1)
+                        db.add(row)
+                        db.commit()
+                        db.refresh(row)
+                        writes.add((time.perf_counter() - t0) * 1000)
+            except Exception as e:
+                with lock:
+                    errors["locked" if "locked" in str(e) else "other"] += 1
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    w, r = writes.snapshot(), reads.snapshot()
+    print(
+        f"{label:>16}: insert {w['count'] / args.seconds:7.0f}/s (p95 {w['p95']:6.1f}ms)  "
+        f"read {r['count'] / args.seconds:7.0f}/s (p95 {r['p95']:6.1f}ms)  "
+        f"locked {errors['locked']}  other-errors {errors['other']}"
+    )
+    engine.dispose()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--read-ratio", type=float, default=0.5)
+    ap.add_argument("--url", default=None, help="추가로 잴 DB URL (예: Postgres)")
+    args = ap.parse_args()
+
+    print(f"{args.seconds:.0f}s concurrency={args.concurrency} read-ratio={args.read_ratio}")
+    d = tempfile.mkdtemp()
+    run("sqlite-default", f"sqlite:///{d}/default.db", "default", args)
+    run("sqlite", f"sqlite:///{d}/tuned.db", None, args)
+    if args.url:
+        name = args.url.split(":", 1)[0]
+        run(f"{name}-default", args.url, "default", args)
+        run(name, args.url, None, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+월별 추이 (최근 12개월) 비교: 헤비 유저의 기록이 길수록 차이가 난다.
+
+- raw     : 예전 대시보드 방식. 기간의 diary_logs 행을 다 읽어 파이썬에서 집계
+- rollups : diary_daily_rollups 에서 (일수 × 지표 수) 행만 읽어 집계 (/diary/trends 와 같은 경로)
+
+저장 쪽 비용 (롤업 upsert 를 같은 트랜잭션에서 하는 것) 도 배치 저장 시간으로 함께 찍는다.
+
+    python scripts/bench_trends.py [--days 730] [--per-day 30] [--batch 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, time as dtime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import select  # noqa: E402
+
+import api.models as models  # noqa: E402
+from api.models import DiaryLog, SessionLocal, save_diary_logs  # noqa: E402
+from api.rollups import summarize, trend_buckets, trend_query  # noqa: E402
+
+EMOTIONS = ["sad", "happy", "tired", "angry", "calm", "anxious"]
+VALENCE = ["positive", "negative", "neutral"]
+START = datetime(2024, 1, 1)
+
+
+def rows_for(args, rnd):
+    for day in range(args.days):
+        for k in range(args.per_day):
+            yield dict(
+                user_id="heavy", preset_used="warm", mood_hint=None, text="일기 " * 50,
+                reply_short="s", reply_normal="n" * 300,
+                analysis={"valence": rnd.choice(VALENCE), "emotions": rnd.sample(EMOTIONS, 2), "keywords": [],
+                          "summary": "s"},
+                safety_flag=rnd.random() < 0.02, flags={}, latency_ms=rnd.randrange(50, 500),
+                ts=START + timedelta(days=day, minutes=k * 10),
+            )
+
+
+def seed(args):
+    rnd = random.Random(0)
+    add_rollups = models.add_rollups
+    timings = {"with rollups": 0.0, "without": 0.0}
+    batch, i = [], 0
+    with SessionLocal() as db:
+        for r in rows_for(args, rnd):
+            batch.append(r)
+            if len(batch) < args.batch:
+                continue
+            # 배치를 번갈아 롤업 켜고/끄고 저장해서 같은 조건으로 비교 (끈 배치는 뒤에서 rebuild 로 채움)
+            label = "with rollups" if i % 2 == 0 else "without"
+            if label == "without":
+                models.add_rollups = lambda db, rows: None
+            t0 = time.perf_counter()
+            save_diary_logs(db, batch)
+            timings[label] += time.perf_counter() - t0
+            models.add_rollups = add_rollups
+            batch, i = [], i + 1
+        save_diary_logs(db, batch)
+    n = i // 2 or 1
+    print(f"save_diary_logs per batch of {args.batch}: "
+          f"without {timings['without'] / n * 1000:.1f}ms  with rollups {timings['with rollups'] / n * 1000:.1f}ms")
+
+    from api.rollups import rebuild_rollups
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        logs = rebuild_rollups(db)
+        db.commit()
+    print(f"rebuild_rollups: {logs} logs in {time.perf_counter() - t0:.1f}s")
+
+
+def timed(fn, repeat=10):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=730)
+    ap.add_argument("--per-day", type=int, default=30)
+    ap.add_argument("--batch", type=int, default=200)
+    args = ap.parse_args()
+
+    seed(args)
+    until = (START + timedelta(days=args.days - 1)).date()
+    spans = trend_buckets("month", 12, until)
+
+    with SessionLocal() as db:
+        def raw():
+            rows = db.execute(
+                select(DiaryLog.ts, DiaryLog.valence, DiaryLog.emotions, DiaryLog.safety_flag, DiaryLog.latency_ms)
+                .where(DiaryLog.user_id == "heavy",
+                       DiaryLog.ts >= datetime.combine(spans[0][0], dtime.min),
+                       DiaryLog.ts < datetime.combine(spans[-1][1], dtime.min))
+            ).all()
+            out = [Counter() for _ in spans]
+            for r in rows:
+                day: date = r.ts.date()
+                c = out[next(k for k, (s, e) in enumerate(spans) if s <= day < e)]
+                c["logs"] += 1
+                c[f"valence:{r.valence}"] += 1
+                for e in r.emotions:
+                    c[f"emotion:{e}"] += 1
+            return [c["logs"] for c in out]
+
+        def rollups():
+            return [b["logs"] for b in summarize(db.execute(trend_query("heavy", spans[0][0], spans[-1][1])).all(), spans)]
+
+        t_raw, a = timed(raw)
+        t_roll, b = timed(rollups)
+    assert a == b
+    print(f"monthly trend, 12 buckets ({sum(b)} logs): raw {t_raw:8.2f}ms  rollups {t_roll:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+일별 롤업(diary_daily_rollups)을 diary_logs 에서 다시 집계한다.
+
+롤업을 처음 도입한 DB 의 백필, 또는 롤업이 로그와 어긋났을 때 (수동 수정 등).
+범위의 롤업을 지우고 다시 쌓는 것까지 한 트랜잭션이라 중간에 실패하면 그대로 남는다.
+
+    python scripts/rebuild_rollups.py [--user USER_ID] [--since 2026-01-01] [--chunk 5000]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.models import SessionLocal  # noqa: E402
+from api.rollups import rebuild_rollups  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--user", default=None, help="이 사용자만 (기본: 전체)")
+    ap.add_argument("--since", type=date.fromisoformat, default=None, help="이 날짜(UTC)부터만 (기본: 전체 기간)")
+    ap.add_argument("--chunk", type=int, default=5000, help="한 번에 읽을 로그 수")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        n = rebuild_rollups(db, user_id=args.user, since=args.since, chunk=args.chunk)
+        db.commit()
+    print(f"rebuilt rollups from {n} logs in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ import json
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from openai import OpenAI
+from diary_replier.llm_providers.registry import registry
 
 router = APIRouter(
     prefix="/chat-diary",
@@ -14,7 +14,7 @@ router = APIRouter(
 )
 
 # OPENAI_API_KEY는 .env + api/main.py에서 load_dotenv() 로 이미 로드된 상태라고 가정
-client = OpenAI()
+client = registry.openai()  # 공유 커넥션 풀
 
 
 EmotionCode = Literal["happy", "sad", "angry", "shy", "empty"]
@@ -1,7 +1,17 @@
 # tests/conftest.py
 import os
+import tempfile
 import pytest
 
+# 테스트 모듈이 import 시점에 api.main 을 불러도 되도록 (OpenAI 클라이언트 생성 + DB 파일 위치)
+os.environ.setdefault("OPENAI_API_KEY", "test-dummy-key")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test_app.db")
+os.environ.setdefault("REPLY_CACHE_PATH", f"{tempfile.mkdtemp()}/reply_cache.db")
+os.environ.setdefault("LLM_RATE_STORE", f"{tempfile.mkdtemp()}/llm_ratelimit.db")
+os.environ.setdefault("LOG_SPILL_PATH", f"{tempfile.mkdtemp()}/diary_logs.spill.jsonl")
+os.environ.setdefault("ARCHIVE_DIR", tempfile.mkdtemp())
+os.environ.setdefault("ARCHIVE_CACHE_DIR", tempfile.mkdtemp())
+
 # 세션 시작 시 가짜 키 (혹시 모를 import 대비)
 @pytest.fixture(autouse=True, scope="session")
 def fake_api_key():
@@ -34,3 +44,19 @@ def patch_get_llm(monkeypatch):
     # analyzer/generator의 get_llm을 더미로 교체
     monkeypatch.setattr("diary_replier.analyzer.get_llm", lambda: DummyLLMClient(), raising=True)
     monkeypatch.setattr("diary_replier.generator.get_llm", lambda: DummyLLMClient(), raising=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_result_caches():
+    # 분석/HF/답장 캐시가 테스트 사이에 섞이지 않도록
+    from diary_replier import analyzer, analyzer_hf, generator, metrics
+    from diary_replier.reply_cache import reply_cache
+    from api.preset_cache import preset_cache
+    analyzer.analysis_cache.clear()
+    analyzer_hf.prediction_cache.clear()
+    reply_cache.clear()
+    preset_cache.clear()
+    # 지연 분포(헤지 기준)와 서킷 상태도 테스트마다 초기화
+    metrics.reset()
+    generator.llm_breaker.reset()
+    yield
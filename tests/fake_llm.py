@@ -0,0 +1,300 @@
+# tests/fake_llm.py
+"""
+OpenAI 호환 가짜 LLM 서버 (테스트/벤치마크용, 네트워크 불필요).
+
+- POST /v1/responses         : generate_pair 가 쓰는 Responses API (stream=true 면 SSE 로 토큰 조각 전송)
+- POST /v1/chat/completions  : chat-to-diary / 그림일기 / generate_reply 용
+- GET  /v1/models            : 워밍업용
+
+지연(latency_ms 또는 호출별 latency_fn + 입력 토큰당 ms_per_input_token, 스트리밍은 첫 토큰까지 ttft_ms + 나머지를 조각마다 나눠서),
+에러 주입(fail_first / fail_status), 서버 쪽 분당 요청 한도(rpm_limit / rate_window_s, x-ratelimit-* 헤더 + 429)를 설정할 수 있고
+calls 에 받은 요청 바디가 쌓인다.
+
+    # 테스트: 네트워크 없이 클라이언트에 바로 붙이기
+    fake = FakeLLM(latency_ms=50)
+    client = fake.async_client()   # AsyncOpenAI
+    client = fake.sync_client()    # OpenAI
+
+    # 벤치마크: 실제 포트로 띄우기
+    python -m tests.fake_llm --port 8100 --latency-ms 300
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_PAIR = {
+    "reply_short": "오늘 하루 정말 고생 많았어. 잠깐 쉬어가도 괜찮아.",
+    "reply_normal": "요즘 많이 지쳤구나. 너무 완벽하려 하지 말고, 오늘은 작은 목표 하나만 정해서 해보자. "
+                    "쉬는 시간도 계획에 넣어두면 내일 조금 더 가볍게 시작할 수 있을 거야.",
+}
+
+BASE_URL = "http://fake-llm/v1"
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _encoded(agen):
+    async for s in agen:
+        yield s.encode("utf-8")
+
+
+class FakeLLM:
+    def __init__(
+        self,
+        *,
+        latency_ms: float = 0.0,
+        reply: Optional[Dict[str, str]] = None,
+        fail_first: int = 0,
+        fail_status: int = 429,
+        ttft_ms: Optional[float] = None,
+        chunk_chars: int = 4,
+        ms_per_input_token: float = 0.0,
+        latency_fn: Optional[Callable[[int], float]] = None,
+        rpm_limit: Optional[int] = None,
+        rate_window_s: float = 60.0,
+    ):
+        self.latency_ms = latency_ms
+        self.reply = reply or DEFAULT_PAIR
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.ttft_ms = latency_ms * 0.1 if ttft_ms is None else ttft_ms
+        self.chunk_chars = chunk_chars
+        self.ms_per_input_token = ms_per_input_token
+        self.latency_fn = latency_fn  # 호출 순번(0부터) → 지연 ms. 지정하면 latency_ms 대신 사용
+        self.rpm_limit = rpm_limit
+        self.rate_window_s = rate_window_s
+        self._rl_level = float(rpm_limit or 0)
+        self._rl_updated = time.monotonic()
+        self.rejected_429 = 0
+        self.calls: List[Dict[str, Any]] = []
+        self._seen_prefixes: set = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.app = self._build_app()
+
+    # -----------------------------
+    # 응답 생성 (경로별)
+    # -----------------------------
+    def _text(self) -> str:
+        return json.dumps(self.reply, ensure_ascii=False)
+
+    def _respond(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        n = len(self.calls)
+        if path.endswith("/models"):
+            return 200, {"object": "list", "data": [{"id": "fake", "object": "model", "created": 0, "owned_by": "me"}]}
+        if n <= self.fail_first:
+            return self.fail_status, {"error": {"message": "injected failure", "type": "rate_limit_error"}}
+        if path.endswith("/responses"):
+            return 200, {
+                "id": f"resp_{n}",
+                "object": "response",
+                "created_at": int(time.time()),
+                "model": body.get("model", "fake"),
+                "status": "completed",
+                "output": [{
+                    "type": "message",
+                    "id": f"msg_{n}",
+                    "status": "completed",
+                    "role": "assistant",
+                    "content": [{"type": "output_text", "text": self._text(), "annotations": []}],
+                }],
+                "usage": {
+                    "input_tokens": self._input_tokens(body),
+                    "input_tokens_details": {"cached_tokens": self._cached_tokens(body)},
+                    "output_tokens": 50,
+                    "output_tokens_details": {"reasoning_tokens": 0},
+                    "total_tokens": 150,
+                },
+            }
+        if path.endswith("/chat/completions"):
+            return 200, {
+                "id": f"chatcmpl_{n}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": self._text()},
+                }],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150},
+            }
+        return 404, {"error": {"message": f"unknown path {path}"}}
+
+    # 프로바이더 prompt cache 흉내: 처음 보는 system 프리픽스는 miss, 같은 프리픽스가 다시 오면 그만큼 cached
+    @staticmethod
+    def _tokens(s: str) -> int:
+        return max(1, len(s) // 2)
+
+    def _input_tokens(self, body: Dict[str, Any]) -> int:
+        msgs = body.get("input")
+        if not isinstance(msgs, list):
+            return 100
+        return sum(self._tokens(m.get("content", "")) for m in msgs)
+
+    def _cached_tokens(self, body: Dict[str, Any]) -> int:
+        msgs = body.get("input")
+        if not isinstance(msgs, list) or not msgs:
+            return 0
+        prefix = msgs[0].get("content", "")
+        if prefix in self._seen_prefixes:
+            return self._tokens(prefix)
+        self._seen_prefixes.add(prefix)
+        return 0
+
+    def _ratelimit(self) -> Tuple[bool, Dict[str, str]]:
+        """
+        rpm_limit 흉내 (OpenAI 처럼 연속 보충되는 버킷: rate_window_s 마다 rpm_limit 개).
+        (통과 여부, x-ratelimit-* 헤더)
+        """
+        if not self.rpm_limit:
+            return True, {}
+        now = time.monotonic()
+        rate = self.rpm_limit / self.rate_window_s
+        self._rl_level = min(self.rpm_limit, self._rl_level + (now - self._rl_updated) * rate)
+        self._rl_updated = now
+        ok = self._rl_level >= 1
+        if ok:
+            self._rl_level -= 1
+        else:
+            self.rejected_429 += 1
+        headers = {
+            "x-ratelimit-limit-requests": str(self.rpm_limit),
+            "x-ratelimit-remaining-requests": str(int(self._rl_level)),
+            "x-ratelimit-reset-requests": f"{(self.rpm_limit - self._rl_level) / rate:.3f}s",
+        }
+        if not ok:
+            headers["retry-after"] = f"{(1 - self._rl_level) / rate:.3f}"
+        return ok, headers
+
+    def _enter(self, path: str, body: Dict[str, Any]) -> None:
+        if not path.endswith("/models"):
+            self.calls.append(body)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _delay_ms(self, body: Dict[str, Any]) -> float:
+        base = self.latency_fn(len(self.calls) - 1) if self.latency_fn else self.latency_ms
+        if not self.ms_per_input_token:
+            return base
+        return base + self.ms_per_input_token * self._input_tokens(body)
+
+    async def handle_async(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        self._enter(path, body)
+        try:
+            delay = self._delay_ms(body)
+            if delay:
+                await asyncio.sleep(delay / 1000)
+            return self._respond(path, body)
+        finally:
+            self.in_flight -= 1
+
+    def handle_sync(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        self._enter(path, body)
+        try:
+            delay = self._delay_ms(body)
+            if delay:
+                time.sleep(delay / 1000)
+            return self._respond(path, body)
+        finally:
+            self.in_flight -= 1
+
+    async def stream_async(self, body: Dict[str, Any]):
+        """Responses API 스트리밍 이벤트(SSE 문자열)를 지연을 넣어가며 낸다."""
+        self._enter("/v1/responses", body)
+        try:
+            text = self._text()
+            pieces = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+            per_piece = max(0.0, self.latency_ms - self.ttft_ms) / 1000 / max(1, len(pieces))
+            ttft = self.ttft_ms + self._delay_ms(body) - self.latency_ms  # 입력이 길면 첫 토큰(prefill)이 늦다
+            if ttft:
+                await asyncio.sleep(ttft / 1000)
+            seq = 0
+            for i, piece in enumerate(pieces):
+                if i and per_piece:
+                    await asyncio.sleep(per_piece)
+                seq += 1
+                yield _sse_event("response.output_text.delta", {
+                    "type": "response.output_text.delta", "sequence_number": seq, "item_id": "msg_0",
+                    "output_index": 0, "content_index": 0, "delta": piece, "logprobs": [],
+                })
+            status, final = self._respond("/v1/responses", body)
+            yield _sse_event("response.completed", {
+                "type": "response.completed", "sequence_number": seq + 1, "response": final,
+            })
+        finally:
+            self.in_flight -= 1
+
+    # -----------------------------
+    # 붙이는 방법들
+    # -----------------------------
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.api_route("/v1/{path:path}", methods=["GET", "POST"])
+        async def any_route(path: str, request: Request):
+            body = await request.json() if request.method == "POST" else {}
+            if body.get("stream") and len(self.calls) >= self.fail_first:
+                return StreamingResponse(self.stream_async(body), media_type="text/event-stream")
+            status, data = await self.handle_async(f"/v1/{path}", body)
+            return JSONResponse(data, status_code=status)
+
+        return app
+
+    def async_transport(self) -> httpx.MockTransport:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content) if request.content else {}
+            ok, rl = self._ratelimit() if request.method == "POST" else (True, {})
+            if not ok:
+                return httpx.Response(429, headers=rl, json={"error": {"message": "rate limited", "type": "rate_limit_error"}})
+            if body.get("stream") and len(self.calls) >= self.fail_first:
+                return httpx.Response(200, headers={"content-type": "text/event-stream", **rl},
+                                      content=_encoded(self.stream_async(body)))
+            status, data = await self.handle_async(request.url.path, body)
+            return httpx.Response(status, headers=rl, json=data)
+        return httpx.MockTransport(handler)
+
+    def sync_transport(self) -> httpx.MockTransport:
+        def handler(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content) if request.content else {}
+            ok, rl = self._ratelimit() if request.method == "POST" else (True, {})
+            if not ok:
+                return httpx.Response(429, headers=rl, json={"error": {"message": "rate limited", "type": "rate_limit_error"}})
+            status, data = self.handle_sync(request.url.path, body)
+            return httpx.Response(status, headers=rl, json=data)
+        return httpx.MockTransport(handler)
+
+    def async_client(self, **kw):
+        from openai import AsyncOpenAI
+        kw.setdefault("max_retries", 0)
+        return AsyncOpenAI(api_key="fake", base_url=BASE_URL,
+                           http_client=httpx.AsyncClient(transport=self.async_transport()), **kw)
+
+    def sync_client(self, **kw):
+        from openai import OpenAI
+        kw.setdefault("max_retries", 0)
+        return OpenAI(api_key="fake", base_url=BASE_URL,
+                      http_client=httpx.Client(transport=self.sync_transport()), **kw)
+
+
+def main():
+    import uvicorn
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8100)
+    ap.add_argument("--latency-ms", type=float, default=300)
+    args = ap.parse_args()
+    uvicorn.run(FakeLLM(latency_ms=args.latency_ms).app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
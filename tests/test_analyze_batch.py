@@ -0,0 +1,40 @@
+from fastapi.testclient import TestClient
+
+from api.main import app
+from diary_replier.analyzer import analyze, analyze_many
+from diary_replier.guard import safety_scan
+
+client = TestClient(app)
+
+TEXTS = [
+    "오늘은 발표가 끝나서 뿌듯했어. 근데 좀 피곤해.",
+    "친구랑 싸워서 너무 화났고 속상했다",
+    "그냥 그랬던 하루",
+    "요즘 너무 힘들어서 죽고 싶다는 생각이 들어",
+    "AbC 칼 같은 말",
+]
+
+
+def test_analyze_many_matches_single():
+    assert analyze_many(TEXTS) == [analyze(t) for t in TEXTS]
+    assert analyze_many([]) == []
+
+
+def test_batch_endpoint():
+    url = app.url_path_for("analyze_batch")
+    body = {"diaries": [{"text": t, "user_id": f"u{i}"} for i, t in enumerate(TEXTS)]}
+    r = client.post(url, json=body)
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert len(results) == len(TEXTS)
+    for i, (t, res) in enumerate(zip(TEXTS, results)):
+        flag, flags = safety_scan(t)
+        assert res["user_id"] == f"u{i}"
+        assert res["safety_flag"] == flag
+        assert res["flags"] == flags
+        assert res["analysis"] == analyze(t).model_dump()
+
+
+def test_batch_endpoint_rejects_empty():
+    r = client.post(app.url_path_for("analyze_batch"), json={"diaries": []})
+    assert r.status_code == 422
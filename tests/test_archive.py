@@ -0,0 +1,156 @@
+import gzip
+import os
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import OperationalError
+
+from api.archive import ARCHIVE_DIR, archive_old_logs, archive_reader
+from api.main import app
+from api.models import DailyRollup, DiaryLog, LogArchive, SessionLocal, save_diary_logs
+from api.rollups import rebuild_rollups
+
+client = TestClient(app)
+
+# 다른 테스트 로그(2026년 / 지금)에 닿지 않게 2019~2020 년으로
+NOW = datetime(2020, 3, 1)
+
+
+def _log(ts, emotions=("sad",), safety_flag=False):
+    return dict(
+        user_id="arch-u1", preset_used="warm", mood_hint=None, text="일기", reply_short="s", reply_normal="n",
+        analysis={"valence": "negative", "emotions": list(emotions), "keywords": [], "summary": ts.isoformat()},
+        safety_flag=safety_flag, flags={}, latency_ms=10, ts=ts,
+    )
+
+
+def _ids(**params):
+    r = client.get(app.url_path_for("list_logs"), params={"user_id": "arch-u1", "fields": "id", **params})
+    assert r.status_code == 200, r.text
+    return [it["id"] for it in r.json()], r.headers.get("X-Next-Cursor")
+
+
+def _rollups():
+    with SessionLocal() as db:
+        rows = db.execute(select(DailyRollup.day, DailyRollup.metric, DailyRollup.value)
+                          .where(DailyRollup.user_id == "arch-u1")).all()
+    return set(rows)
+
+
+def test_archive_moves_old_months_and_reads_back():
+    with SessionLocal() as db:
+        save_diary_logs(db, [
+            _log(datetime(2019, 10, 3)), _log(datetime(2019, 10, 9), ("happy",)), _log(datetime(2019, 10, 30)),
+            _log(datetime(2019, 11, 2)), _log(datetime(2019, 11, 20), safety_flag=True),
+            _log(datetime(2020, 1, 15)),  # 보관 기준(2020-01-31)이 든 달이라 hot 에 남음
+        ])
+        all_ids = [i for i, in db.execute(select(DiaryLog.id).where(DiaryLog.user_id == "arch-u1")
+                                          .order_by(DiaryLog.id.desc()))]
+    rollups = _rollups()
+
+    with SessionLocal() as db:
+        assert [m.month for m in archive_old_logs(db, 30, now=NOW, dry_run=True)] == ["2019-10", "2019-11"]
+        done = archive_old_logs(db, 30, now=NOW)
+    assert [(m.month, m.rows, m.moved) for m in done] == [("2019-10", 3, 3), ("2019-11", 2, 2)]
+    path = os.path.join(ARCHIVE_DIR, "diary_logs_2019-10.db.gz")
+    with gzip.open(path) as f:
+        assert f.read(16) == b"SQLite format 3\x00"
+
+    # hot 에는 한 행만, archived=true 면 같은 커서로 보관분까지 이어진다
+    assert _ids()[0] == all_ids[:1]
+    seen, cursor = [], None
+    while True:
+        ids, cursor = _ids(archived="true", limit=2, **({"cursor": cursor} if cursor else {}))
+        seen += ids
+        if not cursor:
+            break
+    assert seen == all_ids
+    assert _ids(archived="true", emotion="happy")[0] == [all_ids[4]]
+    assert _ids(archived="true", flagged="true")[0] == [all_ids[1]]
+    assert _ids(archived="true", since="2019-11-01T00:00:00", until="2019-12-01T00:00:00")[0] == all_ids[1:3]
+
+    # 롤업은 그대로, 다시 집계해도 보관분까지 포함
+    assert _rollups() == rollups
+    with SessionLocal() as db:
+        assert rebuild_rollups(db, user_id="arch-u1") == 6
+        db.commit()
+    assert _rollups() == rollups
+
+
+def test_late_rows_merge_into_existing_archive_and_reader_is_read_only():
+    with SessionLocal() as db:
+        if db.get(LogArchive, "2019-10") is None:
+            archive_old_logs(db, 30, now=NOW)
+        before = db.get(LogArchive, "2019-10").rows
+        save_diary_logs(db, [_log(datetime(2019, 10, 12))])  # 스필 재삽입처럼 늦게 들어온 옛 달 행
+        done = archive_old_logs(db, 30, now=NOW)
+        assert [(m.month, m.rows, m.moved) for m in done] == [("2019-10", before + 1, 1)]
+        entry = db.get(LogArchive, "2019-10")
+        assert db.execute(select(DiaryLog.id).where(DiaryLog.ts < datetime(2019, 11, 1))).first() is None
+
+    rows = archive_reader.execute(entry.month, entry.path, select(DiaryLog.id))
+    assert len(rows) == before + 1
+    with pytest.raises(OperationalError):
+        archive_reader.execute(entry.month, entry.path, insert(DiaryLog).values(text="x", reply_short="s", reply_normal="n"))
+    with pytest.raises(OperationalError):
+        archive_reader.execute(entry.month, entry.path, delete(DiaryLog))
+
+
+def test_archived_paging_returns_late_rows_merged_into_archive():
+    def late_log(ts):
+        return dict(_log(ts), user_id="arch-u2")
+
+    with SessionLocal() as db:
+        save_diary_logs(db, [late_log(datetime(2019, 9, 5)), late_log(datetime(2020, 2, 10))])
+        archive_old_logs(db, 30, now=NOW)
+        save_diary_logs(db, [late_log(datetime(2019, 9, 20))])  # hot 의 2020-02 행보다 id 가 크다
+        archive_old_logs(db, 30, now=NOW)
+        all_ids = [i for i, in db.execute(select(DiaryLog.id).where(DiaryLog.user_id == "arch-u2"))]
+        assert len(all_ids) == 1  # 2020-02 만 hot 에
+
+    seen, cursor = [], None
+    while True:
+        params = {"user_id": "arch-u2", "fields": "id,ts", "archived": "true", "limit": 1}
+        r = client.get(app.url_path_for("list_logs"), params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200, r.text
+        seen += [(it["id"], it["ts"][:10]) for it in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert [ts for _, ts in seen] == ["2019-09-20", "2020-02-10", "2019-09-05"]
+    assert [i for i, _ in seen] == sorted((i for i, _ in seen), reverse=True)
+
+
+def test_reader_unpacks_once_per_process_file(tmp_path, monkeypatch):
+    import threading
+
+    from api import archive as archive_mod
+
+    with SessionLocal() as db:
+        if db.get(LogArchive, "2019-10") is None:
+            archive_old_logs(db, 30, now=NOW)
+        entry = db.get(LogArchive, "2019-10")
+    calls = []
+    real = archive_mod._gunzip
+
+    def counting(src, dst):
+        calls.append(dst)
+        real(src, dst)
+
+    monkeypatch.setattr(archive_mod, "_gunzip", counting)
+    reader = archive_mod.ArchiveReader(cache_dir=str(tmp_path))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        len(reader.execute(entry.month, entry.path, select(DiaryLog.id))))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [entry.rows] * 8
+    assert len(calls) == 1 and calls[0].endswith(".tmp")  # 임시 파일에 풀고 rename
+    mtime_ms = int(os.path.getmtime(os.path.join(ARCHIVE_DIR, entry.path)) * 1000)
+    assert os.listdir(tmp_path) == [f"diary_logs_2019-10.db.{mtime_ms}.{os.getpid()}"]  # 프로세스별 파일
+    reader.close()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.log_writer import log_writer
+from api.models import DiaryLog, SessionLocal, async_engine
+from api.preset_cache import preset_cache
+from diary_replier import generator, pipeline
+from diary_replier.generator import generate_pair_async
+from diary_replier.pipeline import run_pipeline_async
+from diary_replier.schemas import DiaryInput
+from tests.fake_llm import DEFAULT_PAIR, FakeLLM
+
+
+def test_generate_pair_async_parses_reply(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    rs, rn = asyncio.run(generate_pair_async("오늘 좀 힘들었어", "sad", "warm"))
+    assert (rs, rn) == (DEFAULT_PAIR["reply_short"], DEFAULT_PAIR["reply_normal"])
+
+
+def test_async_retry_backs_off_without_blocking(monkeypatch):
+    fake = FakeLLM(fail_first=2)
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        t = asyncio.create_task(ticker())
+        res = await generator._call_with_retry_async(
+            lambda: generator._async_client.responses.create(model="m", input="x"), base_wait=0.05
+        )
+        t.cancel()
+        return res, ticks
+
+    res, ticks = asyncio.run(main())
+    assert len(fake.calls) == 3
+    assert ticks > 5  # 백오프(0.05 + 0.1s) 동안에도 이벤트 루프가 돌았다
+    assert res.output_text
+
+
+def test_many_concurrent_replies_overlap(monkeypatch):
+    fake = FakeLLM(latency_ms=200)
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+
+    async def main():
+        return await asyncio.gather(*(
+            run_pipeline_async(DiaryInput(text=f"오늘은 피곤했어 {i}")) for i in range(100)
+        ))
+
+    t0 = time.perf_counter()
+    outs = asyncio.run(main())
+    elapsed = time.perf_counter() - t0
+    assert len(outs) == 100
+    assert fake.max_in_flight >= 50
+    assert elapsed < 3  # 직렬이면 20초
+
+
+def test_reply_route_is_async_and_logs(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    client = TestClient(app)
+    r = client.post(
+        app.url_path_for("make_reply"),
+        json={"text": "비동기 라우트: 오늘 발표 끝나서 뿌듯했어", "meta": {"preset": "coach"}},
+    )
+    assert r.status_code == 200
+    assert r.json()["reply_short"] == DEFAULT_PAIR["reply_short"]
+    log_writer.flush()
+    with SessionLocal() as db:
+        row = db.query(DiaryLog).filter_by(text="비동기 라우트: 오늘 발표 끝나서 뿌듯했어").order_by(DiaryLog.id.desc()).first()
+        assert row is not None and row.preset_used == "coach"
+
+
+def test_reply_does_not_hold_db_connection_during_generation(monkeypatch):
+    checked_out = []
+
+    async def slow_pair(text, mood, preset):
+        checked_out.append(async_engine.sync_engine.pool.checkedout())
+        await asyncio.sleep(0.05)
+        return DEFAULT_PAIR["reply_short"], DEFAULT_PAIR["reply_normal"]
+
+    monkeypatch.setattr(pipeline, "generate_pair_async", slow_pair)
+    preset_cache.clear()  # 프리셋 조회가 DB 까지 가게
+    client = TestClient(app)
+    for i in range(3):
+        r = client.post(
+            app.url_path_for("make_reply"),
+            json={"text": f"연결 반납 확인 {i}: 오늘은 조용한 하루였어"},
+            headers={"x_user_id": f"pool-u{i}"},
+        )
+        assert r.status_code == 200
+    assert checked_out == [0, 0, 0]
+
+
+def test_stream_does_not_hold_db_connection_while_streaming(monkeypatch):
+    checked_out = []
+
+    async def fake_stream(text, mood, preset):
+        checked_out.append(async_engine.sync_engine.pool.checkedout())
+        yield "done", DEFAULT_PAIR["reply_short"], DEFAULT_PAIR["reply_normal"]
+
+    monkeypatch.setattr(pipeline, "stream_pair_async", fake_stream)
+    preset_cache.clear()
+
+    async def main():
+        events = []
+        async for event, _ in pipeline.stream_pipeline_with_logging(
+            DiaryInput(text="스트림 연결 반납 확인: 산책을 했어"), user_id="pool-stream", preset_override=None
+        ):
+            events.append(event)
+        return events
+
+    events = asyncio.run(main())
+    assert events[0] == "meta" and events[-1] == "done"
+    assert checked_out == [0]
@@ -0,0 +1,69 @@
+import asyncio
+
+from api.log_writer import log_writer
+from api.models import AsyncSessionLocal, DiaryLog, SessionLocal
+from diary_replier import compaction, generator
+from diary_replier.compaction import compact, estimate_tokens
+from diary_replier.pipeline import run_pipeline_with_logging_async
+from diary_replier.schemas import DiaryInput
+from tests.fake_llm import FakeLLM
+
+FILLER = "오늘은 버스를 타고 학교에 갔다."
+LONG = (
+    "아침에 일찍 일어났다. "
+    + " ".join([FILLER] * 30)
+    + " 발표가 끝나서 정말 뿌듯했다. "
+    + " ".join([FILLER] * 30)
+    + " 저녁에는 일기를 썼다."
+)
+
+
+def test_estimate_tokens_korean_and_ascii():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("안녕하세요") == 5
+    assert estimate_tokens("hello world") == 3  # 영숫자 10자 → 4자당 1
+    assert estimate_tokens("좋아!") == 3
+
+
+def test_short_text_untouched():
+    c = compact("오늘은 뿌듯했다. 내일도 힘내자.", budget=100)
+    assert not c.compacted and c.text == "오늘은 뿌듯했다. 내일도 힘내자."
+
+
+def test_keeps_first_last_and_emotion_sentences():
+    c = compact(LONG, budget=60)
+    assert c.compacted
+    assert c.tokens_after < c.tokens_before and c.tokens_after <= 60
+    assert c.text.startswith("아침에 일찍 일어났다.")
+    assert c.text.endswith("저녁에는 일기를 썼다.")
+    assert "뿌듯했다" in c.text
+    assert "…" in c.text
+    assert FILLER not in c.text
+
+
+def test_risk_sentences_always_kept():
+    text = LONG.replace("발표가 끝나서 정말 뿌듯했다.", "가끔은 죽고 싶다는 생각이 든다.")
+    c = compact(text, budget=30)
+    assert "죽고 싶다" in c.text
+
+
+def test_pipeline_sends_compacted_text_but_logs_original(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    monkeypatch.setattr(compaction, "COMPACT_TOKEN_BUDGET", 60)
+    before = compaction.compaction_stats()["tokens_saved"]
+
+    async def main():
+        async with AsyncSessionLocal() as db:
+            await run_pipeline_with_logging_async(
+                DiaryInput(text=LONG), user_id="compact-u", preset_override=None, db=db
+            )
+
+    asyncio.run(main())
+    sent = fake.calls[0]["input"][-1]["content"]
+    assert FILLER not in sent and "뿌듯했다" in sent
+    log_writer.flush()
+    with SessionLocal() as db:
+        row = db.query(DiaryLog).filter_by(user_id="compact-u").one()
+    assert row.text == LONG
+    assert compaction.compaction_stats()["tokens_saved"] > before
@@ -0,0 +1,70 @@
+import re
+
+from diary_replier import analyzer_hf, lexicon
+from diary_replier.analyzer import analyze, _make_summary
+from diary_replier.features import TextFeatures
+from diary_replier.guard import safety_scan
+
+
+def _ref_summary(text):
+    sents = [s for s in re.split(r"[.!?？。…\n]+", text.strip()) if s]
+    if not sents:
+        return ""
+    head = sents[0][:120]
+    if len(sents) > 1:
+        tail = sents[-1][:120]
+        if head != tail:
+            return f"{head} … {tail}"
+    return head
+
+
+def test_sentences_match_old_split():
+    for text in ["  오늘은 좋았다. 근데 피곤해!!\n\n내일은?  ", "...", "", "한 문장", "a.b…c？d。e"]:
+        f = TextFeatures(text)
+        assert f.sentences == [s for s in re.split(r"[.!?？。…\n]+", text.strip()) if s]
+        assert [text[s:e] for s, e in f.sentence_spans] == f.sentences
+        assert _make_summary(text, f) == _ref_summary(text)
+
+
+def test_one_lexicon_scan_per_request(monkeypatch, sample_text):
+    m = lexicon.get_matcher()
+    calls = []
+    orig = m.scan
+    monkeypatch.setattr(m, "scan", lambda t: calls.append(t) or orig(t))
+
+    f = TextFeatures(sample_text)
+    res = analyze(sample_text, f)
+    flag, flags = safety_scan(sample_text, f)
+    assert len(calls) == 1
+    assert res == analyze(sample_text)
+    assert (flag, flags) == safety_scan(sample_text)
+
+
+def test_hf_prediction_memoized_on_features(monkeypatch):
+    calls = []
+
+    def fake_pipe(texts, **kw):
+        texts = texts if isinstance(texts, list) else [texts]
+        calls.extend(texts)
+        return [[{"label": "sadness", "score": 0.9}, {"label": "joy", "score": 0.1}] for _ in texts]
+
+    monkeypatch.setattr(analyzer_hf, "_pipe", fake_pipe)
+    f = TextFeatures("  많이 슬펐어  ")
+    assert analyzer_hf.predict_emotions(f.text, topk=2, features=f) == ["슬픔", "기쁨"]
+    assert analyzer_hf.predict_emotions(f.text, topk=2, features=f) == ["슬픔", "기쁨"]
+    assert calls == ["많이 슬펐어"]
+
+
+def test_hf_async_prediction_memoized_on_features(monkeypatch):
+    import asyncio
+
+    monkeypatch.setattr(analyzer_hf, "_pipe", lambda texts, **kw: [[{"label": "joy", "score": 1.0}] for _ in texts])
+    f = TextFeatures("  비동기로 기뻤어  ")
+    assert asyncio.run(analyzer_hf.predict_emotions_async(f.text, topk=1, features=f)) == ["기쁨"]
+
+    lookups, batched = [], []
+    get, acall = analyzer_hf.prediction_cache.get, analyzer_hf._batcher.acall
+    monkeypatch.setattr(analyzer_hf.prediction_cache, "get", lambda *a: lookups.append(a) or get(*a))
+    monkeypatch.setattr(analyzer_hf._batcher, "acall", lambda t: batched.append(t) or acall(t))
+    assert asyncio.run(analyzer_hf.predict_emotions_async(f.text, topk=1, features=f)) == ["기쁨"]
+    assert lookups == [] and batched == []
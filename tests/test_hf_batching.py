@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+
+from diary_replier import analyzer_hf
+from diary_replier.batching import MicroBatcher
+
+
+def _echo_batcher(calls, **kw):
+    def fn(items):
+        calls.append(list(items))
+        time.sleep(0.01)
+        return [f"out:{x}" for x in items]
+    return MicroBatcher(fn, **kw)
+
+
+def test_concurrent_calls_are_batched_and_routed():
+    calls = []
+    b = _echo_batcher(calls, max_batch=8, max_wait_ms=50)
+    results = {}
+
+    def worker(i):
+        results[i] = b(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: f"out:{i}" for i in range(8)}
+    assert sum(len(c) for c in calls) == 8
+    stats = b.stats()
+    assert stats["items"] == 8
+    assert stats["max_batch_size"] > 1
+    assert stats["avg_queue_wait_ms"] >= 0
+
+
+def test_max_batch_is_respected():
+    calls = []
+    b = _echo_batcher(calls, max_batch=3, max_wait_ms=50)
+    futs = [b.submit(i) for i in range(7)]
+    assert [f.result(timeout=2) for f in futs] == [f"out:{i}" for i in range(7)]
+    assert max(len(c) for c in calls) <= 3
+
+
+def test_async_callers():
+    calls = []
+    b = _echo_batcher(calls, max_batch=16, max_wait_ms=30)
+
+    async def main():
+        return await asyncio.gather(*(b.acall(i) for i in range(10)))
+
+    assert asyncio.run(main()) == [f"out:{i}" for i in range(10)]
+    assert b.stats()["batches"] < 10
+
+
+def test_errors_reach_every_caller():
+    def boom(items):
+        raise ValueError("model crashed")
+
+    b = MicroBatcher(boom, max_batch=4, max_wait_ms=20)
+    futs = [b.submit(i) for i in range(3)]
+    for f in futs:
+        try:
+            f.result(timeout=2)
+            assert False
+        except ValueError as e:
+            assert "crashed" in str(e)
+
+
+def test_predict_emotions_goes_through_batcher(monkeypatch):
+    seen = []
+
+    def fake_pipe(texts, **kw):
+        seen.append(len(texts))
+        return [[{"label": "joy", "score": 0.8}, {"label": "sad", "score": 0.2}] for _ in texts]
+
+    monkeypatch.setattr(analyzer_hf, "_pipe", fake_pipe)
+    out = []
+    threads = [threading.Thread(target=lambda i=i: out.append(analyzer_hf.predict_emotions(f"좋아 {i}", topk=1)))
+               for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert out == [["기쁨"]] * 5
+    assert sum(seen) == 5
+
+    res = asyncio.run(analyzer_hf.predict_emotions_async("좋아", topk=2))
+    assert res == ["기쁨", "슬픔"]
+
+
+def test_async_first_load_runs_off_the_event_loop(monkeypatch):
+    built_on = []
+
+    def slow_build(model, runtime):
+        built_on.append(threading.current_thread())
+        time.sleep(0.2)
+        return lambda texts, **kw: [[{"label": "joy", "score": 1.0}] for _ in texts]
+
+    monkeypatch.setattr(analyzer_hf, "_pipe", None)
+    monkeypatch.setattr(analyzer_hf, "_err", None)
+    monkeypatch.setattr(analyzer_hf, "_EMO_MODEL", "fake-model")
+    monkeypatch.setattr(analyzer_hf, "_build_pipe", slow_build)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        t = asyncio.create_task(ticker())
+        res = await asyncio.gather(*(analyzer_hf.predict_emotions_async(f"첫 로드 {i}", topk=1) for i in range(3)))
+        t.cancel()
+        return res, ticks
+
+    res, ticks = asyncio.run(main())
+    assert res == [["기쁨"]] * 3
+    assert len(built_on) == 1 and built_on[0] is not threading.main_thread()
+    assert ticks >= 10  # 로드(0.2s) 동안에도 루프가 돌았다
@@ -0,0 +1,58 @@
+from diary_replier import analyzer_hf
+
+
+class CharTokenizer:
+    """글자 1개 = 토큰 1개"""
+    def __call__(self, text, add_special_tokens=True):
+        return {"input_ids": list(text)}
+
+
+class FakePipe:
+    tokenizer = CharTokenizer()
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, **kw):
+        self.calls.append((list(texts), kw))
+        # '슬픈' 이 들어간 청크는 sadness, 아니면 joy 가 높게
+        return [
+            [{"label": "sadness", "score": 0.9}, {"label": "joy", "score": 0.1}] if "슬픈" in t
+            else [{"label": "joy", "score": 0.7}, {"label": "sadness", "score": 0.3}]
+            for t in texts
+        ]
+
+
+def test_short_text_is_one_chunk():
+    assert analyzer_hf._chunk_text("짧은 글.", CharTokenizer(), 32) == ["짧은 글."]
+
+
+def test_long_text_split_by_sentences_under_cap():
+    text = "가" * 10 + ". " + "나" * 10 + ". " + "다" * 10 + "."
+    chunks = analyzer_hf._chunk_text(text, CharTokenizer(), 24)
+    assert len(chunks) > 1
+    assert all(len(c) <= 22 for c in chunks)
+    assert "".join(chunks).replace(" ", "") == text.replace(".", "").replace(" ", "")
+
+
+def test_scores_are_averaged_across_chunks(monkeypatch):
+    pipe = FakePipe()
+    monkeypatch.setattr(analyzer_hf, "_pipe", pipe)
+    monkeypatch.setattr(analyzer_hf, "_EMO_MAX_TOKENS", 16)
+
+    text = "오늘은 슬픈 날이었다. " + "그래도 저녁은 맛있었고 친구도 만났다. " * 2
+    [scores] = analyzer_hf._run_batch([text])
+    by_label = {d["label"]: d["score"] for d in scores}
+    n_chunks = len(pipe.calls[0][0])
+    assert n_chunks == 3
+    assert abs(by_label["sadness"] - (0.9 + 0.3 + 0.3) / 3) < 1e-9
+    assert pipe.calls[0][1]["truncation"] is True
+    assert pipe.calls[0][1]["max_length"] == 16
+
+
+def test_batch_keeps_inputs_separate(monkeypatch):
+    monkeypatch.setattr(analyzer_hf, "_pipe", FakePipe())
+    monkeypatch.setattr(analyzer_hf, "_EMO_MAX_TOKENS", 16)
+    out = analyzer_hf._run_batch(["슬픈 하루.", "좋은 하루."])
+    assert out[0][0]["label"] == "sadness"
+    assert out[1][0]["label"] == "joy"
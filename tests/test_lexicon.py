@@ -0,0 +1,75 @@
+import random
+
+from diary_replier import analyzer, guard, lexicon
+from diary_replier.analyzer import EMO_CODE_LEX, POS_WORDS, NEG_WORDS, analyze
+from diary_replier.guard import RISK_PATTERNS, safety_scan
+from diary_replier.lexicon import LexiconMatcher
+
+
+# 컴파일 전 구현 (기준값)
+def _ref_emotions(text):
+    return [code for code, kws in EMO_CODE_LEX.items() if any(k in text for k in kws)][:3]
+
+
+def _ref_counts(text):
+    return sum(text.count(w) for w in POS_WORDS), sum(text.count(w) for w in NEG_WORDS)
+
+
+def _ref_safety(text):
+    low = text.lower()
+    flags = {k: any(t in low for t in toks) for k, toks in RISK_PATTERNS.items()}
+    return any(flags.values()), flags
+
+
+def _random_texts(n=300, seed=7):
+    rnd = random.Random(seed)
+    words = [w for ws in EMO_CODE_LEX.values() for w in ws] + POS_WORDS + NEG_WORDS
+    words += [w for ws in RISK_PATTERNS.values() for w in ws]
+    filler = ["오늘", "그냥", "학교", "회사", " ", ".", "\n", "ABC", "하", "기", "좋", "!"]
+    for _ in range(n):
+        parts = [rnd.choice(words if rnd.random() < 0.3 else filler) for _ in range(rnd.randint(0, 60))]
+        yield "".join(parts)
+
+
+def test_matches_reference_implementation():
+    for text in _random_texts():
+        hits = lexicon.scan(text)
+        assert hits.labels("emo")[:3] == _ref_emotions(text)
+        assert (hits.count("pos"), hits.count("neg")) == _ref_counts(text)
+        assert safety_scan(text) == _ref_safety(text)
+
+
+def test_count_is_non_overlapping_like_str_count():
+    m = LexiconMatcher({"g": {"x": ["aa", "aa", "a"]}})
+    text = "aaaaa"
+    assert m.scan(text).count("g") == text.count("aa") * 2 + text.count("a")
+
+
+def test_casefold_group_uses_lowered_text():
+    m = LexiconMatcher({"risk": {"k": ["kill"]}, "plain": {"p": ["Kill"]}}, casefold=["risk"])
+    hits = m.scan("I will KILL")
+    assert hits.any("risk", "k") is True
+    assert hits.any("plain", "p") is False
+
+
+def test_reload_picks_up_new_words(monkeypatch):
+    text = "오늘은 완전 럭키비키한 날"
+    assert analyze(text).valence == "neutral"
+    monkeypatch.setattr(analyzer, "POS_WORDS", POS_WORDS + ["럭키비키"])
+    lexicon.reload()
+    try:
+        assert analyze(text).valence == "positive"
+    finally:
+        monkeypatch.undo()
+        lexicon.reload()
+
+
+def test_disk_cache_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(lexicon, "_CACHE_DIR", str(tmp_path))
+    built = lexicon._load_or_build(lexicon.default_lexicons())
+    assert list(tmp_path.glob("lexicon-*.pkl"))
+    loaded = lexicon._load_or_build(lexicon.default_lexicons())
+    assert loaded.version == built.version
+    text = "너무 슬프고 외롭고 자해 생각도 났어"
+    assert loaded.scan(text).labels("emo") == built.scan(text).labels("emo")
+    assert guard.safety_scan(text)[0] is True
@@ -0,0 +1,61 @@
+import pytest
+
+from diary_replier import generator
+from diary_replier.llm_providers.base import BaseLLMClient
+from diary_replier.llm_providers.openai_client import OpenAILLMClient
+from diary_replier.llm_providers.registry import LLMRegistry, registry
+from picture_diary import service
+from src.routers import chat_to_diary
+from tests.fake_llm import FakeLLM
+
+
+def test_all_paths_share_one_pool():
+    assert generator._client is chat_to_diary.client is service.client is registry.openai()
+    assert registry.openai()._client is registry.http()
+    assert generator._async_client._client is registry.async_http()
+
+
+def test_pool_limits_from_config():
+    pool = registry.http()._transport.inner._pool  # 제한기 transport 안쪽이 실제 풀
+    assert pool._max_connections == registry.pool_stats()["max_connections"]
+    assert registry.http().timeout.connect == registry.pool_stats()["connect_timeout"]
+
+
+def test_provider_registry():
+    reg = LLMRegistry()
+    reg._openai = FakeLLM().sync_client()
+    reg.register("openai", lambda r: OpenAILLMClient(client=r.openai()))
+    llm = reg.get_provider("openai")
+    assert isinstance(llm, BaseLLMClient)
+    assert reg.get_provider("openai") is llm
+    assert "reply_short" in llm.call("sys", "user")
+    with pytest.raises(KeyError):
+        reg.get_provider("nope")
+
+
+def test_preconnect_opens_parallel_connections():
+    fake = FakeLLM(latency_ms=50)
+    reg = LLMRegistry()
+    reg._openai = fake.sync_client()
+    assert reg.preconnect(3) == 3
+    assert fake.max_in_flight == 3
+
+
+def test_app_shutdown_keeps_shared_clients_usable():
+    from fastapi.testclient import TestClient
+
+    from api.main import app
+
+    with TestClient(app):
+        pass
+    assert not generator._client._client.is_closed
+    assert not generator._async_client._client.is_closed
+    assert not chat_to_diary.client._client.is_closed
+
+
+def test_close_resets_pools():
+    reg = LLMRegistry()
+    http = reg.http()
+    reg.close()
+    assert http.is_closed
+    assert reg.http() is not http and not reg.http().is_closed
@@ -0,0 +1,170 @@
+import os
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from api import log_writer as log_writer_mod
+from api.log_writer import LogWriter
+from api.models import DiaryLog, SessionLocal
+
+
+def _row(text, **kw):
+    row = dict(
+        user_id="lw-u", preset_used="warm", mood_hint=None, text=text,
+        reply_short="s", reply_normal="n",
+        analysis={"valence": "neutral", "emotions": ["피곤"], "keywords": [], "summary": "x"},
+        safety_flag=False, flags={}, latency_ms=10,
+    )
+    row.update(kw)
+    return row
+
+
+def _count(prefix):
+    with SessionLocal() as db:
+        return db.query(DiaryLog).filter(DiaryLog.text.like(f"{prefix}%")).count()
+
+
+def test_batches_by_size_and_flush(tmp_path):
+    w = LogWriter(batch_size=10, flush_ms=1000, spill_path=str(tmp_path / "spill.jsonl"))
+    for i in range(25):
+        w.submit(_row(f"lw-size {i}"))
+    assert w.flush()
+    assert _count("lw-size") == 25
+    s = w.stats()
+    assert s["written"] == 25 and s["batches"] == 3 and s["avg_batch"] > 8
+    w.close()
+
+
+def test_batches_by_time_without_flush(tmp_path):
+    w = LogWriter(batch_size=100, flush_ms=30, spill_path=str(tmp_path / "spill.jsonl"))
+    for i in range(3):
+        w.submit(_row(f"lw-time {i}"))
+    deadline = time.time() + 2
+    while _count("lw-time") < 3 and time.time() < deadline:
+        time.sleep(0.02)
+    assert _count("lw-time") == 3
+    w.close()
+
+
+def test_submit_does_not_wait_for_db(tmp_path, monkeypatch):
+    real = log_writer_mod.save_diary_logs
+
+    def slow(db, rows):
+        time.sleep(0.2)
+        return real(db, rows)
+
+    monkeypatch.setattr(log_writer_mod, "save_diary_logs", slow)
+    w = LogWriter(batch_size=50, flush_ms=10, spill_path=str(tmp_path / "spill.jsonl"))
+    t0 = time.perf_counter()
+    for i in range(100):
+        w.submit(_row(f"lw-fast {i}"))
+    assert time.perf_counter() - t0 < 0.1
+    w.flush()
+    assert _count("lw-fast") == 100
+    w.close()
+
+
+def test_spills_when_db_down_and_replays_after_recovery(tmp_path, monkeypatch):
+    spill = tmp_path / "spill.jsonl"
+    real = log_writer_mod.save_diary_logs
+    down = {"on": True}
+
+    def flaky(db, rows):
+        if down["on"]:
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return real(db, rows)
+
+    monkeypatch.setattr(log_writer_mod, "save_diary_logs", flaky)
+    w = LogWriter(batch_size=10, flush_ms=10, spill_path=str(spill))
+    for i in range(5):
+        w.submit(_row(f"lw-spill {i}"))
+    w.flush()
+    assert _count("lw-spill") == 0
+    assert len(spill.read_text(encoding="utf-8").splitlines()) == 5
+    assert w.stats()["spilled"] == 5
+
+    down["on"] = False
+    w.submit(_row("lw-spill after"))
+    w.flush()
+    assert _count("lw-spill") == 6
+    assert not os.path.exists(spill)
+    assert w.stats()["replayed"] == 5
+    w.close()
+
+
+def test_full_queue_spills_instead_of_blocking(tmp_path, monkeypatch):
+    real = log_writer_mod.save_diary_logs
+
+    def slow(db, rows):
+        time.sleep(0.1)
+        return real(db, rows)
+
+    monkeypatch.setattr(log_writer_mod, "save_diary_logs", slow)
+    w = LogWriter(max_queue=2, batch_size=1, flush_ms=0, spill_path=str(tmp_path / "spill.jsonl"))
+    for i in range(10):
+        w.submit(_row(f"lw-full {i}"))
+    assert w.stats()["overflow"] > 0
+    w.flush()
+    w.submit(_row("lw-full last"))  # 성공하면 스필분도 다시 넣는다
+    w.flush()
+    assert _count("lw-full") == 11
+    w.close()
+
+
+def test_close_drains_queue(tmp_path):
+    w = LogWriter(batch_size=1000, flush_ms=5000, spill_path=str(tmp_path / "spill.jsonl"))
+    for i in range(7):
+        w.submit(_row(f"lw-close {i}"))
+    w.close()
+    assert _count("lw-close") == 7
+
+
+def test_corrupt_spill_line_moves_to_bad_and_worker_survives(tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    good = log_writer_mod._dump_row(dict(_row("lw-bad spilled"), ts=log_writer_mod.datetime.utcnow()))
+    spill.write_text(good + "\n" + '{"user_id": "lw-u", "text": "lw-bad trunc', encoding="utf-8")
+    w = LogWriter(batch_size=10, flush_ms=10, spill_path=str(spill))
+    for i in range(3):
+        w.submit(_row(f"lw-bad {i}"))
+    assert w.flush()
+    assert _count("lw-bad") == 4
+    assert (tmp_path / "spill.jsonl.bad").read_text(encoding="utf-8").startswith('{"user_id": "lw-u"')
+    assert w.stats()["bad_lines"] == 1
+    assert not os.path.exists(str(spill) + ".replay")
+    w.close()
+
+
+def test_overflow_is_bounded_when_db_is_stuck_and_spill_is_off(monkeypatch):
+    import threading
+
+    stuck = threading.Event()
+
+    def hang(*a, **kw):
+        stuck.wait(2)
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(log_writer_mod, "save_diary_logs", hang)
+    monkeypatch.setattr(log_writer_mod, "save_diary_log", hang)
+    w = LogWriter(max_queue=2, batch_size=1, flush_ms=0, spill_path=None)
+    for i in range(50):
+        w.submit(_row(f"lw-bound {i}"))
+    assert w._overflow_pending <= 2
+    assert w.stats()["dropped"] >= 40
+    stuck.set()
+    w.close()
+
+
+def test_replay_moves_rejected_rows_to_bad(tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    now = log_writer_mod.datetime.utcnow()
+    lines = [log_writer_mod._dump_row(dict(_row(t), ts=now)) for t in ("lw-rej ok1", "lw-rej ok2")]
+    lines.insert(1, log_writer_mod._dump_row(dict(_row("lw-rej bad"), ts=now, reply_short=None)))  # NOT NULL 위반
+    spill.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    w = LogWriter(batch_size=10, flush_ms=10, spill_path=str(spill))
+    w.submit(_row("lw-rej new"))
+    assert w.flush()
+    assert _count("lw-rej") == 3
+    assert "lw-rej bad" in (tmp_path / "spill.jsonl.bad").read_text(encoding="utf-8")
+    assert not os.path.exists(str(spill) + ".replay")
+    assert w.stats()["replayed"] == 2
+    w.close()
@@ -0,0 +1,12 @@
+from diary_replier.metrics import LatencyWindow
+
+
+def test_percentiles_over_recent_window():
+    w = LatencyWindow(maxlen=100)
+    assert w.percentile(95) is None
+    for v in range(1, 201):  # 최근 100개(101~200)만 남는다
+        w.add(float(v))
+    assert w.percentile(50) == 150.0
+    assert w.percentile(95) == 195.0
+    snap = w.snapshot()
+    assert snap["count"] == 200 and snap["window"] == 100 and snap["max"] == 200.0
@@ -0,0 +1,136 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from api.log_writer import log_writer
+from api.main import app
+from api.models import AsyncSessionLocal, DiaryLog, SessionLocal, get_user_settings, get_user_settings_async
+from api.preset_cache import PresetCache, UserSettings, preset_cache
+from diary_replier import generator
+from diary_replier.pipeline import run_pipeline_with_logging_async
+from diary_replier.schemas import DiaryInput
+from tests.fake_llm import FakeLLM
+
+
+def _counting_loader(calls):
+    def loader(db, user_id):
+        calls.append(user_id)
+        return get_user_settings(db, user_id)
+    return loader
+
+
+def _counting_aloader(calls):
+    async def aloader(db, user_id):
+        calls.append(user_id)
+        return await get_user_settings_async(db, user_id)
+    return aloader
+
+
+def _set_preset(user_id, preset, mood_default=None):
+    r = TestClient(app).post(
+        app.url_path_for("set_preset"),
+        json={"user_id": user_id, "preset": preset, "mood_default": mood_default},
+    )
+    assert r.status_code == 200
+
+
+def test_hits_after_first_load_including_missing_users(monkeypatch):
+    _set_preset("pc-u1", "coach", "happy")
+    preset_cache.clear()
+    calls = []
+    monkeypatch.setattr(preset_cache, "loader", _counting_loader(calls))
+    hits = preset_cache.stats()["hits"]
+    with SessionLocal() as db:
+        for _ in range(3):
+            s = preset_cache.get(db, "pc-u1")
+            assert (s.preset, s.mood_default) == ("coach", "happy")
+            assert preset_cache.get(db, "pc-nobody") is None
+    assert calls == ["pc-u1", "pc-nobody"]
+    assert preset_cache.stats()["hits"] - hits == 4
+
+
+def test_post_preset_writes_through(monkeypatch):
+    _set_preset("pc-u2", "warm")
+    preset_cache.clear()
+    calls = []
+    monkeypatch.setattr(preset_cache, "loader", _counting_loader(calls))
+    with SessionLocal() as db:
+        assert preset_cache.get(db, "pc-u2").preset == "warm"
+        _set_preset("pc-u2", "short", "sad")
+        s = preset_cache.get(db, "pc-u2")
+    assert (s.preset, s.mood_default) == ("short", "sad")
+    assert calls == ["pc-u2"]  # 새 값은 저장 시점에 들어가 DB 를 다시 읽지 않음
+
+
+def test_other_worker_invalidates_via_version_counter():
+    # 다른 워커의 캐시를 흉내 낸다 (버전은 매번 확인)
+    other = PresetCache(ttl=300, version_check_s=0)
+    _set_preset("pc-u3", "warm")
+    with SessionLocal() as db:
+        assert other.get(db, "pc-u3").preset == "warm"
+    _set_preset("pc-u3", "coach")  # 이 워커(preset_cache)에서 변경
+    with SessionLocal() as db:
+        assert other.get(db, "pc-u3").preset == "coach"
+    assert other.stats()["invalidations"] == 1
+
+
+def test_ttl_and_size_bound():
+    calls = []
+    cache = PresetCache(ttl=0.05, maxsize=2, version_check_s=60, loader=_counting_loader(calls))
+    with SessionLocal() as db:
+        cache.get(db, "pc-a")
+        cache.get(db, "pc-a")
+        time.sleep(0.06)
+        cache.get(db, "pc-a")
+        cache.get(db, "pc-b")
+        cache.get(db, "pc-c")
+    assert calls == ["pc-a", "pc-a", "pc-b", "pc-c"]
+    assert cache.stats()["size"] == 2 and cache.stats()["evictions"] == 1
+
+
+def test_pipeline_uses_cached_mood_default(monkeypatch):
+    monkeypatch.setattr(generator, "_async_client", FakeLLM().async_client())
+    _set_preset("pc-u4", "coach", "shy")
+    calls = []
+    monkeypatch.setattr(preset_cache, "aloader", _counting_aloader(calls))
+    text = "프리셋 캐시: 점심에 국수를 먹었다"
+
+    async def main():
+        for i in range(2):
+            async with AsyncSessionLocal() as db:
+                await run_pipeline_with_logging_async(
+                    DiaryInput(text=f"{text} {i}"), user_id="pc-u4", preset_override=None, db=db
+                )
+
+    asyncio.run(main())
+    log_writer.flush()
+    with SessionLocal() as db:
+        rows = db.query(DiaryLog).filter(DiaryLog.text.like(f"{text}%")).all()
+    assert len(rows) == 2
+    assert {(r.preset_used, r.mood_hint) for r in rows} == {("coach", "shy")}
+    assert calls == []  # POST 때 넣은 값으로 두 번 다 캐시 hit
+
+
+def test_write_during_miss_is_not_overwritten_by_stale_load():
+    cache = PresetCache(ttl=300, version_check_s=60)
+    cache._checked_at = time.monotonic()  # 버전 확인 건너뜀
+    loading, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_loader(db, user_id):
+        loading.set()
+        await release.wait()
+        return ("warm", None)  # 저장 전에 읽은 옛 값
+
+    cache.aloader = slow_loader
+
+    async def main():
+        miss = asyncio.create_task(cache.aget(None, "pc-race"))
+        await loading.wait()
+        cache.written("pc-race", UserSettings("coach", "happy"), 1)  # POST /user/preset
+        release.set()
+        assert (await miss).preset == "warm"
+        return await cache.aget(None, "pc-race")
+
+    assert asyncio.run(main()) == UserSettings("coach", "happy")
+    assert cache.stats()["stale_skips"] == 1
@@ -0,0 +1,52 @@
+import asyncio
+
+from api.log_writer import log_writer
+from api.models import AsyncSessionLocal, DiaryLog, SessionLocal
+from diary_replier import generator, prompt
+from diary_replier.pipeline import run_pipeline_with_logging_async
+from diary_replier.schemas import DiaryInput
+from tests.fake_llm import FakeLLM
+
+
+def test_static_prefix_first_diary_last():
+    a = prompt.build_messages("첫 번째 일기", "피곤", "coach")
+    b = prompt.build_messages("완전히 다른 두 번째 일기", None, "coach")
+    assert a[0] == b[0]  # 프리셋이 같으면 system 프리픽스가 바이트 단위로 같다
+    system = a[0]["content"]
+    assert system.startswith(prompt.SYSTEM_BASE)
+    assert prompt.PRESETS["coach"] in system
+    assert prompt.EXAMPLES[0]["reply_normal"] in system  # 예시 블록이 빠지지 않는다
+    assert '"reply_short"' in system
+    assert "첫 번째 일기" not in system
+    assert a[1]["content"].endswith("첫 번째 일기")
+
+
+def test_prefix_precomputed_per_preset_and_unknown_falls_back():
+    assert set(prompt.STATIC_PREFIX) == set(prompt.PRESETS)
+    assert prompt.build_messages("x", None, "없는프리셋")[0]["content"] is prompt.STATIC_PREFIX["warm"]
+    assert prompt.prompt_cache_key("없는프리셋") == prompt.prompt_cache_key("warm")
+
+
+def test_single_prompt_builder_in_generator():
+    assert not hasattr(generator, "_build_prompt_json")
+
+
+def test_usage_recorded_per_request(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+
+    async def main():
+        async with AsyncSessionLocal() as db:
+            for t in ("토큰 기록 첫 일기", "토큰 기록 두 번째 일기"):
+                await run_pipeline_with_logging_async(
+                    DiaryInput(text=t, meta={"preset": "short"}), user_id="tok-u", preset_override=None, db=db
+                )
+
+    asyncio.run(main())
+    assert fake.calls[0]["prompt_cache_key"] == prompt.prompt_cache_key("short")
+    log_writer.flush()
+    with SessionLocal() as db:
+        rows = db.query(DiaryLog).filter_by(user_id="tok-u").order_by(DiaryLog.id).all()
+    assert [r.input_tokens > 0 for r in rows] == [True, True]
+    assert rows[0].cached_tokens == 0 and rows[1].cached_tokens > 0  # 두 번째는 같은 프리픽스 재사용
+    assert generator.usage_stats()["cached_tokens"] >= rows[1].cached_tokens
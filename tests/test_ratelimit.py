@@ -0,0 +1,196 @@
+import asyncio
+import json
+import sqlite3
+import time
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, OpenAI, RateLimitError
+
+from diary_replier.llm_providers.ratelimit import (
+    LOCAL_LIMIT_HEADER,
+    REQUESTS,
+    TOKENS,
+    AsyncRateLimitedTransport,
+    BucketStore,
+    ConcurrencyWindow,
+    OutboundLimiter,
+    RateLimitedTransport,
+    estimate_request_tokens,
+    parse_duration,
+)
+from tests.fake_llm import BASE_URL, FakeLLM
+
+
+def _async_client(fake: FakeLLM, limiter: OutboundLimiter) -> AsyncOpenAI:
+    transport = AsyncRateLimitedTransport(fake.async_transport(), limiter)
+    return AsyncOpenAI(api_key="fake", base_url=BASE_URL, max_retries=0,
+                       http_client=httpx.AsyncClient(transport=transport))
+
+
+async def _burst(client: AsyncOpenAI, n: int):
+    async def one(i):
+        try:
+            await client.responses.create(model="m", input=f"일기 {i}")
+            return True
+        except RateLimitError:
+            return False
+    return await asyncio.gather(*(one(i) for i in range(n)))
+
+
+def test_parse_duration():
+    assert parse_duration("1s") == 1.0
+    assert parse_duration("6m0s") == 360.0
+    assert parse_duration("20ms") == 0.02
+    assert parse_duration("1.5") == 1.5
+    assert parse_duration("") is None
+
+
+def test_estimate_request_tokens_counts_text_and_output_reserve():
+    body = {"model": "m", "max_output_tokens": 100,
+            "input": [{"role": "system", "content": "abcd" * 10}, {"role": "user", "content": "가나다"}]}
+    assert estimate_request_tokens(json.dumps(body).encode()) == 10 + 3 + 100
+
+
+def test_buckets_are_shared_through_the_store_file(tmp_path):
+    # 워커 프로세스 두 개 = 같은 파일을 여는 저장소 두 개
+    path = str(tmp_path / "rl.db")
+    a, b = BucketStore(path, window=1.0), BucketStore(path, window=1.0)
+    a.configure(REQUESTS, 4)
+    assert a.take({REQUESTS: 3}, max_wait=5) == 0
+    wait = b.take({REQUESTS: 3}, max_wait=5)
+    assert 0.4 < wait <= 0.5  # 2개 빚 → 0.5초
+    assert a.take({REQUESTS: 10}, max_wait=0.1) is None  # 너무 오래 기다려야 하면 빼지 않는다
+
+
+def test_burst_queues_instead_of_cascading_429(tmp_path):
+    fake = FakeLLM(rpm_limit=6, rate_window_s=1.0)
+    limiter = OutboundLimiter(BucketStore(str(tmp_path / "rl.db"), window=1.0), rpm=5, tpm=0)
+
+    t0 = time.perf_counter()
+    oks = asyncio.run(_burst(_async_client(fake, limiter), 15))
+    elapsed = time.perf_counter() - t0
+    assert all(oks)
+    assert fake.rejected_429 == 0
+    assert elapsed >= 1.5  # 5개 즉시 + 10개를 초당 5개로
+    assert limiter.stats()["queued"] == 10
+
+
+def test_burst_without_limiter_gets_429s():
+    fake = FakeLLM(rpm_limit=6, rate_window_s=1.0)
+    client = fake.async_client()
+    oks = asyncio.run(_burst(client, 15))
+    assert oks.count(False) == 9 and fake.rejected_429 == 9
+
+
+def test_learns_limit_from_headers(tmp_path):
+    fake = FakeLLM(rpm_limit=4, rate_window_s=1.0)
+    limiter = OutboundLimiter(BucketStore(str(tmp_path / "rl.db"), window=1.0), rpm=0, tpm=0)
+    client = _async_client(fake, limiter)
+
+    async def main():
+        await client.responses.create(model="m", input="첫 호출로 한도 학습")
+        return await _burst(client, 8)
+
+    assert all(asyncio.run(main()))
+    assert fake.rejected_429 == 0
+    assert limiter.stats()["buckets"][REQUESTS]["limit_per_window"] == 4
+    assert TOKENS not in limiter.stats()["buckets"]  # 토큰 헤더가 없으면 토큰 버킷은 없다
+
+
+def test_wait_too_long_returns_local_429(tmp_path):
+    fake = FakeLLM()
+    limiter = OutboundLimiter(BucketStore(str(tmp_path / "rl.db")), rpm=1, tpm=0, max_wait=0.1)
+    client = OpenAI(api_key="fake", base_url=BASE_URL, max_retries=0,
+                    http_client=httpx.Client(transport=RateLimitedTransport(fake.sync_transport(), limiter)))
+    client.responses.create(model="m", input="하나")
+    try:
+        client.responses.create(model="m", input="둘")
+        assert False, "로컬 429 여야 한다"
+    except RateLimitError as e:
+        assert e.response.headers.get(LOCAL_LIMIT_HEADER) == "1"
+    assert len(fake.calls) == 1
+    assert limiter.window.in_flight == 0  # 성공 응답도 슬롯을 돌려줬다
+
+
+def test_aimd_window_halves_on_429_and_grows_on_success():
+    w = ConcurrencyWindow(max_limit=8, min_limit=1)
+    assert w.acquire(0)
+    w.release(overloaded=True)
+    assert w.limit == 4
+    for _ in range(8):
+        w.acquire(0)
+        w.release(success=True)
+    assert 5 < w.limit < 6
+    for _ in range(10):
+        w.acquire(0)
+        w.release(overloaded=True)
+    assert w.limit == 1
+
+
+def test_window_caps_in_flight_async():
+    fake = FakeLLM(latency_ms=50)
+    limiter = OutboundLimiter(BucketStore(None), rpm=0, tpm=0, window=ConcurrencyWindow(max_limit=3, min_limit=1))
+    oks = asyncio.run(_burst(_async_client(fake, limiter), 12))
+    assert all(oks)
+    assert fake.max_in_flight == 3
+    assert limiter.window.in_flight == 0
+
+
+def test_window_timeout_refunds_reserved_tokens():
+    limiter = OutboundLimiter(BucketStore(None), rpm=10, tpm=0, max_wait=0.05,
+                              window=ConcurrencyWindow(max_limit=1, min_limit=1))
+    request = httpx.Request("POST", BASE_URL + "/responses", json={"input": "일기"})
+    assert limiter.window.acquire(0)  # 창을 다른 호출이 잡고 있다
+
+    async def run():
+        assert not await limiter.aacquire(request)
+        task = asyncio.create_task(limiter.aacquire(request))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0.05)  # 취소 쪽 되돌림은 스레드에서
+
+    asyncio.run(run())
+    assert limiter.refunded == 2
+    assert limiter.store.snapshot()[REQUESTS]["level"] >= 9.9
+
+
+def test_cancelled_async_waiter_does_not_swallow_wakeup():
+    w = ConcurrencyWindow(max_limit=1, min_limit=1)
+    assert w.acquire(0)
+
+    async def run():
+        first = asyncio.create_task(w.aacquire(1.0))
+        second = asyncio.create_task(w.aacquire(1.0))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0)
+        w.release()
+        return await second
+
+    assert asyncio.run(run())
+    assert w.in_flight == 1
+    assert w.stats()["async_waiters"] == 0
+
+
+def test_observe_failure_releases_slot_sync_and_async(monkeypatch):
+    fake = FakeLLM()
+    limiter = OutboundLimiter(BucketStore(None), rpm=0, tpm=0)
+
+    def locked(response):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(limiter, "observe", locked)
+    client = OpenAI(api_key="fake", base_url=BASE_URL, max_retries=0,
+                    http_client=httpx.Client(transport=RateLimitedTransport(fake.sync_transport(), limiter)))
+    with pytest.raises(Exception):
+        client.responses.create(model="m", input="하나")
+    assert limiter.window.in_flight == 0
+
+    with pytest.raises(Exception):
+        asyncio.run(_async_client(fake, limiter).responses.create(model="m", input="둘"))
+    assert limiter.window.in_flight == 0
@@ -0,0 +1,54 @@
+from fastapi.testclient import TestClient
+
+from api.main import create_app
+from api.readiness import DISABLED, Readiness
+
+
+def test_required_components_gate_readiness():
+    r = Readiness()
+    r.register("model", lambda: None)
+    r.register("optional", lambda: 1 / 0, required=False)
+    r.register("disabled", lambda: DISABLED)
+    assert r.is_ready() is False
+
+    r.run()
+    snap = r.snapshot()
+    assert snap["ready"] is True
+    assert snap["components"]["model"]["status"] == "ready"
+    assert snap["components"]["model"]["load_ms"] >= 0
+    assert snap["components"]["optional"]["status"] == "error"
+    assert snap["components"]["disabled"]["status"] == DISABLED
+
+
+def test_required_failure_keeps_not_ready():
+    r = Readiness()
+    r.register("model", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+    r.run()
+    assert r.is_ready() is False
+    assert "boom" in r.snapshot()["components"]["model"]["error"]
+
+
+def test_ready_endpoint(monkeypatch):
+    monkeypatch.setenv("WARMUP_LLM", "0")
+    app = create_app()
+    client = TestClient(app)  # lifespan 미실행 → 워밍업 전 상태
+
+    r = client.get("/ready")
+    assert r.status_code == 503
+    assert set(r.json()["components"]) == {"analyzer", "emo_model"}
+
+    app.state.readiness.run()
+    r = client.get("/ready")
+    assert r.status_code == 200
+    comps = r.json()["components"]
+    assert comps["analyzer"]["status"] == "ready"
+    assert comps["emo_model"]["status"] in ("ready", DISABLED)
+    assert client.get("/health").json() == {"ok": True}
+
+
+def test_lifespan_starts_warmup(monkeypatch):
+    monkeypatch.setenv("WARMUP_LLM", "0")
+    app = create_app()
+    with TestClient(app) as client:
+        app.state.readiness._thread.join(timeout=10)
+        assert client.get("/ready").status_code == 200
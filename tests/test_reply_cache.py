@@ -0,0 +1,74 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from diary_replier import generator
+from diary_replier.generator import generate_pair, generate_pair_async
+from diary_replier.reply_cache import ReplyCache, normalize_text, reply_cache_status, HIT, MISS
+from tests.fake_llm import DEFAULT_PAIR, FakeLLM
+
+
+def test_normalize_text_ignores_whitespace_and_punctuation():
+    assert normalize_text("오늘  좋았다!!\n") == normalize_text("오늘 좋았다.")
+    assert normalize_text("오늘 좋았다") != normalize_text("오늘 싫었다")
+
+
+def test_ttl_and_maxsize(tmp_path, monkeypatch):
+    c = ReplyCache(str(tmp_path / "rc.db"), ttl=60, maxsize=2)
+    c.put("a", "s1", "n1")
+    c.put("b", "s2", "n2")
+    c.put("c", "s3", "n3")
+    assert c.get("a") is None  # 가장 오래된 것부터 밀려남
+    assert c.get("c") == ("s3", "n3")
+
+    import diary_replier.reply_cache as rc
+    now = rc.time.time()
+    monkeypatch.setattr(rc.time, "time", lambda: now + 61)
+    assert c.get("c") is None
+
+
+def test_survives_restart(tmp_path):
+    path = str(tmp_path / "rc.db")
+    c1 = ReplyCache(path, ttl=60, maxsize=10)
+    c1.put("k", "짧은", "보통")
+    c1.close()
+    assert ReplyCache(path, ttl=60, maxsize=10).get("k") == ("짧은", "보통")
+
+
+def test_generate_pair_hits_cache_for_same_key(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(generator, "_client", fake.sync_client())
+    assert generate_pair("오늘 너무 피곤했어.", "피곤", "warm") == (DEFAULT_PAIR["reply_short"], DEFAULT_PAIR["reply_normal"])
+    assert reply_cache_status.get() == MISS
+    generate_pair("오늘   너무 피곤했어!", "피곤", "warm")
+    assert reply_cache_status.get() == HIT
+    assert len(fake.calls) == 1
+
+    # mood / preset 이 다르면 별도 키
+    generate_pair("오늘 너무 피곤했어.", "피곤", "coach")
+    generate_pair("오늘 너무 피곤했어.", None, "warm")
+    assert len(fake.calls) == 3
+
+
+def test_parse_failure_is_not_cached(monkeypatch):
+    fake = FakeLLM()
+    fake._text = lambda: "JSON 아님"
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    asyncio.run(generate_pair_async("파싱 실패 케이스", None, "warm"))
+    asyncio.run(generate_pair_async("파싱 실패 케이스", None, "warm"))
+    assert len(fake.calls) == 2
+
+
+def test_reply_route_exposes_cache_header(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    client = TestClient(app)
+    url = app.url_path_for("make_reply")
+    body = {"text": "캐시 헤더 확인용 일기. 오늘은 뿌듯했다", "meta": {"preset": "short"}}
+    r1 = client.post(url, json=body)
+    r2 = client.post(url, json=body)
+    assert r1.headers["X-Reply-Cache"] == "miss"
+    assert r2.headers["X-Reply-Cache"] == "hit"
+    assert r1.json() == r2.json()
+    assert len(fake.calls) == 1
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from diary_replier import generator
+from diary_replier.json_stream import JsonFieldStream
+from diary_replier.pipeline import stream_pipeline_with_logging
+from diary_replier.schemas import DiaryInput
+from tests.fake_llm import DEFAULT_PAIR, FakeLLM
+
+
+def _feed_in_chunks(text, size):
+    p = JsonFieldStream(["reply_short", "reply_normal"])
+    events = []
+    for i in range(0, len(text), size):
+        events += p.feed(text[i:i + size])
+    return p, events
+
+
+def test_json_field_stream_any_chunking():
+    obj = {"reply_short": "줄1\n\"따옴표\" \\ 😀", "extra": [1, {"a": 2}], "reply_normal": "보통 답장"}
+    text = "```json\n" + json.dumps(obj, ensure_ascii=True) + "\n```"
+    for size in (1, 2, 3, 7, len(text)):
+        p, events = _feed_in_chunks(text, size)
+        assert p.values == {"reply_short": obj["reply_short"], "reply_normal": obj["reply_normal"]}
+        assert p.finished
+        fields = [(f, t) for k, f, t in events if k == "field"]
+        assert [f for f, _ in fields] == ["reply_short", "reply_normal"]
+        deltas = "".join(t for k, f, t in events if k == "delta" and f == "reply_short")
+        assert deltas == obj["reply_short"]
+
+
+def test_field_is_emitted_before_object_closes():
+    p = JsonFieldStream(["reply_short", "reply_normal"])
+    assert [e for e in p.feed('{"reply_short": "안녕') if e[0] == "field"] == []
+    assert ("field", "reply_short", "안녕") in p.feed('", "reply_normal": "반')
+
+
+def test_stream_sends_meta_first_and_short_reply_early(monkeypatch):
+    fake = FakeLLM(latency_ms=600, ttft_ms=50)
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+
+    async def main():
+        seen = []
+        t0 = time.perf_counter()
+        async for event, data in stream_pipeline_with_logging(
+            DiaryInput(text="스트리밍 테스트: 요즘 너무 피곤하고 지쳤어"), user_id="stream-u", preset_override=None
+        ):
+            seen.append((event, data, time.perf_counter() - t0))
+        return seen
+
+    seen = asyncio.run(main())
+    names = [e for e, _, _ in seen if e != "delta"]
+    assert names == ["meta", "reply_short", "reply_normal", "done"]
+    assert "analysis" in seen[0][1] and "safety_flag" in seen[0][1]
+    t_short = next(t for e, _, t in seen if e == "reply_short")
+    t_done = seen[-1][2]
+    assert t_short < t_done * 0.6
+    assert seen[-1][1]["reply_short"] == DEFAULT_PAIR["reply_short"]
+
+
+def test_stream_route_sse(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    client = TestClient(app)
+    r = client.post(app.url_path_for("make_reply_stream"), json={"text": "요즘 너무 힘들어서 죽고 싶다는 생각이 들어"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    blocks = [b for b in r.text.split("\n\n") if b]
+    events = [(b.split("\n")[0][len("event: "):], json.loads(b.split("\n")[1][len("data: "):])) for b in blocks]
+    names = [e for e, _ in events if e != "delta"]
+    assert names == ["meta", "reply_short", "reply_normal", "done"]
+    meta, done = events[0][1], events[-1][1]
+    assert meta["safety_flag"] is True
+    # 필드 이벤트에도 /diary/reply 와 같은 안전 문구가 붙는다
+    short = next(d for e, d in events if e == "reply_short")["text"]
+    assert short == done["reply_short"] and short.startswith(DEFAULT_PAIR["reply_short"]) and short != DEFAULT_PAIR["reply_short"]
+
+
+def test_stream_falls_back_on_broken_json(monkeypatch):
+    fake = FakeLLM()
+    fake._text = lambda: "그냥 텍스트 답장"
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+
+    async def main():
+        return [(e, d) async for e, d in stream_pipeline_with_logging(
+            DiaryInput(text="폴백 테스트"), user_id=None, preset_override=None)]
+
+    events = asyncio.run(main())
+    assert [e for e, _ in events] == ["meta", "reply_short", "reply_normal", "done"]
+    assert events[2][1]["text"] == "그냥 텍스트 답장"
@@ -0,0 +1,194 @@
+import asyncio
+import functools
+import time
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from diary_replier import generator, metrics
+from diary_replier.generator import generate_pair_async
+from diary_replier.pipeline import DEGRADED_PAIR
+from diary_replier.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, HedgeStats, hedged
+from tests.fake_llm import DEFAULT_PAIR, FakeLLM
+
+
+def test_breaker_opens_then_half_open_probe_closes():
+    cb = CircuitBreaker("t", failure_threshold=3, reset_timeout=0.05)
+    for _ in range(3):
+        cb.before_call()
+        cb.record_failure()
+    assert cb.state == OPEN
+    try:
+        cb.before_call()
+        assert False, "open 상태에서는 막혀야 한다"
+    except CircuitOpenError:
+        pass
+
+    time.sleep(0.06)
+    assert cb.state == HALF_OPEN
+    cb.before_call()  # 시험 호출 1건은 통과
+    try:
+        cb.before_call()
+        assert False, "시험 호출은 한 번에 하나"
+    except CircuitOpenError:
+        pass
+    cb.record_success()
+    assert cb.state == CLOSED
+    assert cb.stats()["opened"] == 1 and cb.stats()["rejected"] == 2
+
+
+def test_breaker_half_open_failure_reopens():
+    cb = CircuitBreaker("t", failure_threshold=1, reset_timeout=0.02)
+    cb.record_failure()
+    time.sleep(0.03)
+    cb.before_call()
+    cb.record_failure()
+    assert cb.state == OPEN
+
+
+def _half_open(reset_timeout=0.02):
+    cb = CircuitBreaker("llm", failure_threshold=1, reset_timeout=reset_timeout)
+    cb.record_failure()
+    time.sleep(reset_timeout + 0.01)
+    assert cb.state == HALF_OPEN
+    return cb
+
+
+def test_half_open_probe_with_429_releases_probe(monkeypatch):
+    fake = FakeLLM(fail_first=1, fail_status=429)
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    monkeypatch.setattr(generator, "llm_breaker", _half_open())
+    call = lambda: generator._async_client.responses.create(model="m", input="x")  # noqa: E731
+    try:
+        asyncio.run(generator._guarded_call_async(call))
+        assert False, "429 는 그대로 올라와야 한다"
+    except CircuitOpenError:
+        raise
+    except Exception:
+        pass
+    # 429 는 장애가 아니므로 열지 않고, 다음 호출이 다시 시험 호출로 나간다
+    assert generator.llm_breaker.state == HALF_OPEN
+    asyncio.run(generator._guarded_call_async(call))
+    assert generator.llm_breaker.state == CLOSED
+
+
+def test_cancelled_half_open_probe_counts_as_failure(monkeypatch):
+    monkeypatch.setattr(generator, "llm_breaker", _half_open(reset_timeout=0.05))
+
+    async def never():
+        await asyncio.sleep(10)
+
+    async def main():
+        task = asyncio.ensure_future(generator._guarded_call_async(never))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+    # 시험이 실패한 것으로 보고 다시 open → reset_timeout 뒤엔 새 시험 호출이 나갈 수 있다 (영구히 막히지 않음)
+    assert generator.llm_breaker.state == OPEN
+    time.sleep(0.06)
+    assert generator.llm_breaker.before_call() is True
+
+
+def test_hedged_returns_faster_second_call():
+    stats = HedgeStats()
+    n = 0
+
+    async def call():
+        nonlocal n
+        n += 1
+        await asyncio.sleep(1.0 if n == 1 else 0.01)
+        return n
+
+    t0 = time.perf_counter()
+    res = asyncio.run(hedged(call, 0.05, stats))
+    assert res == 2
+    assert time.perf_counter() - t0 < 0.5
+    assert stats.snapshot()["hedge_wins"] == 1
+
+
+def test_hedged_survives_one_failure():
+    n = 0
+
+    async def call():
+        nonlocal n
+        n += 1
+        if n == 1:
+            await asyncio.sleep(0.05)
+            raise RuntimeError("boom")
+        await asyncio.sleep(0.1)
+        return "ok"
+
+    assert asyncio.run(hedged(call, 0.01)) == "ok"
+
+
+def test_generate_pair_hedges_slow_tail(monkeypatch):
+    # 10번째 호출만 2초 걸리는 꼬리 → 헤지 호출(11번째, 빠름)이 먼저 끝난다
+    fake = FakeLLM(latency_fn=lambda i: 2000 if i == 10 else 10)
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    monkeypatch.setattr(generator, "HEDGE_MIN_SAMPLES", 5)
+    monkeypatch.setattr(generator, "HEDGE_MIN_DELAY_MS", 50)
+    monkeypatch.setattr(generator, "hedge_stats", HedgeStats())
+
+    async def main():
+        for i in range(10):
+            await generate_pair_async(f"헤지 예열 {i}", None, "warm")
+        t0 = time.perf_counter()
+        out = await generate_pair_async("헤지 대상 일기", None, "warm")
+        return out, time.perf_counter() - t0
+
+    (rs, _), elapsed = asyncio.run(main())
+    assert rs == DEFAULT_PAIR["reply_short"]
+    assert elapsed < 1.0
+    assert len(fake.calls) == 12
+    assert generator.hedge_stats.snapshot()["hedge_wins"] == 1
+    assert len(metrics.window("llm.call")) == 11  # 진 쪽(취소)은 기록하지 않는다
+
+
+def test_outage_opens_breaker_and_reply_degrades(monkeypatch):
+    fake = FakeLLM(fail_first=10**6, fail_status=503)
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    monkeypatch.setattr(generator, "llm_breaker", CircuitBreaker("llm", failure_threshold=2, reset_timeout=0.2))
+    monkeypatch.setattr(
+        generator, "_call_with_retry_async", functools.partial(generator._call_with_retry_async, base_wait=0.01)
+    )
+    client = TestClient(app)
+    url = app.url_path_for("make_reply")
+
+    # 재시도 안에서 연속 5xx → 브레이커가 열리고 degraded 응답
+    r = client.post(url, json={"text": "장애 중에 쓴 일기 하나"})
+    assert r.status_code == 200
+    assert r.headers.get("X-Degraded") == "1"
+    assert r.json()["reply_short"] == DEGRADED_PAIR[0]
+    calls = len(fake.calls)
+    assert calls == 2
+
+    # 열린 동안은 LLM 을 부르지 않는다
+    r = client.post(url, json={"text": "장애 중에 쓴 일기 둘"})
+    assert r.headers.get("X-Degraded") == "1"
+    assert len(fake.calls) == calls
+
+    # reset_timeout 뒤 시험 호출이 성공하면 정상 복귀
+    fake.fail_first = 0
+    time.sleep(0.25)
+    r = client.post(url, json={"text": "복구 후에 쓴 일기"})
+    assert r.headers.get("X-Degraded") is None
+    assert r.json()["reply_short"] == DEFAULT_PAIR["reply_short"]
+    assert generator.llm_breaker.state == CLOSED
+
+
+def test_rate_limit_does_not_open_breaker(monkeypatch):
+    fake = FakeLLM(fail_first=10**6, fail_status=429)
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    monkeypatch.setattr(generator, "llm_breaker", CircuitBreaker("llm", failure_threshold=1))
+    try:
+        asyncio.run(generator._guarded_call_async(
+            lambda: generator._async_client.responses.create(model="m", input="x")
+        ))
+    except Exception:
+        pass
+    assert generator.llm_breaker.state == CLOSED
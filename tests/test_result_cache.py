@@ -0,0 +1,69 @@
+from diary_replier import analyzer, analyzer_hf, lexicon
+from diary_replier.analyzer import analyze
+from diary_replier.result_cache import MISS, ResultCache, text_key
+
+
+def test_lru_eviction_and_counters():
+    c = ResultCache(2, name="t")
+    c.put("a", "v1", 1)
+    c.put("b", "v1", 2)
+    assert c.get("a", "v1") == 1      # a 가 최근 사용
+    c.put("c", "v1", 3)               # b 제거
+    assert c.get("b", "v1") is MISS
+    assert c.get("c", "v1") == 3
+    st = c.stats()
+    assert (st["hits"], st["misses"], st["evictions"], st["size"]) == (2, 1, 1, 2)
+
+
+def test_version_change_invalidates():
+    c = ResultCache(10)
+    c.put("a", "v1", 1)
+    assert c.get("a", "v2") is MISS
+    assert c.stats()["invalidations"] == 1
+    assert c.get("a", "v1") is MISS
+
+
+def test_key_ignores_surrounding_whitespace():
+    assert text_key("  오늘 좋았어\n") == text_key("오늘 좋았어")
+
+
+def test_analyze_is_cached_and_copies(monkeypatch):
+    calls = []
+    orig = analyzer._analyze
+    monkeypatch.setattr(analyzer, "_analyze", lambda t, f=None: calls.append(t) or orig(t, f))
+
+    a = analyze("오늘은 너무 행복했어")
+    a.emotions.append("mutated")
+    b = analyze("  오늘은 너무 행복했어 ")
+    assert len(calls) == 1
+    assert "mutated" not in b.emotions
+    assert analyzer.analysis_cache.stats()["hits"] >= 1
+
+
+def test_lexicon_reload_invalidates_analysis(monkeypatch):
+    text = "오늘은 완전 럭키비키한 날"
+    assert analyze(text).valence == "neutral"
+    monkeypatch.setattr(analyzer, "POS_WORDS", analyzer.POS_WORDS + ["럭키비키"])
+    lexicon.reload()
+    try:
+        assert analyze(text).valence == "positive"
+    finally:
+        monkeypatch.undo()
+        lexicon.reload()
+
+
+def test_hf_cache_invalidated_by_model_change(monkeypatch):
+    calls = []
+
+    def fake_pipe(texts, **kw):
+        calls.extend(texts)
+        return [[{"label": "joy", "score": 1.0}] for _ in texts]
+
+    monkeypatch.setattr(analyzer_hf, "_pipe", fake_pipe)
+    monkeypatch.setattr(analyzer_hf, "_EMO_MODEL", "model-a")
+    analyzer_hf.predict_emotions("좋은 하루")
+    analyzer_hf.predict_emotions("좋은 하루 ")
+    assert len(calls) == 1
+    monkeypatch.setattr(analyzer_hf, "_EMO_MODEL", "model-b")
+    analyzer_hf.predict_emotions("좋은 하루")
+    assert len(calls) == 2
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import date, datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select
+
+from api.main import app
+from api.models import AsyncSessionLocal, DailyRollup, SessionLocal, save_diary_log, save_diary_log_async, save_diary_logs
+from api.rollups import rebuild_rollups, trend_buckets
+
+client = TestClient(app)
+
+
+def _log(user_id, ts, emotions=("sad",), valence="negative", safety_flag=False, latency_ms=100):
+    return dict(
+        user_id=user_id, preset_used="warm", mood_hint=None, text="일기", reply_short="s", reply_normal="n",
+        analysis={"valence": valence, "emotions": list(emotions), "keywords": [], "summary": "s"},
+        safety_flag=safety_flag, flags={}, latency_ms=latency_ms, ts=ts,
+    )
+
+
+def _rollups(user_id):
+    with SessionLocal() as db:
+        rows = db.execute(select(DailyRollup.day, DailyRollup.metric, DailyRollup.value)
+                          .where(DailyRollup.user_id == user_id)).all()
+    return {(d, m): v for d, m, v in rows}
+
+
+def test_every_save_path_updates_rollups():
+    uid = "roll-u1"
+    day = datetime(2026, 5, 4, 9)
+    with SessionLocal() as db:
+        save_diary_log(db, **_log(uid, day, emotions=("sad", "tired"), safety_flag=True))
+        save_diary_logs(db, [_log(uid, day, emotions=("happy",), valence="positive", latency_ms=50),
+                             _log(None, day)])
+
+    async def save_async():
+        async with AsyncSessionLocal() as db:
+            await save_diary_log_async(db, **_log(uid, datetime(2026, 5, 5, 1)))
+
+    asyncio.run(save_async())
+    r = _rollups(uid)
+    d = date(2026, 5, 4)
+    assert r[(d, "logs")] == 2 and r[(d, "latency_ms")] == 150 and r[(d, "safety_hits")] == 1
+    assert r[(d, "emotion:sad")] == 1 and r[(d, "emotion:tired")] == 1 and r[(d, "emotion:happy")] == 1
+    assert r[(d, "valence:negative")] == 1 and r[(d, "valence:positive")] == 1
+    assert r[(date(2026, 5, 5), "logs")] == 1
+
+
+def test_rebuild_matches_incremental():
+    uid = "roll-u2"
+    with SessionLocal() as db:
+        save_diary_logs(db, [_log(uid, datetime(2026, 4, day), emotions=("sad", "angry")[: day % 2 + 1])
+                             for day in range(1, 29)])
+    before = _rollups(uid)
+    with SessionLocal() as db:
+        db.execute(delete(DailyRollup).where(DailyRollup.user_id == uid))
+        db.commit()
+    assert _rollups(uid) == {}
+    with SessionLocal() as db:
+        assert rebuild_rollups(db, user_id=uid, chunk=5) == 28
+        db.commit()
+    assert _rollups(uid) == before
+    # since 이후만 다시 쌓아도 두 번 세지 않는다
+    with SessionLocal() as db:
+        rebuild_rollups(db, user_id=uid, since=date(2026, 4, 15))
+        db.commit()
+    assert _rollups(uid) == before
+
+
+def test_trend_buckets():
+    assert trend_buckets("week", 2, date(2026, 3, 4)) == [
+        (date(2026, 2, 23), date(2026, 3, 2)), (date(2026, 3, 2), date(2026, 3, 9))
+    ]
+    assert trend_buckets("month", 3, date(2026, 1, 31)) == [
+        (date(2025, 11, 1), date(2025, 12, 1)), (date(2025, 12, 1), date(2026, 1, 1)), (date(2026, 1, 1), date(2026, 2, 1))
+    ]
+
+
+def test_trends_endpoint_week_and_month():
+    uid = "roll-u3"
+    with SessionLocal() as db:
+        save_diary_logs(db, [
+            _log(uid, datetime(2026, 6, 1, 8), emotions=("sad",), latency_ms=100),
+            _log(uid, datetime(2026, 6, 3, 8), emotions=("sad", "tired"), safety_flag=True, latency_ms=300),
+            _log(uid, datetime(2026, 6, 9, 8), emotions=("happy",), valence="positive", latency_ms=200),
+            _log(uid, datetime(2026, 5, 20, 8), emotions=("calm",), valence="neutral"),
+        ])
+    url = app.url_path_for("trends")
+    r = client.get(url, params={"user_id": uid, "period": "week", "buckets": 2, "until": "2026-06-10"})
+    assert r.status_code == 200, r.text
+    first, second = r.json()["buckets"]
+    assert first["start"] == "2026-06-01" and first["logs"] == 2 and first["safety_hits"] == 1
+    assert first["emotions"] == {"sad": 2, "tired": 1} and first["avg_latency_ms"] == 200.0
+    assert second["start"] == "2026-06-08" and second["valence"] == {"positive": 1}
+
+    r = client.get(url, params={"user_id": uid, "period": "month", "buckets": 3, "until": "2026-06-30"})
+    months = r.json()["buckets"]
+    assert [b["logs"] for b in months] == [0, 1, 3]
+    assert months[0]["avg_latency_ms"] is None
+    assert client.get(url, params={"user_id": uid, "period": "year"}).status_code == 422
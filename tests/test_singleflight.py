@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.log_writer import log_writer
+from api.models import AsyncSessionLocal, DiaryLog, SessionLocal
+from diary_replier import generator
+from diary_replier.pipeline import reply_flight, run_pipeline_with_logging_async
+from diary_replier.schemas import DiaryInput
+from diary_replier.singleflight import SingleFlight
+from tests.fake_llm import FakeLLM
+
+
+def test_do_shares_one_call_across_threads():
+    sf = SingleFlight("t")
+    calls = []
+    gate = threading.Event()
+
+    def work():
+        calls.append(1)
+        gate.wait(1)
+        return "v"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(sf.do("k", work))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert sf.stats()["saved"] == 4 and sf.stats()["inflight"] == 0
+
+
+def test_leader_error_reaches_followers_and_key_is_released():
+    sf = SingleFlight("t")
+
+    async def boom():
+        await asyncio.sleep(0.02)
+        raise ValueError("x")
+
+    async def main():
+        return await asyncio.gather(*(sf.ado("k", boom) for _ in range(3)), return_exceptions=True)
+
+    res = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in res)
+
+    async def ok():
+        return 1
+    assert asyncio.run(sf.ado("k", ok)) == (1, False)
+
+
+def test_concurrent_duplicates_make_one_llm_call_but_log_each(monkeypatch):
+    fake = FakeLLM(latency_ms=200)
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    reply_flight.reset_stats()
+    text = "싱글플라이트: 오늘 시험 끝나서 홀가분해"
+
+    async def main():
+        def one(user):
+            db = AsyncSessionLocal()
+            coro = run_pipeline_with_logging_async(DiaryInput(text=text), user_id=user, preset_override=None, db=db)
+            return coro, db
+        pairs = [one("sf-u1") for _ in range(5)] + [one("sf-u2")]
+        try:
+            return await asyncio.gather(*(c for c, _ in pairs))
+        finally:
+            for _, db in pairs:
+                await db.close()
+
+    outs = asyncio.run(main())
+    assert len({o.reply_short for o in outs}) == 1
+    assert len(fake.calls) == 2  # sf-u1 5건 → 1회, sf-u2 → 1회
+    assert reply_flight.stats()["saved"] == 4
+    log_writer.flush()
+    with SessionLocal() as db:
+        assert db.query(DiaryLog).filter_by(text=text, user_id="sf-u1").count() == 5
+
+
+def test_stats_endpoint_reports_saved_calls():
+    r = TestClient(app).get(app.url_path_for("stats"))
+    assert r.status_code == 200
+    body = r.json()
+    assert {"calls", "saved", "inflight"} <= set(body["reply_flight"])
+    assert "hit_rate" in body["reply_cache"]
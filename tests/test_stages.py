@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.log_writer import log_writer
+from api.preset_cache import preset_cache
+from api.models import AsyncSessionLocal, DiaryLog, SessionLocal
+from diary_replier import generator, metrics, pipeline
+from diary_replier.pipeline import run_pipeline_with_logging_async
+from diary_replier.schemas import DiaryInput
+from diary_replier.stages import Stage, StageGraph, server_timing, stage_timings
+from tests.fake_llm import FakeLLM
+
+
+def _sleepy(name, sec):
+    def fn(ctx):
+        time.sleep(sec)
+        return name
+    return fn
+
+
+def test_independent_stages_run_concurrently_sync():
+    g = StageGraph("t_sync", [
+        Stage("a", _sleepy("a", 0.1)),
+        Stage("b", _sleepy("b", 0.1)),
+        Stage("c", lambda ctx: ctx["a"] + ctx["b"], ("a", "b")),
+    ])
+    run = g.run({})
+    assert run.results["c"] == "ab"
+    assert run.wall_ms < 180 and run.serial_ms >= 200
+    assert run.critical_path[-1] == "c"
+    assert len(metrics.window("t_sync.wall")) == 1
+
+
+def test_inline_stage_runs_in_caller_thread_without_holding_the_pool():
+    pool = ThreadPoolExecutor(max_workers=1)
+    threads = {}
+
+    def where(name, sec=0.0):
+        def fn(ctx):
+            threads[name] = threading.current_thread()
+            time.sleep(sec)
+            return name
+        return fn
+
+    g = StageGraph("t_inline", [
+        Stage("prep", where("prep")),
+        Stage("slow", where("slow", 0.1), ("prep",), inline=True),
+        Stage("side", where("side"), ("prep",)),
+    ])
+    run = g.run({}, executor=pool)
+    assert run.results == {"prep": "prep", "slow": "slow", "side": "side"}
+    assert threads["slow"] is threading.current_thread()
+    assert threads["prep"] is not threading.current_thread()
+    assert pipeline.reply_graph.stages["generate"].inline
+    pool.shutdown()
+
+
+def test_independent_stages_run_concurrently_async():
+    async def slow_async(ctx):
+        await asyncio.sleep(0.1)
+        return 1
+
+    g = StageGraph("t_async", [
+        Stage("a", _sleepy("a", 0.1)),   # 동기 → 스레드
+        Stage("b", slow_async),
+        Stage("c", lambda ctx: (ctx["a"], ctx["b"]), ("a", "b"), blocking=False),
+    ])
+    run = asyncio.run(g.arun({}))
+    assert run.results["c"] == ("a", 1)
+    assert run.wall_ms < 180
+    # c 는 a, b 가 끝난 뒤에 시작
+    assert run.timings["c"][0] >= max(run.timings["a"][1], run.timings["b"][1]) - 1
+
+
+def test_undeclared_dependency_rejected():
+    with pytest.raises(ValueError):
+        StageGraph("bad", [Stage("b", lambda c: 1, ("a",)), Stage("a", lambda c: 1)])
+
+
+def test_failing_stage_propagates_and_cancels_rest():
+    started = []
+
+    async def boom(ctx):
+        raise RuntimeError("x")
+
+    async def later(ctx):
+        started.append(1)
+
+    g = StageGraph("t_fail", [Stage("a", boom), Stage("b", later, ("a",))])
+    with pytest.raises(RuntimeError):
+        asyncio.run(g.arun({}))
+    assert not started
+
+
+def test_server_timing_header_value():
+    assert server_timing({"analyze": 1.234, "generate": 800}) == "analyze;dur=1.2, generate;dur=800.0"
+
+
+def test_preset_lookup_overlaps_analysis(monkeypatch):
+    fake = FakeLLM(latency_ms=50)
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    real_analyze = pipeline.analyze
+
+    async def slow_preset(db, user_id):
+        await asyncio.sleep(0.1)
+        return ("coach", None)
+
+    def slow_analyze(text, features=None):
+        time.sleep(0.1)
+        return real_analyze(text, features)
+
+    monkeypatch.setattr(preset_cache, "aloader", slow_preset)
+    monkeypatch.setattr(pipeline, "analyze", slow_analyze)
+
+    async def main():
+        await generator.generate_pair_async("DAG: 클라이언트 예열", None, "warm")
+        async with AsyncSessionLocal() as db:
+            t0 = time.perf_counter()
+            out = await run_pipeline_with_logging_async(
+                DiaryInput(text="DAG: 오늘 발표 끝나서 뿌듯했어"), user_id="dag-u1", preset_override=None, db=db
+            )
+            return out, (time.perf_counter() - t0) * 1000, stage_timings.get()
+
+    out, elapsed_ms, timings = asyncio.run(main())
+    assert out.reply_short
+    assert timings["preset"] >= 100 and timings["analyze"] >= 100
+    # 직렬이면 preset + analyze + generate ≥ 250ms
+    assert elapsed_ms < 240
+    log_writer.flush()
+    with SessionLocal() as db:
+        row = db.query(DiaryLog).filter_by(user_id="dag-u1").first()
+        assert row is not None and row.preset_used == "coach"
+
+
+def test_log_is_deferred_until_after_response(monkeypatch):
+    monkeypatch.setattr(log_writer, "enabled", False)  # write-behind 를 끄면 after_response 로 미룬다
+    fake = FakeLLM()
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    text = "DAG: 응답 뒤에 저장되는 로그"
+    deferred = []
+
+    async def main():
+        async with AsyncSessionLocal() as db:
+            return await run_pipeline_with_logging_async(
+                DiaryInput(text=text), user_id=None, preset_override=None, db=db,
+                after_response=lambda fn, row: deferred.append((fn, row)),
+            )
+
+    asyncio.run(main())
+    with SessionLocal() as db:
+        assert db.query(DiaryLog).filter_by(text=text).count() == 0
+    fn, row = deferred[0]
+    asyncio.run(fn(row))
+    with SessionLocal() as db:
+        assert db.query(DiaryLog).filter_by(text=text).count() == 1
+
+
+def test_reply_route_reports_server_timing(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(generator, "_async_client", fake.async_client())
+    text = "DAG 라우트: 오늘은 산책을 오래 했어"
+    r = TestClient(app).post(app.url_path_for("make_reply"), json={"text": text})
+    assert r.status_code == 200
+    names = {p.split(";")[0] for p in r.headers["Server-Timing"].split(", ")}
+    assert {"features", "analyze", "safety", "preset", "compact", "mood", "generate"} == names
+    log_writer.flush()
+    with SessionLocal() as db:
+        assert db.query(DiaryLog).filter_by(text=text).count() == 1
@@ -0,0 +1,105 @@
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from api.models import Base, DiaryLog
+from api.storage import create_db_engine, engine_options, engine_stats, sqlite_pragmas
+
+
+def _pragma(engine, name):
+    with engine.connect() as c:
+        return c.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_sqlite_file_gets_wal_and_pragmas(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/t.db")
+    assert _pragma(engine, "journal_mode") == "wal"
+    assert _pragma(engine, "synchronous") == 1  # NORMAL
+    assert _pragma(engine, "busy_timeout") == 5000
+    assert _pragma(engine, "mmap_size") > 0
+    s = engine_stats(engine)
+    assert s["profile"] == "sqlite" and s["pool"] == "QueuePool" and s["size"] == 5
+
+
+def test_default_profile_keeps_create_engine_defaults(tmp_path):
+    url = f"sqlite:///{tmp_path}/d.db"
+    assert sqlite_pragmas(url, "default") == []
+    assert engine_options(url, "default") == {"connect_args": {"check_same_thread": False}}
+    engine = create_db_engine(url, "default")
+    assert _pragma(engine, "journal_mode") == "delete"
+
+
+def test_memory_sqlite_skips_wal():
+    pragmas = sqlite_pragmas("sqlite://")
+    assert not any("journal_mode" in p or "mmap" in p for p in pragmas)
+    assert "pool_size" not in engine_options("sqlite://")
+
+
+def test_postgres_profile_sizes_pool():
+    opts = engine_options("postgresql+psycopg2://u:p@db/app")
+    assert opts["pool_size"] == 5 and opts["max_overflow"] == 10
+    assert opts["pool_pre_ping"] is True and opts["pool_recycle"] == 1800
+    assert "check_same_thread" not in opts.get("connect_args", {})
+    assert sqlite_pragmas("postgresql+psycopg2://u:p@db/app") == []
+
+
+def test_concurrent_writers_do_not_lock(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/c.db")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(20):
+                with Session() as db:
+                    db.add(DiaryLog(user_id=f"w{n}", text=f"t{i}", reply_short="s", reply_normal="n"))
+                    db.commit()
+                with Session() as db:
+                    db.query(DiaryLog).filter(DiaryLog.user_id == f"w{n}").count()
+        except Exception as e:  # "database is locked"
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    with Session() as db:
+        assert db.query(DiaryLog).count() == 160
+
+
+def test_async_engine_gets_same_profile(tmp_path):
+    import asyncio
+
+    from api.storage import async_url, create_async_db_engine
+
+    url = f"sqlite:///{tmp_path}/a.db"
+    assert async_url(url) == f"sqlite+aiosqlite:///{tmp_path}/a.db"
+    assert async_url("postgresql://u@h/db") == "postgresql+asyncpg://u@h/db"
+    engine = create_async_db_engine(async_url(url))
+
+    async def journal_mode():
+        async with engine.connect() as c:
+            return (await c.execute(text("PRAGMA journal_mode"))).scalar()
+
+    assert asyncio.run(journal_mode()) == "wal"
+    s = engine_stats(engine)
+    assert s["profile"] == "sqlite" and s["driver"] == "aiosqlite"
+
+
+def test_request_sessions_return_to_pool():
+    from fastapi.testclient import TestClient
+
+    from api.main import app
+    from api.models import async_engine
+
+    client = TestClient(app)
+    for i in range(5):
+        assert client.post(app.url_path_for("set_preset"), json={"user_id": f"pool-u{i}", "preset": "warm"}).status_code == 200
+        assert client.get(app.url_path_for("get_preset", user_id=f"pool-u{i}")).status_code == 200
+        assert client.get(app.url_path_for("get_preset", user_id="pool-missing")).status_code == 404
+        assert client.get(app.url_path_for("list_logs"), params={"user_id": f"pool-u{i}"}).status_code == 200
+    assert async_engine.sync_engine.pool.checkedout() == 0